@@ -5,10 +5,12 @@ import functools
 import logging
 import random
 import secrets
+import threading
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
-from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set
+from array import array
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableMapping, MutableSequence, Set
 from enum import IntEnum, IntFlag
 from typing import (AbstractSet, Any, ClassVar, Dict, List, Literal, NamedTuple,
                     Optional, Protocol, Tuple, Union, TYPE_CHECKING, overload)
@@ -69,6 +71,16 @@ class PlandoItemBlock:
     count: dict[str, int] = dataclasses.field(default_factory=dict)
 
 
+class SphereCache(NamedTuple):
+    """Logical spheres of a MultiWorld, as computed by `MultiWorld._compute_spheres`."""
+    key: Any
+    """Snapshot of the placements the spheres were computed from."""
+    spheres: List[Set[Location]]
+    unreachable: Set[Location]
+    state: CollectionState
+    """State after collecting every sphere."""
+
+
 class MultiWorld():
     debug_types = False
     player_name: Dict[int, str]
@@ -77,6 +89,18 @@ class MultiWorld():
     regions: RegionManager
     itempool: List[Item]
     is_race: bool = False
+    compact_state: bool = False
+    """If True, CollectionStates store item counts in an ItemCounter instead of a Counter."""
+    copy_on_write_state: bool = False
+    """If True, copies of CollectionStates share per-player data until a player is mutated."""
+    item_name_indexes: Dict[int, Dict[str, int]]
+    """Per player interning of collected item names to dense indexes, used by ItemCounter."""
+    cache_spheres: bool = False
+    """
+    If True, the logical spheres are computed once and shared by the accessibility check, the multidata spheres and the
+    spoiler playthrough, until placements change. Only for once logic is final, as changes to rules are not detected.
+    """
+    _sphere_cache: Optional[SphereCache]
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
 
@@ -169,6 +193,9 @@ class MultiWorld():
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
+        self.item_name_indexes = {}
+        self._sphere_cache = None
+        self._sphere_lock = threading.Lock()
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -582,80 +609,117 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def _get_sphere_cache_key(self) -> Tuple[Tuple[Tuple[Location, Item, ItemClassification], ...],
+                                             Counter[Tuple[str, int]]]:
+        """Snapshot of everything the logical spheres depend on that can still change after generation."""
+        return (tuple((location, location.item, location.item.classification)
+                      for location in self.get_filled_locations()),
+                Counter((item.name, item.player) for items in self.precollected_items.values() for item in items))
+
+    def _get_spheres_cached(self) -> SphereCache:
         """
-        yields a set of locations for each logical sphere
+        Returns the logical spheres of all filled locations. With `cache_spheres`, they are only computed again if the
+        placements changed since the last call. The result is shared between threads, so it must not be modified.
+        """
+        if not self.cache_spheres:
+            return self._compute_spheres(None)
+        key = self._get_sphere_cache_key()
+        with self._sphere_lock:
+            cache = self._sphere_cache
+            if cache is None or cache.key != key:
+                cache = self._sphere_cache = self._compute_spheres(key)
+            return cache
+
+    def _compute_spheres(self, key: Any) -> SphereCache:
+        """
+        Computes the logical spheres of all filled locations, keeping the final state.
 
-        If there are unreachable locations, the last sphere of reachable
-        locations is followed by an empty set, and then a set of all of the
-        unreachable locations.
+        Only the locations whose reachability can have changed with the previous sphere are checked again. Locations in
+        regions that are not reachable yet and locations with access rules of known dependencies only depend on their
+        own player, so they wait until that player collected something they depend on. Other access rules can depend on
+        the items of any player, so they are checked again whenever any player's state changed.
         """
         state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        locations_per_player: Dict[int, List[Location]] = defaultdict(list)
+        for location in self.get_filled_locations():
+            locations_per_player[location.player].append(location)
+        pending: Dict[int, _RuleDependencySweep] = {}
+        for player, locations in locations_per_player.items():
+            get_dependencies = getattr(self.worlds[player], "get_rule_sweep_dependencies", None)
+            pending[player] = _RuleDependencySweep(state, player, get_dependencies() if get_dependencies else {},
+                                                   locations)
+
+        spheres: List[Set[Location]] = []
+        changed_players: Set[int] = set(pending)
+        while changed_players:
+            candidates: List[Location] = []
+            for player, player_pending in pending.items():
+                if player in changed_players:
+                    candidates.extend(player_pending.pop_candidates())
+                else:
+                    candidates.extend(player_pending.unknown)
+                    player_pending.unknown = []
 
-        while locations:
             sphere: Set[Location] = set()
-
-            for location in locations:
+            for location in candidates:
                 if location.can_reach(state):
                     sphere.add(location)
-            yield sphere
+                else:
+                    pending[location.player].park(location)
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
                 break
+            spheres.append(sphere)
 
+            changed_players = set()
             for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                item = location.item
+                if state.collect(item, True, location):
+                    changed_players.add(item.player)
+                    if item.player in pending:
+                        pending[item.player].collected.add(item.name)
+
+        unreachable = {location for locations in locations_per_player.values() for location in locations
+                       if location not in state.locations_checked}
+        return SphereCache(key, spheres, unreachable, state)
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere
+
+        If there are unreachable locations, the last sphere of reachable
+        locations is followed by an empty set, and then a set of all of the
+        unreachable locations.
+        """
+        cache = self._get_spheres_cached()
+        for sphere in cache.spheres:
+            yield set(sphere)
+        if cache.unreachable:
+            yield set()
+            yield set(cache.unreachable)
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
 
+        Locations without an address or item code are left out, and spheres of only such locations are skipped.
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        def is_sendable(location: Location) -> bool:
+            return type(location.item.code) is int and type(location.address) is int
+
+        cache = self._get_spheres_cached()
+        for sphere in cache.spheres:
+            sendable = {location for location in sphere if is_sendable(location)}
+            if sendable:
+                yield sendable
+        unreachable = {location for location in cache.unreachable if is_sendable(location)}
+        if unreachable:
+            yield set()
+            yield unreachable
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -683,8 +747,36 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
+        def report_missing() -> bool:
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {locations}",
+                    multiworld=self,
+                )
+            # ran out of places and did not finish yet, quit
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {locations}")
+            return False
+
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if not state and self.cache_spheres:
+            if not locations:
+                return False
+            # the spheres of a fresh state are shared with the spoiler playthrough, so evaluate the end result only
+            cache = self._get_spheres_cached()
+            with self._sphere_lock:
+                beatable_fulfilled = self.has_beaten_game(cache.state)
+                locations = [location for location in locations if location in cache.unreachable
+                             or (location.item is None and not location.can_reach(cache.state))]
+            if all_done():
+                return True
+            return report_missing() if locations else False
+
+        if not state:
+            state = CollectionState(self)
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -692,16 +784,7 @@ class MultiWorld():
                     sphere.append(locations.pop(n))
 
             if not sphere:
-                if __debug__:
-                    from Fill import FillError
-                    raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
-                        multiworld=self,
-                    )
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
-                return False
+                return report_missing()
 
             for location in sphere:
                 if location.item:
@@ -717,10 +800,258 @@ class MultiWorld():
 
 
 PathValue = Tuple[str, Optional["PathValue"]]
+_SHARED_STATE_ATTRIBUTES = frozenset(("path", "advancements", "locations_checked"))
+"""Attributes of a CollectionState that are shared by copy-on-write copies until they are written to."""
+_EXTRA_COUNT = -(1 << 63)
+"""Marker in `ItemCounter._counts` for a count that is stored in `ItemCounter._extra` instead."""
+
+
+class ItemCounter(MutableMapping[str, int]):
+    """
+    Compact replacement for the per-player `Counter[str]` in `CollectionState.prog_items`.
+
+    Item names are interned to dense indexes in a table shared by every ItemCounter of the same player, and the counts
+    live in an `array`, so copying a counter is a single buffer copy instead of rebuilding a dict.
+    Behaves like a Counter: missing items count as 0, and items set to a count of 0 are kept until deleted.
+    A count of 0 in the array means absent, so counts that don't fit the array, like 0 and the fractional counters
+    some worlds use, are kept in a side dict.
+    """
+    __slots__ = ("_index", "_counts", "_extra")
+
+    _index: Dict[str, int]
+    _counts: array
+    _extra: Optional[Dict[str, Any]]
+    _grow_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, index: Dict[str, int], counts: Optional[array] = None,
+                 extra: Optional[Dict[str, Any]] = None) -> None:
+        self._index = index
+        self._counts = array("q", bytes(8 * len(index))) if counts is None else counts
+        self._extra = extra
+
+    def _intern(self, item: str) -> int:
+        index = self._index
+        with self._grow_lock:
+            # another counter sharing this index may have interned the name in the meantime
+            slot = index.get(item)
+            if slot is None:
+                slot = index[item] = len(index)
+        counts = self._counts
+        if slot >= len(counts):
+            counts.frombytes(bytes(8 * (len(index) - len(counts))))
+        return slot
+
+    def __getitem__(self, item: str) -> int:
+        slot = self._index.get(item)
+        if slot is None:
+            return 0
+        try:
+            count = self._counts[slot]
+        except IndexError:
+            # interned by another counter after this one was last written to
+            return 0
+        if count == _EXTRA_COUNT:
+            return self._extra[item]
+        return count
+
+    def __setitem__(self, item: str, count: int) -> None:
+        slot = self._index.get(item)
+        if slot is None or slot >= len(self._counts):
+            slot = self._intern(item)
+        counts = self._counts
+        if type(count) is int and count and _EXTRA_COUNT < count < (1 << 63):
+            if counts[slot] == _EXTRA_COUNT:
+                del self._extra[item]
+            counts[slot] = count
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[item] = count
+            counts[slot] = _EXTRA_COUNT
+
+    def __delitem__(self, item: str) -> None:
+        # like Counter, deleting a missing item is not an error
+        slot = self._index.get(item)
+        if slot is not None and slot < len(self._counts):
+            if self._counts[slot] == _EXTRA_COUNT:
+                del self._extra[item]
+            self._counts[slot] = 0
+
+    def __contains__(self, item: object) -> bool:
+        slot = self._index.get(item) if isinstance(item, str) else None
+        return slot is not None and slot < len(self._counts) and self._counts[slot] != 0
+
+    def __iter__(self) -> Iterator[str]:
+        counts = self._counts
+        length = len(counts)
+        for item, slot in tuple(self._index.items()):
+            if slot < length and counts[slot]:
+                yield item
+
+    def __len__(self) -> int:
+        return len(self._counts) - self._counts.count(0)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ItemCounter) and other._index is self._index and not self._extra and not other._extra:
+            return self._counts.tobytes().rstrip(b"\0") == other._counts.tobytes().rstrip(b"\0")
+        if isinstance(other, Mapping):
+            # like Counter, items with a count of 0 equal missing ones
+            return ({item: count for item, count in self.items() if count} ==
+                    {item: count for item, count in other.items() if count})
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())})"
+
+    def get(self, item: str, default: Any = None) -> Any:
+        return self[item] if item in self else default
+
+    def copy(self) -> ItemCounter:
+        return ItemCounter(self._index, self._counts[:], self._extra.copy() if self._extra else None)
+
+    __copy__ = copy
+
+    def total(self) -> int:
+        if self._extra:
+            return sum(self.values())
+        return sum(self._counts)
+
+    def update(self, other: Union[Mapping[str, int], Iterable[str]] = (), /, **kwargs: int) -> None:
+        """Add counts instead of replacing them, like Counter.update."""
+        if isinstance(other, Mapping):
+            for item, count in other.items():
+                self[item] += count
+        else:
+            for item in other:
+                self[item] += 1
+        for item, count in kwargs.items():
+            self[item] += count
+
+    def subtract(self, other: Union[Mapping[str, int], Iterable[str]] = (), /, **kwargs: int) -> None:
+        """Subtract counts, like Counter.subtract."""
+        if isinstance(other, Mapping):
+            for item, count in other.items():
+                self[item] -= count
+        else:
+            for item in other:
+                self[item] -= 1
+        for item, count in kwargs.items():
+            self[item] -= count
+
+
+class _RuleDependencySweep:
+    """
+    The unreachable locations of one player during a sweep or sphere computation, grouped by what can make them
+    reachable, so that only the locations whose access rule depends on newly collected items or newly reached regions
+    are checked again. Locations without dependency data are checked on every iteration.
+    """
+    __slots__ = ("state", "player", "dependencies", "unknown", "by_region", "by_item", "by_spot", "collected",
+                 "region_count")
+
+    state: CollectionState
+    player: int
+    dependencies: Mapping[int, Tuple[AbstractSet[str], bool]]
+    """Rule id to the item names it depends on and whether it depends on regions, locations or entrances."""
+    unknown: List[Location]
+    """Locations to check on the next sweep iteration."""
+    by_region: Dict[Region, List[Location]]
+    """Locations in regions that are not reachable yet."""
+    by_item: Dict[str, Set[Location]]
+    """Locations in reachable regions, by the names of the items their access rule depends on."""
+    by_spot: Set[Location]
+    """Locations in reachable regions with an access rule that depends on regions, locations or entrances."""
+    collected: Set[str]
+    """Names of the items of this player collected since the last check."""
+    region_count: int
+    """Number of reachable regions at the last check."""
+
+    def __init__(self, state: CollectionState, player: int,
+                 dependencies: Mapping[int, Tuple[AbstractSet[str], bool]], locations: Iterable[Location]) -> None:
+        self.state = state
+        self.player = player
+        self.dependencies = dependencies
+        self.unknown = list(locations)
+        self.by_region = {}
+        self.by_item = {}
+        self.by_spot = set()
+        self.collected = set()
+        self.region_count = -1
+
+    def __bool__(self) -> bool:
+        return bool(self.unknown or self.by_region or self.by_item or self.by_spot)
+
+    def get_rule_dependencies(self, location: Location) -> Optional[Tuple[AbstractSet[str], bool]]:
+        """Returns the dependencies of the location's access rule, or None if they are unknown."""
+        rule = location.access_rule
+        if type(location).can_reach is not Location.can_reach \
+                or type(location.parent_region).can_reach is not Region.can_reach:
+            return None
+        if rule is Location.access_rule:
+            return frozenset(), False
+        if getattr(rule, "force_recalculate", True):
+            return None
+        return self.dependencies.get(id(rule))
+
+    def pop_candidates(self) -> List[Location]:
+        """Returns the locations that could have become reachable since the last check."""
+        state = self.state
+        if state.stale[self.player]:
+            state.update_reachable_regions(self.player)
+        reachable_regions = state.reachable_regions[self.player]
+
+        candidates = self.unknown
+        self.unknown = []
+        for region in [region for region in self.by_region if region in reachable_regions]:
+            candidates.extend(self.by_region.pop(region))
+
+        woken: Set[Location] = set()
+        for item_name in self.collected:
+            locations = self.by_item.pop(item_name, None)
+            if locations:
+                woken |= locations
+        self.collected = set()
+        if self.by_spot and len(reachable_regions) != self.region_count:
+            woken |= self.by_spot
+        self.region_count = len(reachable_regions)
+
+        if woken:
+            self.by_spot -= woken
+            for location in woken:
+                for item_name in self.dependencies[id(location.access_rule)][0]:
+                    locations = self.by_item.get(item_name)
+                    if locations:
+                        locations.discard(location)
+                        if not locations:
+                            del self.by_item[item_name]
+            candidates.extend(woken)
+        return candidates
+
+    def park(self, location: Location) -> None:
+        """Store an unreachable location until something it depends on changes."""
+        dependencies = self.get_rule_dependencies(location)
+        if dependencies is None or location.parent_region.player != self.player:
+            self.unknown.append(location)
+        elif location.parent_region not in self.state.reachable_regions[self.player]:
+            self.by_region.setdefault(location.parent_region, []).append(location)
+        else:
+            item_names, spot_dependent = dependencies
+            for item_name in item_names:
+                self.by_item.setdefault(item_name, set()).add(location)
+            if spot_dependent:
+                self.by_spot.add(location)
+
+
+def _may_depend_on_regions(entrance: Entrance, dependencies: Mapping[int, Tuple[AbstractSet[str], bool]]) -> bool:
+    """Whether the result of an entrance's access rule can change when only new regions were reached."""
+    rule = entrance.access_rule
+    if getattr(rule, "force_recalculate", True) or type(entrance).can_reach is not Entrance.can_reach:
+        return True
+    rule_dependencies = dependencies.get(id(rule))
+    return rule_dependencies is None or rule_dependencies[1]
 
 
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Dict[int, Union[Counter[str], ItemCounter]]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
@@ -730,12 +1061,30 @@ class CollectionState():
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
     stale: Dict[int, bool]
     allow_partial_entrances: bool
+    copy_on_write: bool
+    """If True, copies share per-player data with this state until either side mutates that player."""
+    _owned_players: Set[int]
+    """Players whose per-player data is not shared with any copy."""
+    _shared_attributes: Set[str]
+    """Names of the attributes from _SHARED_STATE_ATTRIBUTES that are currently shared with a copy."""
+    _updating_players: Set[int]
+    """Players whose reachable regions are being updated, so they are incomplete in copies made by rules meanwhile."""
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
+    additional_copy_on_write_attributes: List[str] = []
+    """
+    Names of LogicMixin attributes of the form `{player: container}` that are shared between copy-on-write copies and
+    copied per player when that player gets mutated through collect, remove or update_reachable_regions.
+    """
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        if parent.compact_state:
+            indexes = parent.item_name_indexes
+            self.prog_items = {player: ItemCounter(indexes.setdefault(player, {}))
+                               for player in parent.get_all_ids()}
+        else:
+            self.prog_items = {player: Counter() for player in parent.get_all_ids()}
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
@@ -744,6 +1093,10 @@ class CollectionState():
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
+        self.copy_on_write = parent.copy_on_write_state
+        self._owned_players = set(parent.get_all_ids()) if self.copy_on_write else set()
+        self._shared_attributes = set()
+        self._updating_players = set()
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -751,6 +1104,10 @@ class CollectionState():
                 self.collect(item, True)
 
     def update_reachable_regions(self, player: int):
+        if self.copy_on_write:
+            if player not in self._owned_players:
+                self.detach_player(player)
+            self._updating_players.add(player)
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
@@ -767,6 +1124,8 @@ class CollectionState():
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
+        if self.copy_on_write:
+            self._updating_players.discard(player)
 
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
@@ -785,6 +1144,8 @@ class CollectionState():
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
+                if "path" in self._shared_attributes:
+                    self.detach_attribute("path")
                 self.path[new_region] = (new_region.name, self.path.get(connection, None))
                 self.multiworld.worlds[player].reached_region(self, new_region)
 
@@ -798,6 +1159,8 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        get_dependencies = getattr(self.multiworld.worlds[player], "get_rule_sweep_dependencies", None)
+        dependencies = get_dependencies() if get_dependencies is not None else None
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -815,13 +1178,22 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
+                    if "path" in self._shared_attributes:
+                        self.detach_attribute("path")
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
                     self.multiworld.worlds[player].reached_region(self, new_region)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            if dependencies:
+                # no items are collected while updating, so only rules that depend on regions can have changed
+                queue.extend(connection for connection in blocked_connections
+                             if _may_depend_on_regions(connection, dependencies))
+            else:
+                queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
+        if self.copy_on_write:
+            return self._copy_on_write()
         ret = CollectionState(self.multiworld)
         ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
         ret.reachable_regions = {player: region_set.copy() for player, region_set in
@@ -836,6 +1208,65 @@ class CollectionState():
             ret = function(self, ret)
         return ret
 
+    def _copy_on_write(self) -> CollectionState:
+        """
+        Copy that shares the per-player data and the attributes in _SHARED_STATE_ATTRIBUTES with this state. Both
+        states copy a player's data on the first mutation of that player, so a copy only costs the players it touches.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.multiworld = self.multiworld
+        ret.copy_on_write = True
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        ret.prog_items = self.prog_items.copy()
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        # the shared reachability data is as up to date as it is here, so it doesn't need to be recalculated,
+        # unless the copy is made by a rule while updating it
+        ret.stale = self.stale.copy()
+        for player in self._updating_players:
+            ret.stale[player] = True
+        ret._updating_players = set()
+        ret.path = self.path
+        ret.advancements = self.advancements
+        ret.locations_checked = self.locations_checked
+        self._owned_players = set()
+        ret._owned_players = set()
+        self._shared_attributes = set(_SHARED_STATE_ATTRIBUTES)
+        ret._shared_attributes = set(_SHARED_STATE_ATTRIBUTES)
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
+        for function in self.additional_copy_functions:
+            ret = function(self, ret)
+        for attribute in self.additional_copy_on_write_attributes:
+            setattr(ret, attribute, getattr(self, attribute).copy())
+        return ret
+
+    def detach_player(self, player: int) -> None:
+        """
+        Stop sharing the data of `player` with copy-on-write copies of this state.
+        Has to be called before mutating a player's data directly instead of through collect, remove or
+        update_reachable_regions.
+        """
+        if player in self._owned_players or not self.copy_on_write:
+            return
+        self._owned_players.add(player)
+        self.prog_items[player] = self.prog_items[player].copy()
+        self.reachable_regions[player] = self.reachable_regions[player].copy()
+        self.blocked_connections[player] = self.blocked_connections[player].copy()
+        for attribute in self.additional_copy_on_write_attributes:
+            per_player = getattr(self, attribute)
+            if player in per_player:
+                per_player[player] = per_player[player].copy()
+
+    def detach_attribute(self, name: str) -> None:
+        """
+        Stop sharing `path`, `advancements` or `locations_checked` with copy-on-write copies of this state.
+        Has to be called before mutating one of them directly.
+        """
+        if name in self._shared_attributes:
+            self._shared_attributes.remove(name)
+            setattr(self, name, getattr(self, name).copy())
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -879,6 +1310,15 @@ class CollectionState():
         # under this assumption, an extra sweep iteration is performed that checks every player, to confirm that the
         # sweep is finished.
         checking_if_finished = False
+        # Worlds that provide the dependencies of their access rules only get the locations checked again whose rules
+        # depend on what changed since the last check.
+        dependency_sweeps: Dict[int, _RuleDependencySweep] = {}
+        for player, locations in advancements_per_player:
+            get_dependencies = getattr(self.multiworld.worlds[player], "get_rule_sweep_dependencies", None)
+            if get_dependencies is not None:
+                dependencies = get_dependencies()
+                if dependencies:
+                    dependency_sweeps[player] = _RuleDependencySweep(self, player, dependencies, locations)
         while players_to_check:
             next_advancements_per_player: List[Tuple[int, List[Location]]] = []
             next_players_to_check = set()
@@ -888,6 +1328,10 @@ class CollectionState():
                     next_advancements_per_player.append((player, locations))
                     continue
 
+                dependency_sweep = dependency_sweeps.get(player)
+                if dependency_sweep is not None:
+                    locations = dependency_sweep.pop_candidates()
+
                 # Accessibility of each location is checked first because a player's region accessibility cache becomes
                 # stale whenever one of their own items is collected into the state.
                 reachable_locations: List[Location] = []
@@ -900,7 +1344,12 @@ class CollectionState():
                         reachable_locations.append(location)
                     else:
                         unreachable_locations.append(location)
-                if unreachable_locations:
+                if dependency_sweep is not None:
+                    for location in unreachable_locations:
+                        dependency_sweep.park(location)
+                    if dependency_sweep:
+                        next_advancements_per_player.append((player, unreachable_locations))
+                elif unreachable_locations:
                     next_advancements_per_player.append((player, unreachable_locations))
 
                 # A previous player's locations processed in the current `while players_to_check` iteration could have
@@ -915,6 +1364,8 @@ class CollectionState():
                 next_players_to_check.discard(player)
 
                 # Collect the items from the reachable locations.
+                if reachable_locations and "advancements" in self._shared_attributes:
+                    self.detach_attribute("advancements")
                 for advancement in reachable_locations:
                     self.advancements.add(advancement)
                     item = advancement.item
@@ -923,6 +1374,8 @@ class CollectionState():
                         # The player the item belongs to may be able to reach additional locations in the next sweep
                         # iteration.
                         next_players_to_check.add(item.player)
+                        if item.player in dependency_sweeps:
+                            dependency_sweeps[item.player].collected.add(item.name)
 
             if not next_players_to_check:
                 if not checking_if_finished:
@@ -1117,8 +1570,13 @@ class CollectionState():
     # Item related
     def collect(self, item: Item, prevent_sweep: bool = False, location: Optional[Location] = None) -> bool:
         if location:
+            if "locations_checked" in self._shared_attributes:
+                self.detach_attribute("locations_checked")
             self.locations_checked.add(location)
 
+        if self.copy_on_write and item.player not in self._owned_players:
+            self.detach_player(item.player)
+
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
@@ -1137,9 +1595,13 @@ class CollectionState():
         :param count: How many of the item to add.
         """
         assert count > 0
+        if self.copy_on_write and player not in self._owned_players:
+            self.detach_player(player)
         self.prog_items[player][item] += count
 
     def remove(self, item: Item):
+        if self.copy_on_write and item.player not in self._owned_players:
+            self.detach_player(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
@@ -1156,6 +1618,8 @@ class CollectionState():
         :param count: How many of the item to remove.
         """
         assert count > 0
+        if self.copy_on_write and player not in self._owned_players:
+            self.detach_player(player)
         self.prog_items[player][item] -= count
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
@@ -1169,6 +1633,8 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        if self.copy_on_write and player not in self._owned_players:
+            self.detach_player(player)
         if count == 0:
             del (self.prog_items[player][item])
         else:
@@ -1206,6 +1672,8 @@ class Entrance:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
         if self.parent_region.can_reach(state) and self.access_rule(state):
             if not self.hide_path and self not in state.path:
+                if "path" in state._shared_attributes:
+                    state.detach_attribute("path")
                 state.path[self] = (self.name, state.path.get(self.parent_region, (self.parent_region.name, None)))
             return True
 
@@ -1708,36 +2176,42 @@ class Spoiler:
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
         state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
 
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
+        # build up spheres of collection radius, reusing the logical spheres of all filled locations.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        cache = multiworld._get_spheres_cached()
+        for logical_sphere in cache.spheres:
+            for location in logical_sphere:
                 state.collect(location.item, True, location)
 
-            sphere_candidates -= sphere
+            sphere = logical_sphere & prog_locations
+            if not sphere:
+                continue
+            # bring regions up to date once, instead of in every copy made from the cached state
+            for player, stale in state.stale.items():
+                if stale:
+                    state.update_reachable_regions(player)
             collection_spheres.append(sphere)
             state_cache.append(state.copy())
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+
+        sphere_candidates = cache.unreachable & prog_locations
+        if sphere_candidates:
+            collection_spheres.append(set())
+            state_cache.append(state.copy())
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if not multiworld.has_beaten_game(state):
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {sphere_candidates}")
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
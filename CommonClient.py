@@ -23,7 +23,8 @@ if __name__ == "__main__":
 
 from MultiServer import CommandProcessor, mark_raw
 from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
-                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType)
+                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType,
+                      received_items_hash)
 from Utils import gui_enabled, Version, stream_input, async_start
 from worlds import network_data_package, AutoWorldRegister
 import os
@@ -355,6 +356,11 @@ class CommonContext:
     """
     items_received: list[NetworkItem]
     """List of NetworkItems recieved from the server"""
+    received_items_resume: tuple[tuple[str | None, str | None, int | None], list[NetworkItem]] | None
+    """
+    items_received of the lost connection, with the seed name, slot name and items_handling they were received with,
+    sent along with the next matching Connect to only receive new items
+    """
     missing_locations: set[int]
     """Container of Locations that are unchecked per server state"""
     checked_locations: set[int]
@@ -403,6 +409,7 @@ class CommonContext:
         self.locations_checked = set()  # local state
         self.locations_scouted = set()
         self.items_received = []
+        self.received_items_resume = None
         self.missing_locations = set()  # server state
         self.checked_locations = set()  # server state
         self.server_locations = set()  # all locations the server knows of, missing_location | checked_locations
@@ -454,6 +461,8 @@ class CommonContext:
         self.reset_server_state()
 
     def reset_server_state(self):
+        if self.items_received and self.auth:
+            self.received_items_resume = (self.seed_name, self.auth, self.items_handling), self.items_received
         self.auth = None
         self.slot = None
         self.team = None
@@ -524,6 +533,13 @@ class CommonContext:
         }
         if kwargs:
             payload.update(kwargs)
+        if self.received_items_resume:
+            resume_key, items = self.received_items_resume
+            self.received_items_resume = None
+            if resume_key == (self.seed_name, payload["name"], payload["items_handling"]) and \
+                    not self.items_received and "received_items" not in payload:
+                self.items_received = items
+                payload["received_items"] = {"index": len(items), "hash": received_items_hash(items)}
         await self.send_msgs([payload])
         await self.send_msgs([{"cmd": "Get", "keys": ["_read_race_mode"]}])
 
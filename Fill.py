@@ -1,11 +1,13 @@
 import collections
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock, Region
 from Options import Accessibility
+from Utils import report_generation_progress
 
 from worlds.AutoWorld import call_all
 from worlds.generic.Rules import add_item_rule
@@ -22,6 +24,7 @@ class FillError(RuntimeError):
 
 def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
     logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
+    report_generation_progress(f"fill ({name})", placed / total_items if total_items else None)
 
 
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
@@ -33,6 +36,91 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _PlacementIndex:
+    """
+    Finds the first location in `locations` that can be filled with an item under one maximum exploration state.
+
+    Locations are bucketed by player for single player placement and by whether they can take progression and useful
+    items. Locations in regions that aren't reachable under the state can't be filled and are left out of the buckets.
+    Region reachability only changes when the state collects items, so a new index is created for each state.
+    The buckets are built lazily while searching, so finding a spot early doesn't require checking every location.
+    """
+    __slots__ = ("state", "locations", "single_player_placement", "buckets", "region_reachable", "remaining", "taken")
+
+    state: CollectionState
+    locations: typing.List[Location]
+    """The locations to fill, in order of preference. Filled locations are removed from it."""
+    single_player_placement: bool
+    buckets: typing.Dict[typing.Tuple[typing.Optional[int], bool], typing.List[Location]]
+    """Locations of a player (or None if not single player placement) for items that are important or not."""
+    region_reachable: typing.Dict[Region, bool]
+    remaining: typing.Dict[typing.Tuple[typing.Optional[int], bool], typing.Iterator[Location]]
+    """Locations that were not yet considered for the bucket."""
+    taken: typing.Set[Location]
+
+    def __init__(self, state: CollectionState, locations: typing.List[Location], single_player_placement: bool) -> None:
+        self.state = state
+        self.locations = locations
+        self.single_player_placement = single_player_placement
+        self.buckets = {}
+        self.region_reachable = {}
+        self.remaining = {}
+        self.taken = set()
+
+    def _may_fill(self, location: Location, important: bool) -> bool:
+        """Whether the location could be filled with an item under the state, if its rules allow it."""
+        if location.always_allow is not Location.always_allow:
+            return True
+        if important and location.progress_type == LocationProgressType.EXCLUDED:
+            return False
+        region = location.parent_region
+        if (region is None or type(location).can_fill is not Location.can_fill
+                or type(location).can_reach is not Location.can_reach or type(region).can_reach is not Region.can_reach):
+            return True
+        reachable = self.region_reachable.get(region)
+        if reachable is None:
+            reachable = self.region_reachable[region] = region.can_reach(self.state)
+        return reachable
+
+    def _take(self, location: Location) -> Location:
+        self.locations.remove(location)
+        self.taken.add(location)
+        for bucket in self.buckets.values():
+            if location in bucket:
+                bucket.remove(location)
+        return location
+
+    def find(self, item: Item, check_access: bool) -> typing.Optional[Location]:
+        """Removes and returns the first location that can be filled with the item, or None if there is none."""
+        state = self.state
+        if not check_access:
+            for location in self.locations:
+                if (not self.single_player_placement or location.player == item.player) \
+                        and location.can_fill(state, item, False):
+                    return self._take(location)
+            return None
+
+        key = (item.player if self.single_player_placement else None, item.advancement or item.useful)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+            player, important = key
+            self.remaining[key] = (location for location in self.locations.copy()
+                                   if (player is None or location.player == player)
+                                   and self._may_fill(location, important))
+        for location in bucket:
+            if location.can_fill(state, item, True):
+                return self._take(location)
+        for location in self.remaining[key]:
+            if location in self.taken:
+                # filled from another bucket after this bucket was started
+                continue
+            bucket.append(location)
+            if location.can_fill(state, item, True):
+                return self._take(location)
+        return None
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -87,6 +175,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        placement_index = _PlacementIndex(maximum_exploration_state, locations, single_player_placement)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
@@ -105,15 +194,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
-            else:
+            spot_to_fill = placement_index.find(item_to_place, perform_access_check)
+            if spot_to_fill is None:
                 # we filled all reachable spots.
                 if swap:
                     # Keep a cache of previous safe swap states that might be usable to sweep from to produce the next
@@ -381,6 +463,7 @@ def accessibility_corrections(multiworld: MultiWorld,
             pool.append(location.item)
             location.item = None
             if location in state.advancements:
+                state.detach_attribute("advancements")
                 state.advancements.remove(location)
                 state.remove(location.item)
             locations.append(location)
@@ -769,6 +852,13 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        # The spheres following the current one, as found while looking ahead for balancing. They stay valid until
+        # items get swapped, so the following spheres don't have to be searched again.
+        lookahead_spheres: typing.Deque[typing.Set[Location]] = deque()
+        reused_sphere_count: int = 0
+        tested_item_count: int = 0
+        tried_swap_count: int = 0
+        balancing_start = time.perf_counter()
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
@@ -782,10 +872,15 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             return
 
         while True:
+            sphere_start = time.perf_counter()
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if lookahead_spheres:
+                sphere_locations = lookahead_spheres.popleft()
+                reused_sphere_count += 1
+            else:
+                sphere_locations = get_sphere_locations(state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -820,6 +915,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                    lookahead_index = 0
                     while True:
                         # Check locations in the current sphere and gather progression items to swap earlier
                         for location in balancing_sphere:
@@ -833,7 +929,12 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        if lookahead_index < len(lookahead_spheres):
+                            balancing_sphere = lookahead_spheres[lookahead_index]
+                        else:
+                            balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                            lookahead_spheres.append(balancing_sphere)
+                        lookahead_index += 1
                         for location in balancing_sphere:
                             balancing_unchecked_locations.remove(location)
                             if not location.locked:
@@ -858,6 +959,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         multiworld.random.shuffle(items_to_test)
                         while items_to_test:
                             testing = items_to_test.pop()
+                            tested_item_count += 1
                             reducing_state = state.copy()
                             for location in itertools.chain((
                                     l for l in items_to_replace
@@ -888,6 +990,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     # Start swapping items. Since we swap into earlier spheres, no need for accessibility checks. 
                     while replacement_locations and items_to_replace:
                         old_location = items_to_replace.pop()
+                        tried_swap_count += 1
                         for i, new_location in enumerate(replacement_locations):
                             if new_location.can_fill(state, old_location.item, False) and \
                                     old_location.can_fill(state, new_location.item, False):
@@ -903,6 +1006,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
                     if old_moved_item_count < moved_item_count:
                         logging.debug(f"Moved {moved_item_count} items so far\n")
+                        # the swapped items are now in different spheres
+                        lookahead_spheres.clear()
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
                             unchecked_locations.remove(location)
@@ -914,6 +1019,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 if location.advancement:
                     state.collect(location.item, True, location)
             checked_locations |= sphere_locations
+            logging.debug(f"Sphere {sphere_num - 1} took {time.perf_counter() - sphere_start:.4f} seconds.")
 
             if multiworld.has_beaten_game(state):
                 break
@@ -921,6 +1027,10 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
 
+        logging.info(f"Progression balancing took {time.perf_counter() - balancing_start:.2f} seconds for "
+                     f"{sphere_num - 1} spheres, {reused_sphere_count} of which were found while looking ahead. "
+                     f"Tested {tested_item_count} items, tried {tried_swap_count} swaps and kept {moved_item_count}.")
+
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
     """Swaps Items of locations. Does NOT swap flags like shop_slot or locked, but does swap event"""
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
+import hashlib
 import logging
+import multiprocessing
 import os
 import random
 import string
 import sys
+import time
 import urllib.parse
 import urllib.request
-from collections import Counter
-from itertools import chain
-from typing import Any
+from collections import Counter, defaultdict
+from itertools import chain, repeat
+from typing import Any, Callable, NamedTuple
 
 import ModuleUpdate
 
@@ -41,6 +45,28 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument('--outputpath', default=settings.general_options.output_path,
                         help="Path to output folder. Absolute or relative to cwd.")  # absolute or relative to cwd
     parser.add_argument('--race', action='store_true', default=defaults.race)
+    parser.add_argument('--compact_state', action='store_true', default=defaults.compact_state,
+                        help="Store collection state item counts in compact arrays, for cheaper state copies at a "
+                             "small cost per item lookup. Results are identical either way.")
+    parser.add_argument('--copy_on_write_state', action='store_true', default=defaults.copy_on_write_state,
+                        help="Share per-player data between copied collection states until it changes. Speeds up "
+                             "fill on multiworlds with many players, results are identical either way.")
+    parser.add_argument('--gen_workers', '--gen-workers', type=int, default=defaults.gen_workers,
+                        help="Number of worker processes to create isolated worlds in. Results are identical to "
+                             "generating in a single process.")
+    parser.add_argument('--options_cache', action='store_true', default=defaults.options_cache,
+                        help="Cache parsed player files and the verified options created from their chosen values "
+                             "in the user's cache directory. Random choices are still drawn for every seed. Speeds "
+                             "up generating from the same player files repeatedly, results are identical either "
+                             "way.")
+    parser.add_argument('--batch', type=int, default=0,
+                        help="Generate this many seeds in one process, starting at --seed or a random seed, "
+                             "and log the time spent in each stage.")
+    parser.add_argument('--seed_list', '--seed-list',
+                        help="Generate each of these comma separated seeds in one process, like --batch.")
+    parser.add_argument('--batch_workers', '--batch-workers', type=int, default=1,
+                        help="Number of worker processes to generate the seeds of a batch in. Workers are forked "
+                             "after loading the worlds, if supported by the system.")
     parser.add_argument('--meta_file_path', default=defaults.meta_file_path)
     parser.add_argument('--log_level', default=defaults.loglevel, help='Sets log level')
     parser.add_argument('--log_time', help="Add timestamps to STDOUT",
@@ -61,6 +87,8 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
 
     if args.skip_output and args.spoiler_only:
         parser.error("Cannot mix --skip_output and --spoiler_only")
+    elif args.batch and args.seed_list:
+        parser.error("Cannot mix --batch and --seed_list")
     elif args.spoiler == 0 and args.spoiler_only:
         parser.error("Cannot use --spoiler_only when --spoiler=0. Use --skip_output or set --spoiler to a different value")
 
@@ -77,9 +105,112 @@ def get_seed_name(random_source) -> str:
     return f"{random_source.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits)
 
 
+class OptionsCache:
+    """
+    Content addressed cache of parsed player files and of the options created from their documents, kept as files in
+    directory. Options are still rolled for every seed, drawing the same random numbers in the same order, but options
+    created and verified from a value chosen before are reused instead of being created again. Options that draw
+    random numbers or log anything while being created are always created again, so results are identical with and
+    without the cache. They are keyed by the file content, the plando options and a fingerprint of the Archipelago
+    version and all worlds, which changes with any world's version or files.
+    """
+    directory: str
+    _worlds_fingerprint: str | None
+
+    def __init__(self, directory: str | None = None) -> None:
+        self.directory = directory or Utils.cache_path("generate")
+        self._worlds_fingerprint = None
+
+    @property
+    def worlds_fingerprint(self) -> str:
+        if self._worlds_fingerprint is None:
+            from worlds.AutoWorld import AutoWorldRegister
+            fingerprint = hashlib.sha256(__version__.encode())
+            for path in (Options.__file__, __file__):
+                fingerprint.update(repr(self._stat(path)).encode())
+            for game, world_type in sorted(AutoWorldRegister.world_types.items()):
+                if world_type.zip_path:
+                    files = [str(world_type.zip_path)]
+                else:
+                    files = sorted(os.path.join(root, name)
+                                   for root, _, names in os.walk(os.path.dirname(world_type.__file__))
+                                   for name in names if name.endswith(".py"))
+                fingerprint.update(repr((game, world_type.world_version, [self._stat(file) for file in files]))
+                                   .encode())
+            self._worlds_fingerprint = fingerprint.hexdigest()
+        return self._worlds_fingerprint
+
+    @staticmethod
+    def _stat(path: str) -> tuple[str, int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return path, stat.st_size, stat.st_mtime_ns
+
+    def _load(self, category: str, key: str) -> Any:
+        path = os.path.join(self.directory, category, f"{key}.pickle")
+        try:
+            with open(path, "rb") as f:
+                return Utils.restricted_loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug(f"Could not load cached {category} {key}: {e}")
+            return None
+
+    def _store(self, category: str, key: str, value: Any) -> None:
+        folder = os.path.join(self.directory, category)
+        try:
+            data = Utils.restricted_dumps(value)
+            os.makedirs(folder, exist_ok=True)
+            temp_path = os.path.join(folder, f"{key}.{os.getpid()}.tmp")
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, os.path.join(folder, f"{key}.pickle"))
+        except Exception as e:
+            logging.debug(f"Could not cache {category} {key}: {e}")
+
+    def read_weights_yamls(self, path: str) -> tuple[str | None, tuple[Any, ...]]:
+        """Returns the content hash of the file at path and its documents, parsing them only if they are not cached.
+        Urls are not cached, their content hash is None."""
+        if urllib.parse.urlparse(path).scheme in ("https", "file"):
+            return None, read_weights_yamls(path)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except Exception as e:
+            raise Exception(f"Failed to read weights ({path})") from e
+        digest = hashlib.sha256(data).hexdigest()
+        documents = self._load("yaml", digest)
+        if documents is None:
+            documents = parse_weights_yamls(data)
+            self._store("yaml", digest, documents)
+        return digest, documents
+
+    def roll_settings(self, digest: str, doc_index: int, weights: dict,
+                      plando_options: PlandoOptions) -> argparse.Namespace:
+        """roll_settings for document doc_index of the file with content hash digest, reusing the options created and
+        verified from the same chosen values when it was rolled before."""
+        global _options_memo
+        key = hashlib.sha256(f"{digest} {doc_index} {plando_options.value} {self.worlds_fingerprint}".encode())\
+            .hexdigest()
+        memo = self._load("options", key) or {}
+        known_options = len(memo)
+        _options_memo = memo
+        try:
+            settings = roll_settings(weights, plando_options)
+        finally:
+            _options_memo = None
+        if len(memo) > known_options:
+            self._store("options", key, memo)
+        return settings
+
+
 def main(args=None) -> tuple[argparse.Namespace, int]:
     # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
-    if __name__ == "__main__" and "worlds" in sys.modules:
+    # batches load the worlds once after initializing their own logging.
+    if __name__ == "__main__" and "worlds" in sys.modules and not (args and (args.batch or args.seed_list)):
         raise Exception("Worlds system should not be loaded before logging init.")
 
     if not args:
@@ -95,10 +226,19 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
         logging.info("Race mode enabled. Using non-deterministic random source.")
         random.seed()  # reset to time-based random source
 
+    options_cache = OptionsCache() if args.options_cache else None
+    weights_digests: dict[str, str | None] = {}
+
+    def read_weights(key: str, path: str) -> tuple[Any, ...]:
+        if options_cache:
+            weights_digests[key], documents = options_cache.read_weights_yamls(path)
+            return documents
+        return read_weights_yamls(path)
+
     weights_cache: dict[str, tuple[Any, ...]] = {}
     if args.weights_file_path and os.path.exists(args.weights_file_path):
         try:
-            weights_cache[args.weights_file_path] = read_weights_yamls(args.weights_file_path)
+            weights_cache[args.weights_file_path] = read_weights(args.weights_file_path, args.weights_file_path)
         except Exception as e:
             raise ValueError(f"File {args.weights_file_path} is invalid. Please fix your yaml.") from e
         logging.info(f"Weights: {args.weights_file_path} >> "
@@ -129,7 +269,7 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
             path = os.path.join(args.player_files_path, fname)
             try:
                 weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
+                for doc_idx, yaml in enumerate(read_weights(fname, path)):
                     if yaml is None:
                         logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
                     else:
@@ -205,11 +345,18 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                             else:
                                 yaml[category_name][key] = option
 
+    def roll(key: str, doc_index: int, yaml: dict) -> argparse.Namespace:
+        digest = weights_digests.get(key, None)
+        # meta options are applied to the documents, so they no longer match their cached options
+        if options_cache and digest and not meta_weights:
+            return options_cache.roll_settings(digest, doc_index, yaml, args.plando)
+        return roll_settings(yaml, args.plando)
+
     settings_cache: dict[str, tuple[argparse.Namespace, ...] | None] = {fname: None for fname in weights_cache}
     if args.sameoptions:
         for fname, yamls in weights_cache.items():
             try:
-                settings_cache[fname] = tuple(roll_settings(yaml, args.plando) for yaml in yamls)
+                settings_cache[fname] = tuple(roll(fname, doc_index, yaml) for doc_index, yaml in enumerate(yamls))
             except Exception as e:
                 logging.exception(f"Exception reading settings in file {fname}")
                 player_errors.append(
@@ -242,7 +389,7 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                 # Use the cached settings object if it exists, otherwise roll settings within the try-catch
                 # Invariant: settings_cache[path] and weights_cache[path] have the same length
                 cached = settings_cache[path]
-                settings_object: argparse.Namespace = (cached[doc_index] if cached else roll_settings(yaml, args.plando))
+                settings_object: argparse.Namespace = (cached[doc_index] if cached else roll(path, doc_index, yaml))
 
                 for k, v in vars(settings_object).items():
                     if v is not None:
@@ -288,16 +435,112 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     return args, seed
 
 
+class BatchResult(NamedTuple):
+    seed: int
+    stage_times: dict[str, float]
+    """seconds spent in each stage reported by Utils.report_generation_progress, in order of first report"""
+    error: str | None
+
+
+def get_batch_seeds(args: argparse.Namespace) -> list[int]:
+    if args.seed_list:
+        return [int(seed) for seed in args.seed_list.split(",") if seed.strip()]
+    first_seed = get_seed(args.seed)
+    return [first_seed + index for index in range(args.batch)]
+
+
+def generate_batch_seed(args: argparse.Namespace, seed: int) -> BatchResult:
+    """Generates and outputs seed with a copy of args, timing the stages of generation."""
+    from Main import main as ERmain
+
+    stage_times: dict[str, float] = defaultdict(float)
+    current_stage, stage_start = "options", time.perf_counter()
+
+    def record_stage(stage: str, progress: float | None) -> None:
+        nonlocal current_stage, stage_start
+        if stage != current_stage:
+            now = time.perf_counter()
+            stage_times[current_stage] += now - stage_start
+            current_stage, stage_start = stage, now
+
+    seed_args = copy.deepcopy(args)
+    seed_args.seed = seed
+    error = None
+    Utils.set_generation_progress_callback(record_stage)
+    try:
+        erargs, seed = main(seed_args)
+        record_stage("setup", None)
+        ERmain(erargs, seed)
+    except Exception as e:
+        logging.exception(f"Generation of seed {seed} failed.")
+        error = Utils.get_all_causes(e)
+    finally:
+        record_stage("done", None)
+        Utils.set_generation_progress_callback(None)
+    return BatchResult(seed, dict(stage_times), error)
+
+
+def run_batch(args: argparse.Namespace) -> list[BatchResult]:
+    """
+    Generates the seeds of --batch or --seed_list, loading the worlds only once. With --batch_workers, the seeds are
+    generated in worker processes forked after loading them, sharing the loaded modules. Logs the time spent in each
+    stage once all seeds are done.
+    """
+    seeds = get_batch_seeds(args)
+    log_name = f"Generate_Batch_{seeds[0]}" if seeds else "Generate_Batch"
+    Utils.init_logging(log_name, loglevel=args.log_level, add_timestamp=args.log_time)
+    batch_log_file = next(handler.baseFilename for handler in logging.getLogger().handlers
+                          if isinstance(handler, logging.FileHandler))
+    start = time.perf_counter()
+    import worlds  # noqa: F401  # loaded before forking or generating the first seed
+    import Main  # noqa: F401
+    logging.info(f"Loaded worlds in {time.perf_counter() - start:.2f}s, generating {len(seeds)} seeds.")
+
+    workers = min(args.batch_workers, len(seeds))
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with concurrent.futures.ProcessPoolExecutor(workers, multiprocessing.get_context("fork")) as pool:
+            results = list(pool.map(generate_batch_seed, repeat(args), seeds))
+    else:
+        results = [generate_batch_seed(args, seed) for seed in seeds]
+
+    # each seed logs into its own file, append the summary to the timestamped batch log opened above
+    Utils.init_logging(os.path.splitext(os.path.basename(batch_log_file))[0], loglevel=args.log_level,
+                       add_timestamp=args.log_time, write_mode="a")
+    log_batch_summary(results, time.perf_counter() - start)
+    return results
+
+
+def log_batch_summary(results: list[BatchResult], total_time: float) -> None:
+    failed = [result for result in results if result.error]
+    logging.info(f"Generated {len(results) - len(failed)} of {len(results)} seeds in {total_time:.2f}s.")
+    stage_totals: dict[str, float] = defaultdict(float)
+    for result in results:
+        for stage, stage_time in result.stage_times.items():
+            stage_totals[stage] += stage_time
+    all_stages_time = sum(stage_totals.values()) or 1.
+    longest_name = max((len(stage) for stage in stage_totals), default=5)
+    logging.info(f"{'Stage':<{longest_name}}  {'Total':>9}  {'Per seed':>9}  {'Share':>6}")
+    for stage, stage_time in stage_totals.items():
+        logging.info(f"{stage:<{longest_name}}  {stage_time:>8.2f}s  {stage_time / len(results):>8.3f}s  "
+                     f"{stage_time / all_stages_time:>6.1%}")
+    for result in failed:
+        logging.error(f"Seed {result.seed} failed: {result.error}")
+
+
 def read_weights_yamls(path) -> tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
-            yaml = str(urllib.request.urlopen(path).read(), "utf-8-sig")
+            data = urllib.request.urlopen(path).read()
         else:
             with open(path, 'rb') as f:
-                yaml = str(f.read(), "utf-8-sig")
+                data = f.read()
     except Exception as e:
         raise Exception(f"Failed to read weights ({path})") from e
+    return parse_weights_yamls(data)
+
 
+def parse_weights_yamls(data: bytes) -> tuple[Any, ...]:
+    yaml = str(data, "utf-8-sig")
     from yaml.error import MarkedYAMLError
     try:
         return tuple(parse_yamls(yaml))
@@ -500,21 +743,61 @@ def roll_triggers(weights: dict, triggers: list, valid_keys: set) -> dict:
     return weights
 
 
+class _LogCounter(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+_options_memo: dict[tuple[str, str, str, str], Options.Option] | None = None
+"""while set, verified options by game, player name, option name and the repr of the value they were created from.
+Options that drew random numbers or logged anything while being created are left out, so using the others instead
+gives the same result as creating them again."""
+
+
+def _get_option(ret: argparse.Namespace, option_key: str, value: Any,
+                create: Callable[[], Options.Option]) -> Options.Option:
+    if _options_memo is None:
+        return create()
+    memo_key = (ret.game, ret.name, option_key, repr(value))
+    player_option = _options_memo.get(memo_key)
+    if player_option is None:
+        random_state = random.getstate()
+        log_counter = _LogCounter()
+        logging.getLogger().addHandler(log_counter)
+        try:
+            player_option = create()
+        finally:
+            logging.getLogger().removeHandler(log_counter)
+        if not log_counter.count and random.getstate() == random_state:
+            _options_memo[memo_key] = player_option
+    return player_option
+
+
 def handle_option(ret: argparse.Namespace, game_weights: dict, option_key: str, option: type[Options.Option], plando_options: PlandoOptions):
+    def create_option() -> Options.Option:
+        try:
+            player_option = option.from_any(value)
+        except Exception as e:
+            raise Options.OptionError(f"Error generating option {option_key} in {ret.game}") from e
+        from worlds import AutoWorldRegister
+        player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
+        return player_option
+
     try:
         if option_key in game_weights:
             if not option.supports_weighting:
-                player_option = option.from_any(game_weights[option_key])
+                value = game_weights[option_key]
             else:
-                player_option = option.from_any(get_choice(option_key, game_weights))
+                value = get_choice(option_key, game_weights)
         else:
-            player_option = option.from_any(option.default)  # call the from_any here to support default "random"
-        setattr(ret, option_key, player_option)
+            value = option.default  # call the from_any on it to support default "random"
     except Exception as e:
         raise Options.OptionError(f"Error generating option {option_key} in {ret.game}") from e
-    else:
-        from worlds import AutoWorldRegister
-        player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
+    setattr(ret, option_key, _get_option(ret, option_key, value, create_option))
 
 
 def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.bosses):
@@ -649,7 +932,12 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
-    erargs, seed = main()
+    generate_args = mystery_argparse()
+    if generate_args.batch or generate_args.seed_list:
+        batch_results = run_batch(generate_args)
+        atexit.unregister(confirmation)
+        sys.exit(1 if any(result.error for result in batch_results) else 0)
+    erargs, seed = main(generate_args)
     from Main import main as ERmain
     multiworld = ERmain(erargs, seed)
     if __debug__:
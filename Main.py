@@ -13,9 +13,9 @@ import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
-from NetUtils import convert_to_base_types
+from NetUtils import convert_to_base_types, encode_multidata
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import __version__, output_path, report_generation_progress, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -23,6 +23,68 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 __all__ = ["main"]
 
 
+class OutputArchive:
+    """
+    The final output zip, which output files are added to as soon as they are generated, while the rest of the output
+    is still being generated. Members are written by a worker thread, one at a time, as a zip can't be written to
+    concurrently. Files that don't compress, like patch containers that are zips themselves, are stored as is.
+    Written to a .part file that only replaces path once all output was generated successfully.
+    """
+    compression_sample_size = 64 * 1024
+    min_compression_ratio = 0.9
+    """store files whose compression sample doesn't shrink below this fraction of its size"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.zip_file = zipfile.ZipFile(self.part_path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+        self.pool = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="OutputArchive")
+        self.futures: list[concurrent.futures.Future[None]] = []
+
+    def __enter__(self) -> "OutputArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type:
+            for future in self.futures:
+                future.cancel()
+            self.pool.shutdown()
+            self.zip_file.close()
+            os.remove(self.part_path)
+            return
+        try:
+            for future in self.futures:
+                future.result()
+        finally:
+            self.pool.shutdown()
+            self.zip_file.close()
+        os.replace(self.part_path, self.path)
+
+    def add(self, path: str) -> None:
+        """Queues the file or directory at path to be written into the root of the archive."""
+        self.futures.append(self.pool.submit(self._write, path))
+
+    def add_directory_contents(self, directory: str) -> None:
+        for entry in os.scandir(directory):
+            self.add(entry.path)
+
+    def should_compress(self, path: str) -> bool:
+        with open(path, "rb") as f:
+            sample = f.read(self.compression_sample_size)
+        return len(zlib.compress(sample, 1)) < len(sample) * self.min_compression_ratio
+
+    def _write(self, path: str) -> None:
+        start = time.perf_counter()
+        name = os.path.basename(path)
+        if os.path.isfile(path) and not self.should_compress(path):
+            compress_type, method = zipfile.ZIP_STORED, "stored"
+        else:
+            compress_type, method = zipfile.ZIP_DEFLATED, "deflated"
+        self.zip_file.write(path, arcname=name, compress_type=compress_type)
+        logging.info(f"Archived {name} ({os.path.getsize(path)} bytes, {method}) "
+                     f"in {time.perf_counter() - start:.3f}s.")
+
+
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
@@ -48,6 +110,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         from Options import dump_player_options
         dump_player_options(multiworld)
     multiworld.set_item_links()
+    multiworld.compact_state = bool(args.compact_state)
+    multiworld.copy_on_write_state = bool(args.copy_on_write_state)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
@@ -108,14 +172,18 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.non_local_items.value = set()
         multiworld.worlds[1].options.local_items.value = set()
 
-    logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    if args.gen_workers > 1:
+        logger.info(f'Creating MultiWorld, Items and Access Rules with up to {args.gen_workers} workers.')
+        AutoWorld.call_all_isolated(multiworld, ("create_regions", "create_items", "set_rules"), args.gen_workers)
+    else:
+        logger.info('Creating MultiWorld.')
+        AutoWorld.call_all(multiworld, "create_regions")
 
-    logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+        logger.info('Creating Items.')
+        AutoWorld.call_all(multiworld, "create_items")
 
-    logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+        logger.info('Calculating Access Rules.')
+        AutoWorld.call_all(multiworld, "set_rules")
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -185,6 +253,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
+    report_generation_progress("item plando")
     resolve_early_locations_for_planned(multiworld)
     distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
                                            for x in multiworld.plando_item_blocks[player]])
@@ -194,6 +263,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     AutoWorld.call_all(multiworld, "pre_fill")
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
+    report_generation_progress("fill")
 
     if multiworld.algorithm == 'flood':
         flood_items(multiworld)  # different algo, biased towards early game progress items
@@ -203,6 +273,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
+        report_generation_progress("progression balancing")
         balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
@@ -229,23 +300,40 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
+    # logic is final, so the accessibility check, the multidata spheres and the playthrough share their logical spheres
+    multiworld.cache_spheres = True
+
+    zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+    logger.info(f"Creating final archive at {zipfilename}")
     output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    with output as temp_dir, OutputArchive(zipfilename) as archive:
+        def output_directory(name: str) -> str:
+            # each output task writes into its own directory, so its files can be archived as soon as it is done
+            directory = os.path.join(temp_dir, name)
+            os.mkdir(directory)
+            return directory
+
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
         with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+            stage_directory = output_directory("stage")
+            output_file_futures = {
+                pool.submit(AutoWorld.call_stage, multiworld, "generate_output", stage_directory): stage_directory
+            }
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                player_directory = output_directory(str(player))
+                output_file_futures[pool.submit(AutoWorld.call_single, multiworld, "generate_output", player,
+                                                player_directory)] = player_directory
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
             AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
 
+            multidata_directory = output_directory("multidata")
+
             def write_multidata():
                 import NetUtils
                 from NetUtils import HintStatus
@@ -353,13 +441,12 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
+                serialized_multidata = encode_multidata(multidata)
 
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
+                with open(os.path.join(multidata_directory, f'{outfilebase}.archipelago'), 'wb') as f:
                     f.write(serialized_multidata)
 
-            output_file_futures.append(pool.submit(write_multidata))
+            output_file_futures[pool.submit(write_multidata)] = multidata_directory
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -370,21 +457,21 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
             for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
+                report_generation_progress("output", i / len(output_file_futures))
                 future.result()
+                archive.add_directory_contents(output_file_futures[future])
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
+            report_generation_progress("playthrough")
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
-
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
-        logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+            spoiler_file = os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase)
+            multiworld.spoiler.to_file(spoiler_file)
+            archive.add(spoiler_file)
+
+        report_generation_progress("archive")
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
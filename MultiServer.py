@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
 import collections
 import contextlib
 import copy
@@ -13,9 +14,11 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -43,8 +46,8 @@ except ImportError:
 import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
-from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, encode_with_encoded_values, NetworkPlayer, \
+    Permission, NetworkSlot, SlotType, LocationStore, MultiData, Hint, HintStatus, received_items_hash
 from BaseClasses import ItemClassification
 
 
@@ -211,6 +214,353 @@ class Client(Endpoint):
 
 
 team_slot = typing.Tuple[int, int]
+save_record_header = struct.Struct("<I")  # length prefix of a record in a save journal file
+shared_game_data: weakref.WeakValueDictionary[typing.Tuple[str, str, str, str], typing.Any] = \
+    weakref.WeakValueDictionary()
+"""(kind, game, checksum, Archipelago checksum) -> read-only lookup built from a data package,
+shared by all Contexts of this process that use the same data package"""
+
+
+class SaveJournal:
+    """
+    Turns the changes between the last written save and the current one into compact records, so regular saves only
+    have to append what changed instead of writing a full snapshot. Records of the snapshot's generation are applied
+    on top of it with replay when loading. Applying a record more than once has the same result as applying it once.
+    """
+    compact_records: int = 1000
+    """number of records after which the next save writes a full snapshot instead"""
+    append_keys: typing.ClassVar[typing.FrozenSet[str]] = frozenset({"received_items"})
+    """keys of mappings to lists that are only appended to"""
+    mapping_keys: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "hints_used", "hints", "location_checks", "name_aliases", "client_game_state", "group_collected"})
+    pair_keys: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "client_activity_timers", "client_connection_timers", "video"})
+    """keys of mappings that are saved as sequences of key value pairs"""
+
+    generation: int
+    records: int
+    """records written since the snapshot"""
+    size: int
+    """bytes of records written since the snapshot"""
+    snapshot_size: int
+    changed_stored_data: typing.Set[str]
+    """keys of stored_data changed since the last save, as values may be modified in place"""
+    _saved: typing.Optional[typing.Dict[str, typing.Any]]
+    """copy of the last written save, None if a snapshot is required"""
+    _pending: typing.Optional[typing.Dict[str, typing.Any]]
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self.records = 0
+        self.size = 0
+        self.snapshot_size = 0
+        self.changed_stored_data = set()
+        self._saved = None
+        self._pending = None
+
+    @property
+    def needs_snapshot(self) -> bool:
+        return self._saved is None or self.records >= self.compact_records or self.size > self.snapshot_size
+
+    def invalidate(self) -> None:
+        """Require the next save to be a full snapshot, for example after a write failed."""
+        self._saved = None
+
+    def start_snapshot(self, save: typing.Dict[str, typing.Any]) -> None:
+        """Start a new generation with save as its snapshot. Call snapshot_written once it is written."""
+        self.generation += 1
+        save["journal_generation"] = self.generation
+        self.changed_stored_data = set()
+        self._pending = {key: self._copy(key, value) for key, value in save.items()}
+
+    def snapshot_written(self, size: int) -> None:
+        self._saved, self._pending = self._pending, None
+        self.records = 0
+        self.size = 0
+        self.snapshot_size = size
+
+    @classmethod
+    def _copy(cls, key: str, value: typing.Any) -> typing.Any:
+        if key in cls.append_keys:
+            return {subkey: len(items) for subkey, items in value.items()}
+        if key in cls.mapping_keys or key in cls.pair_keys:
+            return {subkey: frozenset(item) if isinstance(item, set) else item for subkey, item in dict(value).items()}
+        if key == "stored_data":
+            return None
+        return copy.deepcopy(value)
+
+    def record(self, save: typing.Dict[str, typing.Any]) -> typing.Optional[bytes]:
+        """Returns the encoded changes of save since the last written save, or None if nothing changed."""
+        assert self._saved is not None, "record requires a written snapshot"
+        saved = self._saved
+        changes: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+
+        def change(operation: str, key: str, subkey: typing.Any, value: typing.Any) -> None:
+            changes.setdefault(operation, {}).setdefault(key, {})[subkey] = value
+
+        for key, value in save.items():
+            if key in self.append_keys:
+                lengths = saved[key]
+                for subkey, items in value.items():
+                    length = lengths.get(subkey, 0)
+                    if len(items) < length:
+                        change("update", key, subkey, items)
+                    elif len(items) > length:
+                        change("extend", key, subkey, (length, items[length:]))
+                    lengths[subkey] = len(items)
+                for subkey in lengths.keys() - value.keys():
+                    change("remove", key, subkey, None)
+                    del lengths[subkey]
+            elif key in self.mapping_keys or key in self.pair_keys:
+                old_values = saved[key]
+                value = dict(value)
+                for subkey, item in value.items():
+                    old = old_values.get(subkey, None)
+                    if old == item and subkey in old_values:
+                        continue
+                    if isinstance(item, set):
+                        if isinstance(old, frozenset) and old <= item:
+                            change("add", key, subkey, item - old)
+                        else:
+                            change("update", key, subkey, item)
+                        old_values[subkey] = frozenset(item)
+                    else:
+                        change("update", key, subkey, item)
+                        old_values[subkey] = item
+                for subkey in old_values.keys() - value.keys():
+                    change("remove", key, subkey, None)
+                    del old_values[subkey]
+            elif key == "stored_data":
+                changed, self.changed_stored_data = self.changed_stored_data, set()
+                for name in changed:
+                    if name in value:
+                        change("update", key, name, value[name])
+            elif saved.get(key, None) != value:
+                changes.setdefault("set", {})[key] = value
+                saved[key] = copy.deepcopy(value)
+
+        if not changes:
+            return None
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded = zlib.compress(pickle.dumps({"generation": self.generation, **changes}))
+        self.records += 1
+        self.size += len(encoded)
+        return encoded
+
+    @classmethod
+    def replay(cls, save: typing.Dict[str, typing.Any], records: typing.Iterable[bytes]) -> typing.Dict[str, typing.Any]:
+        """Applies the records of the generation of save to it. Stops at the first record that can't be decoded,
+        which is expected to be the last one, cut off by a crash while writing it."""
+        generation = save.get("journal_generation", 0)
+        for encoded in records:
+            try:
+                record = restricted_loads(zlib.decompress(encoded))
+            except Exception:
+                break
+            if record["generation"] != generation:
+                continue
+            for key, value in record.get("set", {}).items():
+                save[key] = value
+            pair_keys = cls.pair_keys & (record.get("update", {}).keys() | record.get("remove", {}).keys())
+            for key in pair_keys:
+                save[key] = dict(save.get(key, ()))
+            for key, values in record.get("update", {}).items():
+                save.setdefault(key, {}).update(values)
+            for key, values in record.get("add", {}).items():
+                target = save.setdefault(key, {})
+                for subkey, added in values.items():
+                    target[subkey] = set(target.get(subkey, ())) | added
+            for key, values in record.get("extend", {}).items():
+                target = save.setdefault(key, {})
+                for subkey, (start, items) in values.items():
+                    target[subkey] = target.get(subkey, [])[:start] + items
+            for key, values in record.get("remove", {}).items():
+                target = save.get(key, {})
+                for subkey in values:
+                    target.pop(subkey, None)
+            for key in pair_keys:
+                save[key] = tuple(save[key].items())
+        return save
+
+
+class LatencyHistogram:
+    """Counts durations in seconds into buckets with the upper bounds in bounds, like a Prometheus histogram."""
+    bounds: typing.ClassVar[typing.Tuple[float, ...]] = (
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+    __slots__ = ("counts", "count", "sum", "max")
+
+    counts: typing.List[int]
+    """number of durations per bucket, the last one counting durations above all bounds"""
+    count: int
+    sum: float
+    max: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket that contains the q quantile, or max if it is above all bounds."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> typing.Dict[str, float]:
+        return {"count": self.count, "sum": self.sum, "max": self.max,
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+
+class ServerMetrics:
+    """
+    Counters and latency histograms of a Context for monitoring, available to clients with the _read_server_metrics
+    data storage key and to the host in the Prometheus text format with the /metrics command.
+    Command and message names come from clients, so only the ones of the network protocol get their own entry.
+    """
+    client_commands: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "Connect", "ConnectUpdate", "Sync", "LocationChecks", "LocationScouts", "CreateHints", "UpdateHint",
+        "StatusUpdate", "Say", "GetDataPackage", "Bounce", "Get", "Set", "SetNotify"})
+    server_commands: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "RoomInfo", "ConnectionRefused", "Connected", "ReceivedItems", "LocationInfo", "RoomUpdate", "PrintJSON",
+        "DataPackage", "Bounced", "InvalidPacket", "Retrieved", "SetReply"})
+    bucket_labels: typing.ClassVar[typing.Tuple[str, ...]] = tuple(
+        f'le="{bound}"' for bound in LatencyHistogram.bounds) + ('le="+Inf"',)
+
+    command_latency: typing.Dict[str, LatencyHistogram]
+    """time spent in process_client_cmd per command"""
+    sent_msgs: typing.Counter[str]
+    """messages sent per cmd of the first message of their encoded list, counting every endpoint they were sent to"""
+    sent_bytes: typing.Counter[str]
+    sent_frames: int
+    sent_batched_msgs: int
+    """calls of send_msgs, broadcast and similar per endpoint, that were batched into sent_frames"""
+    max_outbox_msgs: int
+    """most messages queued for one endpoint in one event loop tick"""
+    write_buffer_bytes: int
+    """bytes waiting to be sent to all endpoints by the transports, at the last sample"""
+    max_write_buffer_bytes: int
+    """most bytes waiting to be sent to one endpoint, at the last sample"""
+    stored_data_bytes: int
+    """encoded size of all values in the data storage"""
+    save_duration: LatencyHistogram
+    """time spent in the auto save thread per save"""
+    event_loop_lag: LatencyHistogram
+    """how late the event loop resumed a sleeping task, see monitor_server_metrics"""
+
+    def __init__(self) -> None:
+        self.command_latency = collections.defaultdict(LatencyHistogram)
+        self.sent_msgs = collections.Counter()
+        self.sent_bytes = collections.Counter()
+        self.sent_frames = 0
+        self.sent_batched_msgs = 0
+        self.max_outbox_msgs = 0
+        self.write_buffer_bytes = 0
+        self.max_write_buffer_bytes = 0
+        self.stored_data_bytes = 0
+        self.save_duration = LatencyHistogram()
+        self.event_loop_lag = LatencyHistogram()
+
+    def record_command(self, cmd: typing.Any, seconds: float) -> None:
+        if type(cmd) is not str or cmd not in self.client_commands:
+            cmd = "other"
+        self.command_latency[cmd].observe(seconds)
+
+    def record_sent(self, msg: str, endpoints: int = 1) -> None:
+        """Counts an encoded list of messages sent to a number of endpoints."""
+        cmd = msg[9:msg.find('"', 9)] if msg.startswith('[{"cmd":"') else "other"
+        if cmd not in self.server_commands:
+            cmd = "other"
+        self.sent_msgs[cmd] += endpoints
+        self.sent_bytes[cmd] += len(msg) * endpoints
+
+    def sample_write_buffers(self, endpoints: typing.Iterable[Endpoint]) -> None:
+        total = largest = 0
+        for endpoint in endpoints:
+            transport = getattr(endpoint.socket, "transport", None)
+            if transport:
+                size = transport.get_write_buffer_size()
+                total += size
+                largest = max(largest, size)
+        self.write_buffer_bytes = total
+        self.max_write_buffer_bytes = largest
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "commands": {cmd: histogram.as_dict() for cmd, histogram in self.command_latency.items()},
+            "sent_msgs": dict(self.sent_msgs),
+            "sent_bytes": dict(self.sent_bytes),
+            "sent_frames": self.sent_frames,
+            "sent_batched_msgs": self.sent_batched_msgs,
+            "max_outbox_msgs": self.max_outbox_msgs,
+            "write_buffer_bytes": self.write_buffer_bytes,
+            "max_write_buffer_bytes": self.max_write_buffer_bytes,
+            "stored_data_bytes": self.stored_data_bytes,
+            "save_duration": self.save_duration.as_dict(),
+            "event_loop_lag": self.event_loop_lag.as_dict(),
+        }
+
+    def summary(self) -> str:
+        """Returns the most important metrics in one line, such as for logs."""
+        commands = sum(histogram.count for histogram in self.command_latency.values())
+        slowest = max(self.command_latency.items(), key=lambda item: item[1].max, default=None)
+        return (f"{commands} commands" + (f", slowest {slowest[0]} {slowest[1].max * 1000:.1f} ms" if slowest else "") +
+                f", {sum(self.sent_msgs.values())} messages of "
+                f"{Utils.format_SI_prefix(sum(self.sent_bytes.values()), 1024)}B sent, "
+                f"max outbox {self.max_outbox_msgs} messages, "
+                f"write buffers {Utils.format_SI_prefix(self.write_buffer_bytes, 1024)}B, "
+                f"auto save p99 {self.save_duration.quantile(0.99) * 1000:.0f} ms, "
+                f"event loop lag p99 {self.event_loop_lag.quantile(0.99) * 1000:.0f} ms, "
+                f"max {self.event_loop_lag.max * 1000:.0f} ms")
+
+    def as_text(self, labels: str = "") -> str:
+        """Returns the metrics in the Prometheus text format, with labels such as 'room="1"' added to all of them."""
+        lines: typing.List[str] = []
+
+        def sample(name: str, metric_labels: typing.Iterable[str], value: typing.Any) -> None:
+            metric_labels = ",".join(filter(None, metric_labels))
+            lines.append(f"archipelago_{name}{{{metric_labels}}} {value}" if metric_labels else
+                         f"archipelago_{name} {value}")
+
+        def add(name: str, metric_type: str, values: typing.Iterable[typing.Tuple[str, typing.Any]]) -> None:
+            lines.append(f"# TYPE archipelago_{name} {metric_type}")
+            for metric_labels, value in values:
+                sample(name, (labels, metric_labels), value)
+
+        def add_histograms(name: str, histograms: typing.Iterable[typing.Tuple[str, LatencyHistogram]]) -> None:
+            lines.append(f"# TYPE archipelago_{name} histogram")
+            for metric_labels, data in histograms:
+                seen = 0
+                for bound, count in zip(self.bucket_labels, data.counts):
+                    seen += count
+                    sample(f"{name}_bucket", (labels, metric_labels, bound), seen)
+                sample(f"{name}_sum", (labels, metric_labels), data.sum)
+                sample(f"{name}_count", (labels, metric_labels), data.count)
+
+        add_histograms("command_seconds", [(f'cmd="{cmd}"', data)
+                                           for cmd, data in sorted(self.command_latency.items())])
+        add("sent_messages_total", "counter", [(f'cmd="{cmd}"', count) for cmd, count in sorted(self.sent_msgs.items())])
+        add("sent_bytes_total", "counter", [(f'cmd="{cmd}"', size) for cmd, size in sorted(self.sent_bytes.items())])
+        add("sent_frames_total", "counter", [("", self.sent_frames)])
+        add("sent_batched_messages_total", "counter", [("", self.sent_batched_msgs)])
+        add("max_outbox_messages", "gauge", [("", self.max_outbox_msgs)])
+        add("write_buffer_bytes", "gauge", [("", self.write_buffer_bytes)])
+        add("max_write_buffer_bytes", "gauge", [("", self.max_write_buffer_bytes)])
+        add("stored_data_bytes", "gauge", [("", self.stored_data_bytes)])
+        add_histograms("save_seconds", [("", self.save_duration)])
+        add_histograms("event_loop_lag_seconds", [("", self.event_loop_lag)])
+        return "\n".join(lines) + "\n"
 
 
 class Context:
@@ -226,7 +576,9 @@ class Context:
                       "collect_mode": str,
                       "countdown_mode": str,
                       "item_cheat": bool,
-                      "compatibility": int}
+                      "compatibility": int,
+                      "coalesce_set_replies": bool,
+                      "stored_data_size_limit": int}
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     endpoints: list[Client]
@@ -266,7 +618,9 @@ class Context:
         self.shutdown_task = None
         self.data_filename = None
         self.save_filename = None
+        self.journal_filename = None
         self.saving = False
+        self.save_journal: typing.Optional[SaveJournal] = None
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -278,6 +632,7 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.new_item_receivers: typing.Set[team_slot] = set()  # received items not yet sent by send_new_items
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -285,6 +640,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.location_hints: typing.Dict[typing.Tuple[int, int, int], Hint] = {}
+        """(team, finding_player, location) -> the hint for it, as stored in hints of every slot it concerns"""
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -313,8 +670,25 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.coalesce_set_replies: bool = False
+        """send one SetReply per key and event loop tick to the clients watching it, instead of one per Set"""
+        self.pending_set_replies: typing.Dict[str, dict] = {}
+        self.stored_data_size_limit: int = 0
+        """maximum encoded size of a value in stored_data in bytes, 0 for no limit"""
+        self.stored_data_sizes: typing.Dict[str, int] = {}
+        """encoded size of each value in stored_data, see set_stored_data_size"""
+        self.stored_data_sets: typing.Counter[str] = collections.Counter()
+        self.stored_data_set_replies: typing.Counter[str] = collections.Counter()
+        self.stored_data_notifications: typing.Counter[str] = collections.Counter()
+        """SetReply messages sent per key, the sum of the recipients of stored_data_set_replies"""
         self.read_data = {}
         self.spheres = []
+        self.encoded_cache: typing.Dict[typing.Hashable, str] = {}
+        """encoded data sent to many clients, such as game packages and slot data, see get_encoded"""
+        self.batch_messages: bool = True
+        """queue outgoing messages and send them as one frame per endpoint and event loop tick, see flush_outboxes"""
+        self.outboxes: typing.Dict[Endpoint, typing.List[str]] = {}
+        self.metrics = ServerMetrics()
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -344,29 +718,68 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, which an earlier Context in this process may have done already
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
+        archipelago_package = self.gamespackage.get("Archipelago", {"item_name_to_id": {}, "location_name_to_id": {}})
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
                 self.checksums[game_name] = game_package["checksum"]
-            for item_name, item_id in game_package["item_name_to_id"].items():
-                self.item_names[game_name][item_id] = item_name
-            for location_name, location_id in game_package["location_name_to_id"].items():
-                self.location_names[game_name][location_id] = location_name
-            self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
-            self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
-
-        archipelago_item_names = self.item_names["Archipelago"]
-        archipelago_location_names = self.location_names["Archipelago"]
-        for game in [game_name for game_name in self.gamespackage if game_name != "Archipelago"]:
+            checksums = (game_name, game_package.get("checksum", None), archipelago_package.get("checksum", None))
+            self.item_names[game_name] = self._get_shared_lookup(
+                "item_names", checksums,
+                lambda: self._build_names_lookup(game_name, game_package["item_name_to_id"],
+                                                 archipelago_package["item_name_to_id"], "Unknown item"))
+            self.location_names[game_name] = self._get_shared_lookup(
+                "location_names", checksums,
+                lambda: self._build_names_lookup(game_name, game_package["location_name_to_id"],
+                                                 archipelago_package["location_name_to_id"], "Unknown location"))
+            self.all_item_and_group_names[game_name] = self._get_shared_lookup(
+                "all_item_and_group_names", checksums,
+                lambda: set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name]))
+            self.all_location_and_group_names[game_name] = self._get_shared_lookup(
+                "all_location_and_group_names", checksums,
+                lambda: set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, [])))
+
+    @staticmethod
+    def _get_shared_lookup(kind: str, checksums: typing.Tuple[str, typing.Optional[str], typing.Optional[str]],
+                           build: typing.Callable[[], typing.Any]) -> typing.Any:
+        """Returns the lookup of kind for a game, shared with other Contexts of this process with the same data packages
+        as given by checksums, or built only for this Context if a data package has no checksum."""
+        if None in checksums:
+            return build()
+        key = (kind, *checksums)
+        lookup = shared_game_data.get(key, None)
+        if lookup is None:
+            lookup = shared_game_data[key] = build()
+        return lookup
+
+    @staticmethod
+    def _build_names_lookup(game_name: str, name_to_id: typing.Dict[str, int],
+                            archipelago_name_to_id: typing.Dict[str, int], unknown: str) -> Utils.KeyedDefaultDict:
+        lookup = Utils.KeyedDefaultDict(lambda code: f"{unknown} (ID:{code})",
+                                        {code: name for name, code in name_to_id.items()})
+        if game_name != "Archipelago":
             # Add Archipelago items and locations to each data package.
-            self.item_names[game].update(archipelago_item_names)
-            self.location_names[game].update(archipelago_location_names)
+            lookup.update((code, name) for name, code in archipelago_name_to_id.items())
+        return lookup
+
+    def get_encoded(self, key: typing.Hashable, get_data: typing.Callable[[], typing.Any]) -> str:
+        """Returns the encoded result of get_data, reusing it for the same key until removed from encoded_cache."""
+        encoded = self.encoded_cache.get(key, None)
+        if encoded is None:
+            encoded = self.encoded_cache[key] = self.dumper(get_data())
+        return encoded
+
+    def get_encoded_data_package(self, games: typing.Iterable[str]) -> str:
+        encoded_games = {game: self.get_encoded(("game", game), lambda game=game: self.gamespackage[game])
+                         for game in games}
+        return '[{"cmd":"DataPackage","data":{"games":' + encode_with_encoded_values({}, encoded_games) + '}}]'
+
+    def get_encoded_players_package(self) -> str:
+        return self.get_encoded("players", self.get_players_package)
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -375,48 +788,110 @@ class Context:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
     # General networking
+    # Messages are queued in the outbox of their endpoint and sent as one frame per endpoint at the end of the event
+    # loop tick, in the order they were queued. See batch_messages to send every message right away instead.
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception(f"Exception during send_msgs, could not send {msg}")
-            await self.disconnect(endpoint)
+        return await self.send_encoded_msgs(endpoint, self.dumper(msgs))
+
+    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        if not endpoint.socket or not endpoint.socket.open:
             return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
+        if self.batch_messages:
+            self._queue_encoded_msgs(endpoint, msg)
             return True
+        self.metrics.record_sent(msg)
+        return await self._send_frame(endpoint, msg)
 
-    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+    def queue_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> None:
+        """Sends msgs to endpoint without waiting for it, like async_start(send_msgs(...)) without a task."""
+        self.queue_encoded_msgs(endpoint, self.dumper(msgs))
+
+    def queue_encoded_msgs(self, endpoint: Endpoint, msg: str) -> None:
+        if not endpoint.socket or not endpoint.socket.open:
+            return
+        if self.batch_messages:
+            self._queue_encoded_msgs(endpoint, msg)
+        else:
+            self.metrics.record_sent(msg)
+            async_start(self._send_frame(endpoint, msg))
+
+    def _queue_encoded_msgs(self, endpoint: Endpoint, msg: str) -> None:
+        outbox = self.outboxes.get(endpoint, None)
+        if outbox is None:
+            if not self.outboxes:
+                asyncio.get_running_loop().call_soon(self.flush_outboxes)
+            self.outboxes[endpoint] = [msg]
+        else:
+            outbox.append(msg)
+
+    def flush_outboxes(self) -> None:
+        """Sends the queued messages as one frame per endpoint, broadcasting frames that multiple endpoints get."""
+        outboxes, self.outboxes = self.outboxes, {}
+        # endpoints that only got the same broadcasts share their frame, identified by the queued objects
+        frames: typing.Dict[typing.Tuple[int, ...], typing.Tuple[typing.List[str], typing.List[Endpoint]]] = {}
+        for endpoint, msgs in outboxes.items():
+            frames.setdefault(tuple(map(id, msgs)), (msgs, []))[1].append(endpoint)
+        metrics = self.metrics
+        metrics.sent_frames += len(outboxes)
+        metrics.sent_batched_msgs += sum(map(len, outboxes.values()))
+        metrics.max_outbox_msgs = max(metrics.max_outbox_msgs, max(map(len, outboxes.values()), default=0))
+        for msgs, endpoints in frames.values():
+            for msg in msgs:
+                metrics.record_sent(msg, len(endpoints))
+            if len(msgs) == 1:
+                frame = msgs[0]
+            else:
+                frame = "[" + ",".join(msg[1:-1] for msg in msgs if msg != "[]") + "]"
+            if len(endpoints) == 1:
+                async_start(self._send_frame(endpoints[0], frame))
+            else:
+                self._broadcast_frame(endpoints, frame)
+
+    async def _send_frame(self, endpoint: Endpoint, frame: str) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
         try:
-            await endpoint.socket.send(msg)
+            await endpoint.socket.send(frame)
         except websockets.ConnectionClosed:
-            self.logger.exception("Exception during send_encoded_msgs")
+            self.logger.exception(f"Exception during send_msgs, could not send {frame}")
             await self.disconnect(endpoint)
             return False
         else:
             if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
+                self.logger.info(f"Outgoing message: {frame}")
             return True
 
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        if self.batch_messages:
+            self.broadcast_encoded(endpoints, msg)
+            return True
+        endpoints = [endpoint for endpoint in endpoints if endpoint.socket and endpoint.socket.open]
+        self.metrics.record_sent(msg, len(endpoints))
+        return self._broadcast_frame(endpoints, msg)
+
+    def broadcast_encoded(self, endpoints: typing.Iterable[Endpoint], msg: str) -> None:
+        if self.batch_messages:
+            for endpoint in endpoints:
+                if endpoint.socket and endpoint.socket.open:
+                    self._queue_encoded_msgs(endpoint, msg)
+        else:
+            async_start(self.broadcast_send_encoded_msgs(endpoints, msg))
+
+    def _broadcast_frame(self, endpoints: typing.Iterable[Endpoint], frame: str) -> bool:
         sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
                 sockets.append(endpoint.socket)
         try:
-            websockets.broadcast(sockets, msg)
+            websockets.broadcast(sockets, frame)
         except RuntimeError:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
             return False
         else:
             if self.log_network:
-                self.logger.info(f"Outgoing broadcast: {msg}")
+                self.logger.info(f"Outgoing broadcast: {frame}")
             return True
 
     def broadcast_all(self, msgs: typing.List[dict]):
@@ -427,7 +902,7 @@ class Context:
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast_encoded(endpoints, data)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -441,11 +916,11 @@ class Context:
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast_encoded(endpoints, data)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
         msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.broadcast_encoded(endpoints, msgs)
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -458,14 +933,13 @@ class Context:
         if not client.auth or client.no_text:
             return
         self.logger.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}])
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth or client.no_text:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
+                                 for text in texts])
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -487,18 +961,17 @@ class Context:
 
     @staticmethod
     def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        return NetUtils.decode_multidata(data)
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
 
         self.read_data = {}
+        self.encoded_cache.clear()
         # there might be a better place to put this.
         race_mode = decoded_obj.get("race_mode", 0)
         self.read_data["race_mode"] = lambda: race_mode
+        self.read_data["server_metrics"] = lambda: self.metrics.as_dict()
         mdata_ver = decoded_obj["minimum_versions"]["server"]
         if mdata_ver > version_tuple:
             raise RuntimeError(f"Supplied Multidata (.archipelago) requires a server of at least version {mdata_ver}, "
@@ -548,6 +1021,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self._index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -564,12 +1038,13 @@ class Context:
             if game_name in game_data_packages:
                 data = game_data_packages[game_name]
             self.logger.info(f"Loading embedded data package for game {game_name}")
-            self.gamespackage[game_name] = data
             self.item_name_groups[game_name] = data["item_name_groups"]
             if "location_name_groups" in data:
                 self.location_name_groups[game_name] = data["location_name_groups"]
-                del data["location_name_groups"]
-            del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
+            # remove groups from data package, but keep them in self.item_name_groups and self.location_name_groups,
+            # without modifying data, which may be shared with other Contexts
+            self.gamespackage[game_name] = {key: value for key, value in data.items()
+                                            if key not in ("item_name_groups", "location_name_groups")}
         self._init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
@@ -594,28 +1069,61 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            save_data = self.get_save()
+            if self.save_journal and not exit_save and not self.save_journal.needs_snapshot:
+                record = self.save_journal.record(save_data)
+                if record:
+                    with open(self.journal_filename, "ab") as f:
+                        f.write(save_record_header.pack(len(record)) + record)
+            else:
+                if self.save_journal:
+                    self.save_journal.start_snapshot(save_data)
+                # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+                encoded_save = zlib.compress(pickle.dumps(save_data))
+                with open(self.save_filename, "wb") as f:
+                    f.write(encoded_save)
+                # the snapshot contains everything recorded in the journal
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.journal_filename)
+                if self.save_journal:
+                    self.save_journal.snapshot_written(len(encoded_save))
         except Exception as e:
+            if self.save_journal:
+                self.save_journal.invalidate()
             self.logger.exception(e)
             return False
         else:
             return True
 
-    def init_save(self, enabled: bool = True):
+    def _read_save_records(self) -> typing.Iterator[bytes]:
+        try:
+            with open(self.journal_filename, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while position + save_record_header.size <= len(data):
+            length, = save_record_header.unpack_from(data, position)
+            position += save_record_header.size
+            yield data[position:position + length]
+            position += length
+
+    def init_save(self, enabled: bool = True, journal: bool = False):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self.journal_filename = self.save_filename + ".journal"
+            if journal:
+                self.save_journal = SaveJournal()
             try:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    self.set_save(SaveJournal.replay(save_data, self._read_save_records()))
+                    if self.save_journal:
+                        self.save_journal.generation = save_data.get("journal_generation", 0)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -637,7 +1145,9 @@ class Context:
                         time.sleep(max(1.0, next_wakeup))
                         if self.save_dirty:
                             self.logger.debug("Saving via thread.")
+                            start = time.perf_counter()
                             self._save()
+                            self.metrics.save_duration.observe(time.perf_counter() - start)
                     except OperationalError as e:
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
@@ -654,7 +1164,6 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
@@ -692,6 +1201,7 @@ class Context:
         self.hints.update(savedata["hints"])
 
         self.name_aliases.update(savedata["name_aliases"])
+        self.encoded_cache.pop("players", None)
         self.client_game_state.update(savedata["client_game_state"])
         self.client_connection_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
@@ -700,6 +1210,7 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        self._index_hints()
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -719,6 +1230,10 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+            self.stored_data_sizes = {}
+            self.metrics.stored_data_bytes = 0
+            for key, value in self.stored_data.items():
+                self.set_stored_data_size(key, len(encode(value)))
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -736,27 +1251,42 @@ class Context:
         """Refreshes the hints for the specified team/slot. Providing 'None' for either team or slot
         will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
         pair that has at least one hint modified will be added to the set.
+        Hints are refreshed when their location is checked, so this is only needed after external changes.
         """
-        for hint_team, hint_slot in self.hints:
+        for (hint_team, finding_player, _), hint in list(self.location_hints.items()):
             if team != hint_team and team is not None:
                 continue  # Check specified team only, all if team is None
-            if slot != hint_slot and slot is not None:
+            if slot is not None and slot != finding_player and slot not in self.slot_set(hint.receiving_player):
                 continue  # Check specified slot only, all if slot is None
-            new_hints: typing.Set[Hint] = set()
-            for hint in self.hints[hint_team, hint_slot]:
-                new_hint = hint.re_check(self, hint_team)
-                new_hints.add(new_hint)
-                if hint == new_hint:
-                    continue
-                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
-                    if changed is not None:
-                        changed.add((hint_team,player))
-                    if slot is not None and slot != player:
-                        self.replace_hint(hint_team, player, hint, new_hint)
-            self.hints[hint_team, hint_slot] = new_hints
+            self._recheck_hint(hint_team, hint, changed)
+
+    def recheck_location_hints(self, team: int, finding_player: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes the hints for the specified locations of finding_player, such as after they were checked.
+        If a set is passed for 'changed', each (team,slot) pair that has a hint modified will be added to the set."""
+        for location in locations:
+            hint = self.location_hints.get((team, finding_player, location), None)
+            if hint:
+                self._recheck_hint(team, hint, changed)
+
+    def _recheck_hint(self, team: int, hint: Hint, changed: typing.Optional[typing.Set[team_slot]]) -> None:
+        new_hint = hint.re_check(self, team)
+        if hint == new_hint:
+            return
+        for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+            if changed is not None:
+                changed.add((team, player))
+            self.replace_hint(team, player, hint, new_hint)
+
+    def _index_hints(self) -> None:
+        """Refreshes all hints and rebuilds location_hints, after hints were loaded."""
+        self.location_hints.clear()
+        for (team, slot), hints in self.hints.items():
+            hints = self.hints[team, slot] = {hint.re_check(self, team) for hint in hints}
+            for hint in hints:
+                self.location_hints[team, hint.finding_player, hint.location] = hint
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
     def get_sphere(self, player: int, location_id: int) -> int:
@@ -825,6 +1355,7 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.location_hints[team, hint.finding_player, hint.location] = hint
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
@@ -840,18 +1371,16 @@ class Context:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
                 for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                    self.queue_msgs(client, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.location_hints.get((team, finding_player, seeked_location), None)
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.location_hints[team, new_hint.finding_player, new_hint.location] = new_hint
     
     # "events"
 
@@ -878,6 +1407,43 @@ class Context:
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
+    def set_stored_data_size(self, key: str, size: int) -> None:
+        """Records the encoded size of the value of key in stored_data and updates the total in the metrics."""
+        self.metrics.stored_data_bytes += size - self.stored_data_sizes.get(key, 0)
+        self.stored_data_sizes[key] = size
+
+    def on_stored_data_set(self, client: Client, reply: dict) -> None:
+        """Sends the SetReply of a Set to its client if wanted and to the clients watching its key.
+        With coalesce_set_replies, the watching clients get one SetReply per key at the end of the event loop tick,
+        with the original_value before the first and the arguments of the last Set in that tick."""
+        key: str = reply["key"]
+        self.stored_data_sets[key] += 1
+        if not self.coalesce_set_replies:
+            targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+            if reply.get("want_reply", False):
+                targets.add(client)
+            self._broadcast_set_reply(key, targets, reply)
+            return
+        if reply.get("want_reply", False):
+            self._broadcast_set_reply(key, {client}, reply)
+        pending = self.pending_set_replies.get(key, None)
+        if pending:
+            reply = {**reply, "original_value": pending["original_value"]}
+        elif not self.pending_set_replies:
+            asyncio.get_running_loop().call_soon(self.flush_set_replies)
+        self.pending_set_replies[key] = reply
+
+    def flush_set_replies(self) -> None:
+        pending, self.pending_set_replies = self.pending_set_replies, {}
+        for key, reply in pending.items():
+            self._broadcast_set_reply(key, set(self.stored_data_notification_clients[key]), reply)
+
+    def _broadcast_set_reply(self, key: str, targets: typing.Set[Client], reply: dict) -> None:
+        if targets:
+            self.stored_data_set_replies[key] += 1
+            self.stored_data_notifications[key] += len(targets)
+            self.broadcast(targets, [reply])
+
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
         targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
@@ -886,12 +1452,12 @@ class Context:
 
 
 def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
+    ctx.encoded_cache.pop("players", None)
+    cmd = "[" + encode_with_encoded_values({"cmd": "RoomUpdate"}, {"players": ctx.get_encoded_players_package()}) + "]"
 
     for clients in ctx.clients[team].values():
         for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+            ctx.queue_encoded_msgs(client, cmd)
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -1067,21 +1633,37 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
     return ctx.start_inventory.setdefault(player, []) if remote_start_inventory else []
 
 
+def get_resume_index(resume: typing.Any, items: typing.Sequence[NetworkItem]) -> int:
+    """Returns the number of items a reconnecting client already has according to the received_items of its Connect,
+    or 0 if they do not match the start of items."""
+    if not isinstance(resume, dict):
+        return 0
+    index = resume.get("index", 0)
+    if type(index) is not int or not 0 < index <= len(items) or \
+            resume.get("hash", None) != received_items_hash(itertools.islice(items, index)):
+        return 0
+    return index
+
+
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Send new items to the clients of the slots that received items since the last call."""
+    receivers = ctx.new_item_receivers
+    if not receivers:
+        return
+    ctx.new_item_receivers = set()
+    for team, slot in sorted(receivers):
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                ctx.queue_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1129,6 +1711,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_item_receivers.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1173,7 +1756,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1675,6 +2258,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_item_receivers.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1692,9 +2276,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1853,6 +2435,15 @@ def get_slot_points(ctx: Context, team: int, slot: int) -> int:
 
 
 async def process_client_cmd(ctx: Context, client: Client, args: dict):
+    start = time.perf_counter()
+    try:
+        await _process_client_cmd(ctx, client, args)
+    finally:
+        ctx.metrics.record_command(args.get("cmd", None) if isinstance(args, dict) else None,
+                                   time.perf_counter() - start)
+
+
+async def _process_client_cmd(ctx: Context, client: Client, args: dict):
     try:
         cmd: str = args["cmd"]
     except:
@@ -1920,45 +2511,49 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
-                "players": ctx.get_players_package(),
                 "missing_locations": get_missing_checks(ctx, team, slot),
                 "checked_locations": get_checked_checks(ctx, team, slot),
-                "slot_info": ctx.slot_info,
                 "hint_points": get_slot_points(ctx, team, slot),
             }
-            reply = [connected_packet]
+            # the same for every connecting client, so these are encoded once
+            encoded_values = {
+                "players": ctx.get_encoded_players_package(),
+                "slot_info": ctx.get_encoded("slot_info", lambda: ctx.slot_info),
+            }
+            reply = []
             start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
             items = get_received_items(ctx, client.team, client.slot, client.remote_items)
             if (start_inventory or items) and not client.no_items:
-                reply.append({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items})
-                client.send_index = len(start_inventory) + len(items)
+                all_items = start_inventory + items
+                index = get_resume_index(args.get("received_items", None), all_items)
+                if index < len(all_items):
+                    reply.append({"cmd": 'ReceivedItems', "index": index, "items": all_items[index:]})
+                client.send_index = len(all_items)
+            if args.get("slot_data", True):
+                encoded_values["slot_data"] = ctx.get_encoded(("slot_data", client.slot),
+                                                              lambda: ctx.slot_data[client.slot])
+            encoded_reply = encode_with_encoded_values(connected_packet, encoded_values)
+            if reply:
+                encoded_reply += "," + ctx.dumper(reply)[1:-1]
+            await ctx.send_encoded_msgs(client, "[" + encoded_reply + "]")
             if not client.auth:  # if this was a Re-Connect, don't print to console
                 client.auth = True
                 await on_client_joined(ctx, client)
-            if args.get("slot_data", True):
-                connected_packet["slot_data"] = ctx.slot_data[client.slot]
-            await ctx.send_msgs(client, reply)
 
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
+            await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
+            games = [name for name in ctx.gamespackage if name not in exclusions]
+            await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
 
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(ctx.gamespackage))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2180,18 +2775,27 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'Set', "original_cmd": cmd}])
                 return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
+            key = args["key"]
+            value = ctx.stored_data.get(key, args.get("default", 0))
             args["original_value"] = copy.copy(value)
             args["slot"] = client.slot
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
-            if args.get("want_reply", False):
-                targets.add(client)
-            if targets:
-                ctx.broadcast(targets, [args])
+            size = len(encode(value))
+            if ctx.stored_data_size_limit and size > ctx.stored_data_size_limit:
+                if key in ctx.stored_data:  # operations on containers modify them in place
+                    ctx.stored_data[key] = args["original_value"]
+                await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
+                                              "text": f"Set: value of {key} would exceed "
+                                                      f"{ctx.stored_data_size_limit} bytes",
+                                              "original_cmd": cmd}])
+                return
+            ctx.set_stored_data_size(key, size)
+            ctx.stored_data[key] = args["value"] = value
+            if ctx.save_journal:
+                ctx.save_journal.changed_stored_data.add(key)
+            ctx.on_stored_data_set(client, args)
             ctx.save()
 
         elif cmd == "SetNotify":
@@ -2545,17 +3149,23 @@ class ServerCommandProcessor(CommonCommandProcessor):
         return True
 
     def _cmd_datastore(self):
-        """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
-        total: int = 0
+        """Debug Tool: list writable datastorage keys, the encoded size of their values
+        and count their Sets and the SetReply messages sent for them."""
         texts = []
-        for key, value in self.ctx.stored_data.items():
-            size = len(pickle.dumps(value))
-            total += size
-            texts.append(f"Key: {key} | Size: {size}B")
+        for key in self.ctx.stored_data:
+            size = self.ctx.stored_data_sizes.get(key, 0)
+            texts.append(f"Key: {key} | Size: {size}B | Sets: {self.ctx.stored_data_sets[key]} | "
+                         f"SetReply broadcasts: {self.ctx.stored_data_set_replies[key]} | "
+                         f"SetReply messages: {self.ctx.stored_data_notifications[key]}")
         texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
-                        f"approximately totaling {Utils.format_SI_prefix(total, power=1024)}B")
+                        f"totaling {Utils.format_SI_prefix(self.ctx.metrics.stored_data_bytes, power=1024)}B")
         self.output("\n".join(texts))
 
+    def _cmd_metrics(self):
+        """Debug Tool: show command latencies, sent messages, outgoing queue sizes, the data storage size, auto save
+        durations and event loop lag in the Prometheus text format."""
+        self.output(self.ctx.metrics.as_text().rstrip())
+
 
 async def console(ctx: Context):
     import sys
@@ -2591,6 +3201,14 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--save_journal', default=defaults["save_journal"], action='store_true',
+                        help="Append changes to a journal next to the save file instead of rewriting it every time.")
+    parser.add_argument('--coalesce_set_replies', default=defaults["coalesce_set_replies"], action='store_true',
+                        help="Send clients watching a data storage key one SetReply per event loop tick, "
+                             "instead of one for every Set.")
+    parser.add_argument('--stored_data_size_limit', default=defaults["stored_data_size_limit"], type=int,
+                        help="Reject Sets that would make a data storage value larger than this many bytes. "
+                             "0 for no limit.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2649,6 +3267,20 @@ def parse_args() -> argparse.Namespace:
     return args
 
 
+async def monitor_server_metrics(get_contexts: typing.Callable[[], typing.Iterable[Context]],
+                                 interval: float = 1.) -> None:
+    """Samples the event loop lag and write buffers into the metrics of the contexts from get_contexts until cancelled.
+    Contexts sharing an event loop, like the rooms of a WebHost hoster, should share one monitor."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0., loop.time() - start - interval)
+        for ctx in get_contexts():
+            ctx.metrics.event_loop_lag.observe(lag)
+            ctx.metrics.sample_write_buffers(ctx.endpoints)
+
+
 async def auto_shutdown(ctx, to_cancel=None):
     with contextlib.suppress(asyncio.TimeoutError):
         await asyncio.wait_for(ctx.exit_event.wait(), ctx.auto_shutdown)
@@ -2692,6 +3324,8 @@ async def main(args: argparse.Namespace):
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
                   args.auto_shutdown, args.compatibility, args.log_network)
+    ctx.coalesce_set_replies = args.coalesce_set_replies
+    ctx.stored_data_size_limit = args.stored_data_size_limit
     data_filename = args.multidata
 
     if not data_filename:
@@ -2721,7 +3355,7 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
-    ctx.init_save(not args.disable_save)
+    ctx.init_save(not args.disable_save, args.save_journal)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
@@ -2738,6 +3372,7 @@ async def main(args: argparse.Namespace):
 
     await ctx.server
     console_task = asyncio.create_task(console(ctx))
+    metrics_task = asyncio.create_task(monitor_server_metrics(lambda: (ctx,)))
     if ctx.auto_shutdown:
         ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
 
@@ -2762,6 +3397,7 @@ async def main(args: argparse.Namespace):
 
     await ctx.exit_event.wait()
     console_task.cancel()
+    metrics_task.cancel()
     if ctx.shutdown_task:
         await ctx.shutdown_task
 
@@ -3,13 +3,17 @@ from __future__ import annotations
 from collections.abc import Mapping, Sequence
 import typing
 import enum
+import hashlib
+import heapq
+import struct
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, VersionException, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -95,15 +99,27 @@ class NetworkItem(typing.NamedTuple):
     flags: int = 0
 
 
+_plain_types = frozenset({str, int, float, bool, type(None)})
+_typed_tuple_fields: typing.Dict[type, typing.Tuple[typing.Tuple[str, ...], str]] = {}
+
+
 def _scan_for_TypedTuples(obj: typing.Any) -> typing.Any:
-    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
-        data = obj._asdict()
-        data["class"] = obj.__class__.__name__
+    obj_type = type(obj)
+    if obj_type is dict:
+        return {key: value if type(value) in _plain_types else _scan_for_TypedTuples(value)
+                for key, value in obj.items()}
+    fields = _typed_tuple_fields.get(obj_type, None)
+    if fields is None and isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent
+        fields = _typed_tuple_fields[obj_type] = obj_type._fields, obj_type.__name__
+    if fields is not None:
+        data = dict(zip(fields[0], obj))
+        data["class"] = fields[1]
         return data
     if isinstance(obj, (tuple, list, set, frozenset)):
-        return tuple(_scan_for_TypedTuples(o) for o in obj)
+        return [value if type(value) in _plain_types else _scan_for_TypedTuples(value) for value in obj]
     if isinstance(obj, dict):
-        return {key: _scan_for_TypedTuples(value) for key, value in obj.items()}
+        return {key: value if type(value) in _plain_types else _scan_for_TypedTuples(value)
+                for key, value in obj.items()}
     return obj
 
 
@@ -139,6 +155,24 @@ def encode(obj: typing.Any) -> str:
     return _encode(_scan_for_TypedTuples(obj))
 
 
+_python_encode = encode  # encode is replaced by the single pass encoder of _speedups, if available
+
+
+def encode_with_encoded_values(obj: typing.Mapping[str, typing.Any], encoded_values: typing.Mapping[str, str]) -> str:
+    """Encodes a dict like encode, followed by values that are already encoded, such as cached parts of a message."""
+    items = [encode(obj)[1:-1]] if obj else []
+    items.extend(f"{_encode(key)}:{value}" for key, value in encoded_values.items())
+    return "{" + ",".join(items) + "}"
+
+
+def received_items_hash(items: typing.Iterable[NetworkItem]) -> str:
+    """Identifies a sequence of received items, to let a reconnecting client resume ReceivedItems after them."""
+    hasher = hashlib.sha1()
+    for item in items:
+        hasher.update(b"%d:%d:%d:%d;" % (item.item, item.location, item.player, item.flags))
+    return hasher.hexdigest()
+
+
 def get_any_version(data: dict) -> Version:
     data = {key.lower(): value for key, value in data.items()}  # .NET version classes have capitalized keys
     return Version(int(data["major"]), int(data["minor"]), int(data["build"]))
@@ -415,8 +449,15 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _receiver_index: typing.Optional[typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int, int]]]]
+    """receiving player -> (position, finding player, location id, item id, receiving player, item flags)"""
+    _item_index: typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int, int]]]]
+    """receiving player -> item id -> entries of the receiver index, built per receiver on the first hint"""
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
+        self._receiver_index = None
+        self._item_index = {}
 
         if not self:
             raise ValueError(f"Rejecting game with 0 players")
@@ -427,20 +468,40 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+    def _get_received(self, slot: int) -> typing.List[typing.Tuple[int, int, int, int, int, int]]:
+        # Scanning all locations for every hint or collect stalls big rooms, so the locations are indexed by receiver
+        # the first time it is needed. The store is not changed after loading, so the index is never invalidated.
+        if self._receiver_index is None:
+            receiver_index: typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int, int]]] = {}
+            position = 0
+            for finding_player, check_data in self.items():
+                for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                    receiver_index.setdefault(receiving_player, []).append(
+                        (position, finding_player, location_id, item_id, receiving_player, item_flags))
+                    position += 1
+            self._receiver_index = receiver_index
+        return self._receiver_index.get(slot, [])
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        found = []
+        for slot in slots:
+            received_items = self._item_index.get(slot)
+            if received_items is None:
+                received = self._get_received(slot)
+                if not received:
+                    continue
+                received_items = self._item_index[slot] = {}
+                for entry in received:
+                    received_items.setdefault(entry[3], []).append(entry)
+            found.append(received_items.get(seeked_item_id, ()))
+        for entry in heapq.merge(*found):  # same order as the locations
+            yield entry[1:]
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        all_locations: typing.Dict[int, typing.Set[int]] = {}
+        for _, source_slot, location_id, *_ in self._get_received(slot):
+            all_locations.setdefault(source_slot, set()).add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
@@ -510,6 +571,202 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_format_version = 4
+"""Version of the multidata container format, stored in the first byte of .archipelago files.
+Versions up to 3 are a single compressed pickle of the whole MultiData."""
+
+multidata_sections: dict[str, bool] = {
+    "locations": True,
+    "slot_data": True,
+    "precollected_hints": True,
+    "datapackage": True,
+    "spheres": False,
+}
+"""MultiData keys stored in their own sections, and whether they are split further into a pickle per key."""
+
+multidata_section_size = 256 * 1024
+"""Uncompressed size up to which the pickles of consecutive keys of a split MultiData key share a section.
+Larger sections compress better, smaller ones are faster to decompress when reading a single key."""
+
+_multidata_header_size = struct.Struct("<I")
+
+
+def encode_multidata(multidata: MultiData) -> bytes:
+    """
+    Encodes multidata in the sectioned container format.
+
+    The format version byte is followed by the byte length of the header and the header, a compressed pickle of the
+    section index and the data package checksums. Then follow the sections, which are compressed independently, so
+    readers only have to decompress the sections they use. Each section holds the concatenated pickles of one or more
+    values, so readers also only unpickle the values they use.
+    """
+    sections: list[bytes] = []
+    section_spans: list[tuple[int, int]] = []
+    index: dict[tuple[str, typing.Any], tuple[int, int, int]] = {}
+    offset = 0
+    pending: list[bytes] = []
+    pending_size = 0
+
+    def end_section() -> None:
+        nonlocal offset, pending_size
+        if not pending:
+            return
+        section = zlib.compress(b"".join(pending), 9)
+        section_spans.append((offset, len(section)))
+        sections.append(section)
+        offset += len(section)
+        pending.clear()
+        pending_size = 0
+
+    def add_value(name: tuple[str, typing.Any], value: typing.Any) -> None:
+        nonlocal pending_size
+        pickled = restricted_dumps(value)
+        index[name] = len(sections), pending_size, pending_size + len(pickled)
+        pending.append(pickled)
+        pending_size += len(pickled)
+        if pending_size >= multidata_section_size:
+            end_section()
+
+    base = {key: value for key, value in multidata.items() if key not in multidata_sections}
+    add_value(("base", None), base)
+    end_section()
+    split_keys: dict[str, list[typing.Any]] = {}
+    for key, split in multidata_sections.items():
+        if key not in multidata:
+            continue
+        value = multidata[key]  # type: ignore[literal-required]
+        if split:
+            split_keys[key] = list(value)
+            for sub_key, sub_value in value.items():
+                add_value((key, sub_key), sub_value)
+        else:
+            add_value((key, None), value)
+        end_section()
+
+    header = zlib.compress(restricted_dumps({
+        "keys": list(multidata),
+        "sections": section_spans,
+        "index": index,
+        "split_keys": split_keys,
+        "datapackage_checksums": {game: game_data.get("checksum")
+                                  for game, game_data in multidata.get("datapackage", {}).items()},
+    }), 9)
+    return b"".join((bytes([multidata_format_version]), _multidata_header_size.pack(len(header)), header, *sections))
+
+
+class _LazySections(Mapping[typing.Any, typing.Any]):
+    """A split MultiData key, decoding each of its values on first access."""
+
+    def __init__(self, multidata: LazyMultiData, key: str, sub_keys: list[typing.Any]) -> None:
+        self._multidata = multidata
+        self._key = key
+        self._sub_keys = sub_keys
+        self._decoded: dict[typing.Any, typing.Any] = {}
+
+    def __getitem__(self, sub_key: typing.Any) -> typing.Any:
+        try:
+            return self._decoded[sub_key]
+        except KeyError:
+            if (self._key, sub_key) not in self._multidata.index:
+                raise
+        value = self._decoded[sub_key] = self._multidata.read_value((self._key, sub_key))
+        return value
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self._sub_keys)
+
+    def __len__(self) -> int:
+        return len(self._sub_keys)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._key}, {self._sub_keys})"
+
+
+class LazyMultiData(Mapping[str, typing.Any]):
+    """
+    Read-only MultiData in the sectioned format, decoding each value on first access.
+    The data can be bytes or any other buffer, which has to stay valid while this object is used.
+    """
+    sections: list[tuple[int, int]]
+    """Offset and size of each compressed section, relative to the end of the header."""
+    index: dict[tuple[str, typing.Any], tuple[int, int, int]]
+    """Section, and start and end of the pickle in the decompressed section, of each value."""
+    datapackage_checksums: dict[str, str | None]
+    """Checksums of the embedded data packages, available without decoding them."""
+
+    def __init__(self, data: typing.Any) -> None:
+        format_version = data[0]
+        if format_version != multidata_format_version:
+            raise ValueError(f"Multidata format {format_version} is not sectioned.")
+        header_start = 1 + _multidata_header_size.size
+        header_size, = _multidata_header_size.unpack(data[1:header_start])
+        header = restricted_loads(zlib.decompress(data[header_start:header_start + header_size]))
+        self._data = data
+        self._sections_start = header_start + header_size
+        self._section_cache: tuple[int, bytes] | None = None
+        self.sections = header["sections"]
+        self.index = header["index"]
+        self.datapackage_checksums = header["datapackage_checksums"]
+        self._base_values: dict[str, typing.Any] | None = None
+        self._values: dict[str, typing.Any] = {}
+        for key, sub_keys in header["split_keys"].items():
+            self._values[key] = _LazySections(self, key, sub_keys)
+        self._keys: list[str] = header["keys"]
+
+    def read_value(self, name: tuple[str, typing.Any]) -> typing.Any:
+        section, start, end = self.index[name]
+        if self._section_cache and self._section_cache[0] == section:
+            decompressed = self._section_cache[1]
+        else:
+            offset, size = self.sections[section]
+            offset += self._sections_start
+            decompressed = zlib.decompress(self._data[offset:offset + size])
+            # consecutive reads are usually of the same section, such as when decoding a split key in full
+            self._section_cache = section, decompressed
+        return restricted_loads(decompressed[start:end])
+
+    @property
+    def _base(self) -> dict[str, typing.Any]:
+        if self._base_values is None:
+            self._base_values = self.read_value(("base", None))
+        return self._base_values
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key in self._values:
+            return self._values[key]
+        if key in multidata_sections and (key, None) in self.index:
+            value = self._values[key] = self.read_value((key, None))
+            return value
+        return self._base[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> MultiData:
+        """Decodes all sections into a regular MultiData dict."""
+        return typing.cast(MultiData, {key: dict(value) if isinstance(value, _LazySections) else value
+                                       for key, value in self.items()})
+
+
+def decode_multidata(data: typing.Any, lazy: bool = False) -> MultiData | LazyMultiData:
+    """
+    Decodes multidata of any known format version.
+
+    :param data: The content of an .archipelago file, including the format version byte.
+    :param lazy: Return a LazyMultiData that only decodes the values that are accessed, if the format supports it.
+    """
+    format_version = data[0]
+    if format_version > multidata_format_version:
+        raise VersionException("Incompatible multidata.")
+    if format_version < multidata_format_version:
+        return restricted_loads(zlib.decompress(data[1:]))
+    multidata = LazyMultiData(data)
+    return multidata if lazy else multidata.to_dict()
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -532,3 +789,7 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+    try:
+        from _speedups import encode  # single pass, without converting the message first
+    except ImportError:
+        pass  # an outdated _speedups, already warned about above
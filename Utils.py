@@ -15,6 +15,7 @@ import io
 import collections
 import importlib
 import logging
+import threading
 import warnings
 
 from argparse import Namespace
@@ -1339,6 +1340,32 @@ class DaemonThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
             # NOTE: don't add to _threads_queues so we don't block on shutdown
 
 
+class GenerationCancelled(Exception):
+    """Raised by a generation progress callback to stop the generation at its next progress report."""
+
+
+_generation_progress = threading.local()
+
+
+def set_generation_progress_callback(callback: typing.Optional[typing.Callable[[str, typing.Optional[float]], None]]) \
+        -> None:
+    """Sets the callback receiving report_generation_progress of generations running in the current thread."""
+    _generation_progress.callback = callback
+
+
+def report_generation_progress(stage: str, progress: typing.Optional[float] = None) -> None:
+    """
+    Reports that generation in the current thread reached stage. Also serves as the point at which generation can be
+    cancelled, by the callback raising GenerationCancelled.
+
+    :param stage: Name of the current stage of generation.
+    :param progress: Fraction of stage that is done, if known.
+    """
+    callback = getattr(_generation_progress, "callback", None)
+    if callback:
+        callback(stage, progress)
+
+
 def get_full_typename(t: type) -> str:
     """Returns the full qualified name of a type, including its module (if not builtins)."""
     module = t.__module__
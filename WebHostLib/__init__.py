@@ -50,6 +50,8 @@ app.config["JOB_TIME"] = 600
 app.config["MAX_ROOM_TIMEOUT"] = 259200
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
+# estimated memory in bytes of decoded seeds and room saves kept between tracker requests, per web process
+app.config["TRACKER_MODEL_CACHE_SIZE"] = 268435456
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
 # archipelago.gg uses gunicorn + nginx; ignoring this option
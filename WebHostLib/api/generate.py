@@ -82,4 +82,10 @@ def wait_seed_api(seed: UUID):
         return {"text": "Generation not found"}, 404
     elif generation.state == STATE_ERROR:
         return {"text": "Generation failed"}, 500
+    progress = json.loads(generation.meta).get("progress", None)
+    if progress:
+        text = f"Generation running: {progress['stage']}"
+        if progress["progress"] is not None:
+            text += f" ({progress['progress']:.0%})"
+        return {"text": text, "progress": progress}, 202
     return {"text": "Generation running"}, 202
@@ -47,7 +47,7 @@ def _mp_gen_game(
 
     setproctitle(f"Generator ({sid})")
     try:
-        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
+        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout, exit_if_stuck=True)
     finally:
         setproctitle(f"Generator (idle)")
 
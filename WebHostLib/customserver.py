@@ -15,17 +15,17 @@ import typing
 import sys
 
 import websockets
-from pony.orm import commit, db_session, select
+from pony.orm import commit, db_session, delete, select
 
 import Utils
 
 from MultiServer import (
-    Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
-    server_per_message_deflate_factory,
+    Context, SaveJournal, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
+    server_per_message_deflate_factory, monitor_server_metrics,
 )
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, SaveRecord, db, get_save_records
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -136,9 +136,10 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = restricted_loads(row.data)
+                    game_data_package = get_game_data_package(game_data["checksum"])
+                    # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                    if game_data_package:
+                        game_data_packages[game] = game_data_package
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
@@ -155,24 +156,49 @@ class WebHostContext(Context):
             self.location_name_groups = static_location_name_groups
         return self._load(multidata, game_data_packages, True)
 
-    def init_save(self, enabled: bool = True):
+    def init_save(self, enabled: bool = True, journal: bool = True):
         self.saving = enabled
         if self.saving:
+            self.save_journal = SaveJournal() if journal else None
             with db_session:
-                savegame_data = Room.get(id=self.room_id).multisave
+                room = Room.get(id=self.room_id)
+                savegame_data = room.multisave
                 if savegame_data:
-                    self.set_save(restricted_loads(savegame_data))
+                    save_data = SaveJournal.replay(restricted_loads(savegame_data), get_save_records(room))
+                    self.set_save(save_data)
+                    if self.save_journal:
+                        self.save_journal.generation = save_data.get("journal_generation", 0)
             self._start_async_saving(atexit_save=False)
         asyncio.create_task(self.listen_to_db_commands())
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-        room.multisave = pickle.dumps(self.get_save())
-        # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
-        if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
-            room.last_activity = Utils.utcnow()
+        save_data = self.get_save()
+        snapshot_size = 0
+        try:
+            if self.save_journal and not exit_save and not self.save_journal.needs_snapshot:
+                record = self.save_journal.record(save_data)
+                if record:
+                    SaveRecord(room=room, generation=self.save_journal.generation, data=record)
+            else:
+                if self.save_journal:
+                    self.save_journal.start_snapshot(save_data)
+                # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+                room.multisave = pickle.dumps(save_data)
+                snapshot_size = len(room.multisave)
+                # the snapshot contains everything recorded in the journal
+                delete(record for record in SaveRecord if record.room == room)
+            # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
+            if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
+                room.last_activity = Utils.utcnow()
+            commit()
+        except BaseException:
+            if self.save_journal:
+                self.save_journal.invalidate()
+            raise
+        if snapshot_size and self.save_journal:
+            self.save_journal.snapshot_written(snapshot_size)
         return True
 
     def get_save(self) -> dict:
@@ -181,10 +207,34 @@ class WebHostContext(Context):
         return d
 
 
+metrics_report_interval = 600
+"""seconds between the logged metrics of the rooms of a hoster process that processed commands in that time"""
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
 
+game_data_package_cache: typing.OrderedDict[str, dict] = collections.OrderedDict()
+"""checksum -> data package loaded from GameDataPackage, shared read-only by all rooms of this process"""
+game_data_package_cache_size = 256
+
+
+def get_game_data_package(checksum: str) -> typing.Optional[dict]:
+    """Returns the data package with checksum, loading it from the database if it is not cached in this process."""
+    game_data_package = game_data_package_cache.get(checksum, None)
+    if game_data_package is None:
+        row = GameDataPackage.get(checksum=checksum)
+        if not row:
+            return None
+        game_data_package = game_data_package_cache[checksum] = restricted_loads(row.data)
+        if len(game_data_package_cache) > game_data_package_cache_size:
+            game_data_package_cache.popitem(last=False)
+    else:
+        game_data_package_cache.move_to_end(checksum)
+    return game_data_package
+
+
 @cache_argsless
 def get_static_server_data() -> dict:
     import worlds
@@ -291,6 +341,19 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    room_contexts: typing.Dict[int, WebHostContext] = {}
+
+    async def report_room_metrics():
+        reported_commands: typing.Dict[int, int] = {}
+        while True:
+            await asyncio.sleep(metrics_report_interval)
+            for room_id, ctx in list(room_contexts.items()):
+                commands = sum(histogram.count for histogram in ctx.metrics.command_latency.values())
+                if commands != reported_commands.get(room_id, 0):
+                    reported_commands[room_id] = commands
+                    logging.info(f"Room {room_id} on {name}: {ctx.metrics.summary()}")
+            for room_id in reported_commands.keys() - room_contexts.keys():
+                del reported_commands[room_id]
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -298,6 +361,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger = set_up_logging(room_id)
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
+                room_contexts[room_id] = ctx
                 ctx.init_save()
                 assert ctx.server is None
                 try:
@@ -369,6 +433,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                         room = Room.get(id=room_id)
                         room.last_activity = Utils.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
                     del room
+                    if room_contexts.pop(room_id, None):
+                        logging.info(f"Room {room_id} on {name}: {ctx.metrics.summary()}")
                     tear_down_logging(room_id)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
@@ -399,6 +465,9 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    # rooms share the event loop of the process, so its lag is sampled once for all of them
+    loop.create_task(monitor_server_metrics(room_contexts.values))
+    loop.create_task(report_room_metrics())
     try:
         loop.run_forever()
     finally:
@@ -1,8 +1,11 @@
 import concurrent.futures
 import json
+import logging
 import os
 import random
 import tempfile
+import threading
+import time
 import zipfile
 from collections import Counter
 from pickle import PicklingError
@@ -14,7 +17,8 @@ from pony.orm import commit, db_session
 from BaseClasses import get_seed, seeddigits
 from Generate import PlandoOptions, handle_name, mystery_argparse
 from Main import main as ERmain
-from Utils import __version__, restricted_dumps, DaemonThreadPoolExecutor
+from Utils import __version__, restricted_dumps, DaemonThreadPoolExecutor, GenerationCancelled, \
+    report_generation_progress, set_generation_progress_callback
 from WebHostLib import app
 from settings import ServerOptions, GeneratorOptions
 from .check import get_yaml_data, roll_options
@@ -118,14 +122,57 @@ def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
         return redirect(url_for("view_seed", seed=seed_id))
 
 
-def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None, sid=None, timeout: int|None = None):
+progress_interval = 1.
+"""minimum seconds between writing the progress of a generation to its Generation row"""
+cancel_grace = 10.
+"""seconds a timed out generation is given to reach its next progress report and stop"""
+
+
+def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None, sid=None, timeout: int|None = None,
+             exit_if_stuck: bool = False):
+    """
+    Generates a multiworld and uploads it, returning the id of the seed, or None if it timed out.
+
+    The generation runs in a thread that is cancelled at its next progress report once the timeout is exceeded.
+    With exit_if_stuck, the process exits if that does not happen within cancel_grace seconds, as the thread can't be
+    killed otherwise. Meant for generator processes of a pool, which replaces them.
+    """
     if meta is None:
         meta = {}
 
     meta.setdefault("server_options", {}).setdefault("hint_cost", 10)
     race = meta.setdefault("generator_options", {}).setdefault("race", False)
+    cancelled = threading.Event()
+    last_stage: str | None = None
+    last_write = 0.
+
+    def report_progress(stage: str, progress: float | None) -> None:
+        nonlocal last_stage, last_write
+        if cancelled.is_set():
+            raise GenerationCancelled(f"Generation cancelled during {stage}.")
+        now = time.monotonic()
+        if not sid or (stage == last_stage and now - last_write < progress_interval):
+            return
+        last_stage, last_write = stage, now
+        try:
+            with db_session:
+                gen = Generation.get(id=sid)
+                if gen is not None and gen.state != STATE_ERROR:
+                    gen_meta = json.loads(gen.meta)
+                    gen_meta["progress"] = {"stage": stage, "progress": progress}
+                    gen.meta = json.dumps(gen_meta)
+        except Exception:
+            # progress is informational, a locked database or similar must not fail the generation
+            logging.exception(f"Failed to store generation progress of {sid}.")
 
     def task():
+        set_generation_progress_callback(report_progress)
+        try:
+            return generate()
+        finally:
+            set_generation_progress_callback(None)
+
+    def generate():
         target = tempfile.TemporaryDirectory()
         playercount = len(gen_options)
         seed = get_seed()
@@ -171,6 +218,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
             raise Exception(f"Names have to be unique. Names: {Counter(args.name.values())}")
         ERmain(args, seed, baked_server_options=meta["server_options"])
 
+        report_generation_progress("upload")
         return upload_to_db(target.name, sid, owner, race)
 
     thread_pool = DaemonThreadPoolExecutor(max_workers=1)
@@ -179,6 +227,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
     try:
         return thread.result(timeout)
     except concurrent.futures.TimeoutError as e:
+        cancelled.set()
         if sid:
             with db_session:
                 gen = Generation.get(id=sid)
@@ -190,6 +239,9 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
                                      format_exception(e))
                     gen.meta = json.dumps(meta)
                     commit()
+        if exit_if_stuck and thread not in concurrent.futures.wait((thread,), cancel_grace).done:
+            logging.error(f"Generation {sid} did not stop after exceeding its allowed time, exiting its process.")
+            os._exit(1)
     except (KeyboardInterrupt, SystemExit):
         # don't update db, retry next time
         raise
@@ -206,8 +258,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         raise
     finally:
         # free resources claimed by thread pool, if possible
-        # NOTE: Timeout depends on the process being killed at some point
-        #       since we can't actually cancel a running gen at the moment.
+        # NOTE: a timed out gen only stops at its next progress report, see exit_if_stuck
         thread_pool.shutdown(wait=False, cancel_futures=True)
 
 
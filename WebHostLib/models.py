@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr, select
 
 from Utils import utcnow
 
@@ -28,6 +28,7 @@ class Room(db.Entity):
     commands = Set('Command')
     seed = Required('Seed', index=True)
     multisave = Optional(buffer, lazy=True)
+    save_records = Set('SaveRecord')  # changes since multisave, see MultiServer.SaveJournal
     show_spoiler = Required(int, default=0)  # 0 -> never, 1 -> after completion, -> 2 always
     timeout = Required(int, default=lambda: 2 * 60 * 60)  # seconds since last activity to shutdown
     tracker = Optional(UUID, index=True)
@@ -35,6 +36,30 @@ class Room(db.Entity):
     last_port = Optional(int, default=lambda: 0)
 
 
+class SaveRecord(db.Entity):
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    generation = Required(int)
+    data = Required(buffer, lazy=True)
+
+
+def get_save_records(room: Room) -> list[bytes]:
+    """Returns the journal records of the room's multisave, in the order they were written."""
+    return [data for _, data in sorted(select((record.id, record.data) for record in SaveRecord
+                                              if record.room == room))]
+
+
+def get_save_record_index(room: Room) -> list[tuple[int, int]]:
+    """Returns the ids and generations of the journal records of the room's multisave, without loading their data."""
+    return sorted(select((record.id, record.generation) for record in SaveRecord if record.room == room))
+
+
+def get_save_records_after(room: Room, record_id: int = 0) -> list[tuple[int, bytes]]:
+    """Returns the ids and data of the journal records of the room's multisave written after record_id, in order."""
+    return sorted(select((record.id, record.data) for record in SaveRecord
+                         if record.room == room and record.id > record_id))
+
+
 class Seed(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
     rooms = Set(Room)
@@ -1,18 +1,21 @@
 import datetime
 import collections
+import threading
+import time
+import typing
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
 from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
-from MultiServer import Context, get_saving_second
-from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from MultiServer import SaveJournal, get_saving_second
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType, decode_multidata
 from Utils import restricted_loads, KeyedDefaultDict, utcnow
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed, get_save_record_index, get_save_records_after
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
@@ -40,45 +43,193 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+class _ModelCache:
+    """Least recently used cache of decoded tracker data, limited by the estimated memory size of its entries.
+    Shared by all requests of this process, so cached values must not be modified."""
+    decoded_size_factor: int = 4
+    """rough ratio of the memory used by decoded data to the size of its encoding"""
+
+    def __init__(self) -> None:
+        self._entries: typing.OrderedDict[Hashable, Tuple[Any, int]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, encoded_size: int) -> None:
+        """Stores value, which was decoded from encoded_size bytes, evicting the least recently used entries."""
+        size = encoded_size * self.decoded_size_factor
+        max_size = app.config["TRACKER_MODEL_CACHE_SIZE"]
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            if size > max_size:
+                return
+            self._entries[key] = value, size
+            self.size += size
+            while self.size > max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_tracker_models = _ModelCache()
+
+
+class _GameNames(NamedTuple):
+    """Lookup tables of a data package, shared by all seeds using it."""
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+class _SeedModel(NamedTuple):
+    multidata: Mapping[str, Any]
+    item_id_to_name: Dict[str, Dict[int, str]]
+    location_id_to_name: Dict[str, Dict[int, str]]
+    item_name_to_id: Dict[str, Dict[str, int]]
+    location_name_to_id: Dict[str, Dict[str, int]]
+
+
+class _SaveModel(NamedTuple):
+    save: Dict[str, Any]
+    """multisave with the journal records up to last_record applied, replaced instead of modified on refresh"""
+    generation: int
+    last_record: int
+    """id of the last applied SaveRecord, 0 if none were"""
+    last_activity: datetime.datetime
+    loaded: float
+    """time.monotonic() of loading the multisave"""
+    encoded_size: int
+
+
+def _get_game_names(checksum: str) -> _GameNames:
+    names = _tracker_models.get(("game", checksum))
+    if names is None:
+        data = GameDataPackage.get(checksum=checksum).data
+        game_package = restricted_loads(data)
+        names = _GameNames(
+            KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+                id: name for name, id in game_package["item_name_to_id"].items()}),
+            KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+                id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        )
+        _tracker_models.put(("game", checksum), names, len(data))
+    return names
+
+
+def _get_seed_model(seed: Seed) -> _SeedModel:
+    """Returns the multidata of seed with the lookup tables of its games, decoding it if it is not cached."""
+    model = _tracker_models.get(("seed", seed.id))
+    if model is None:
+        data = seed.multidata
+        multidata = decode_multidata(data, lazy=True)
+        model = _SeedModel(
+            multidata,
+            KeyedDefaultDict(lambda game_name: {
+                game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
+            }),
+            KeyedDefaultDict(lambda game_name: {
+                game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
+            }),
+            {},
+            {},
+        )
+        for game, game_package in multidata["datapackage"].items():
+            names = _get_game_names(game_package["checksum"])
+            model.item_id_to_name[game] = names.item_id_to_name
+            model.location_id_to_name[game] = names.location_id_to_name
+            model.item_name_to_id[game] = names.item_name_to_id
+            model.location_name_to_id[game] = names.location_name_to_id
+        _tracker_models.put(("seed", seed.id), model, len(data))
+    return model
+
+
+def _load_save_model(room: Room) -> _SaveModel:
+    records = get_save_records_after(room)
+    encoded_size = 0
+    if room.multisave:
+        encoded_size = len(room.multisave) + sum(len(data) for _, data in records)
+        save = SaveJournal.replay(restricted_loads(room.multisave), (data for _, data in records))
+    else:
+        save = {}
+    return _SaveModel(save, save.get("journal_generation", 0), records[-1][0] if records else 0,
+                      room.last_activity, time.monotonic(), encoded_size)
+
+
+def _get_save_model(room: Room) -> _SaveModel:
+    """Returns the multisave of room, applying only the journal records written since it was cached.
+
+    A new snapshot deletes the records of the previous one, so records not continuing the cached ones require a reload.
+    The shutdown of a room writes a snapshot without updating last_activity, so a cached multisave without records
+    is only kept for TRACKER_CACHE_TIMEOUT_IN_SECONDS, like the tracker pages themselves.
+    """
+    model: Optional[_SaveModel] = _tracker_models.get(("room", room.id))
+    if model is not None:
+        index = get_save_record_index(room)
+        if not index:
+            if model.last_record or model.last_activity != room.last_activity or \
+                    time.monotonic() - model.loaded > TRACKER_CACHE_TIMEOUT_IN_SECONDS:
+                model = None
+        elif any(generation != model.generation for _, generation in index) or index[-1][0] < model.last_record:
+            model = None
+        elif index[-1][0] == model.last_record:
+            return model
+        else:
+            records = get_save_records_after(room, model.last_record)
+            # records only modify the mappings of the save in place, which are copied so readers are unaffected
+            save = {key: dict(value) if isinstance(value, dict) else value for key, value in model.save.items()}
+            model = model._replace(
+                save=SaveJournal.replay(save, (data for _, data in records)),
+                last_record=records[-1][0] if records else model.last_record,
+                last_activity=room.last_activity,
+                encoded_size=model.encoded_size + sum(len(data) for _, data in records))
+    if model is None:
+        model = _load_save_model(room)
+    _tracker_models.put(("room", room.id), model, model.encoded_size)
+    return model
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    The decoded multidata and multisave are kept between requests, see _get_seed_model and _get_save_model.
     """
     room: Room
-    _multidata: Dict[str, Any]
+    _multidata: Mapping[str, Any]
     _multisave: Dict[str, Any]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        seed_model = _get_seed_model(room.seed)
+        self._multidata = seed_model.multidata
+        self._multisave = _get_save_model(room).save
         self._tracker_cache = {}
 
-        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
-        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
-
-        # Generate inverse lookup tables from data package, useful for trackers.
-        self.item_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
-        })
-        self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
-        })
-        for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
-
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+        # Lookup tables from the data package, useful for trackers. Shared with other requests for the same seed.
+        self.item_id_to_name: Dict[str, Dict[int, str]] = seed_model.item_id_to_name
+        self.location_id_to_name: Dict[str, Dict[int, str]] = seed_model.location_id_to_name
+        self.item_name_to_id: Dict[str, Dict[str, int]] = seed_model.item_name_to_id
+        self.location_name_to_id: Dict[str, Dict[str, int]] = seed_model.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
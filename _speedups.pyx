@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -14,6 +13,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -31,28 +31,6 @@ ctypedef int64_t ap_id_t
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
-
 cdef struct LocationEntry:
     # layout is so that
     # 64bit player: location+sender and item+receiver 128bit comparisons, if supported
@@ -69,6 +47,25 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverEntry:
+    # sorted by receiver, item and entry, so items for a receiver are a range and keep the order of entries
+    ap_player_t receiver
+    ap_id_t item
+    size_t entry
+
+
+cdef int compare_receiver_entries(const void* a, const void* b) noexcept nogil:
+    cdef const ReceiverEntry* x = <const ReceiverEntry*>a
+    cdef const ReceiverEntry* y = <const ReceiverEntry*>b
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.entry != y.entry:
+        return -1 if x.entry < y.entry else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -92,6 +89,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ReceiverEntry* receiver_entries  # 2.4MB/100k items, built on first use
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, NULL until built
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -106,6 +106,8 @@ cdef class LocationStore:
         size += sum(sizeof(item) for item in self._items)
         size += sum(sizeof(proxy) for proxy in self._proxies)
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
+        if self.receiver_index:
+            size += sizeof(ReceiverEntry) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         return size
 
     def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
@@ -214,49 +216,89 @@ cdef class LocationStore:
     def items(self) -> Iterable[Tuple[int, PlayerLocationProxy]]:
         return self._items
 
+    cdef int _build_receiver_index(self) except -1:
+        # Scanning all entries for every hint or collect stalls big rooms, so this builds a second index
+        # of all entries sorted by receiver and item the first time it is needed.
+        cdef size_t i
+        cdef ap_player_t receiver
+        cdef ap_player_t max_receiver = 0
+        cdef IndexEntry* receiver_index
+        for i in range(self.entry_count):
+            max_receiver = max(max_receiver, self.entries[i].receiver)
+        receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
+        if self.entry_count:
+            self.receiver_entries = <ReceiverEntry*>self._mem.alloc(self.entry_count, sizeof(ReceiverEntry))
+            for i in range(self.entry_count):
+                self.receiver_entries[i].receiver = self.entries[i].receiver
+                self.receiver_entries[i].item = self.entries[i].item
+                self.receiver_entries[i].entry = i
+            qsort(self.receiver_entries, self.entry_count, sizeof(ReceiverEntry), compare_receiver_entries)
+            for i in range(self.entry_count):
+                receiver = self.receiver_entries[i].receiver
+                if not receiver_index[receiver].count:
+                    receiver_index[receiver].start = i
+                receiver_index[receiver].count += 1
+        self.receiver_index_size = max_receiver + 1
+        self.receiver_index = receiver_index
+        return 0
+
+    cdef size_t _find_received_item(self, ap_player_t receiver, ap_id_t item) noexcept nogil:
+        # binary search for the first entry of item in the receiver's range
+        cdef size_t l = self.receiver_index[receiver].start
+        cdef size_t r = l + self.receiver_index[receiver].count
+        cdef size_t m
+        while l < r:
+            m = (l + r) // 2
+            if self.receiver_entries[m].item < item:
+                l = m + 1
+            else:
+                r = m
+        return l
+
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef size_t i
+        cdef size_t end
+        cdef LocationEntry* entry
+        cdef list found = []
+        if not self.receiver_index:
+            self._build_receiver_index()
+        for slot in slots:
+            if slot < 1 or slot >= self.receiver_index_size:
+                continue
+            receiver = slot
+            i = self._find_received_item(receiver, item)
+            end = self.receiver_index[receiver].start + self.receiver_index[receiver].count
+            while i < end and self.receiver_entries[i].item == item:
+                found.append(self.receiver_entries[i].entry)
+                i += 1
+        if len(slots) > 1:
+            found.sort()  # same order as entries
+        for i in found:
+            entry = self.entries + i
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
+        cdef ap_player_t receiver
+        cdef size_t i
+        cdef LocationEntry* entry
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
-        return all_locations
+        if not self.receiver_index:
+            self._build_receiver_index()
+        if slot < 1 or slot >= self.receiver_index_size:
+            return all_locations
+        receiver = slot
+        cdef size_t start = self.receiver_index[receiver].start
+        cdef size_t count = self.receiver_index[receiver].count
+        for i in range(start, start + count):
+            entry = self.entries + self.receiver_entries[i].entry
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
+        return dict(sorted(all_locations.items()))  # same order as entries
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
@@ -376,3 +418,128 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+# Single pass JSON encoder, giving the same output as NetUtils.encode without converting the message first.
+
+from json.encoder import encode_basestring as _encode_basestring, JSONEncoder
+
+cdef object encode_basestring = _encode_basestring
+cdef object _encode_json = JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':')).encode
+cdef object _int_repr = int.__repr__
+cdef object _float_repr = float.__repr__
+cdef dict _typed_tuple_formats = {}  # NamedTuple class -> (prefix of each field, suffix)
+
+
+cdef tuple _get_typed_tuple_format(type cls):
+    fields = cls._fields
+    prefixes = tuple(("," if i else "{") + encode_basestring(field) + ":" for i, field in enumerate(fields))
+    suffix = ("," if fields else "{") + '"class":' + encode_basestring(cls.__name__) + "}"
+    typed_tuple_format = (prefixes, suffix)
+    _typed_tuple_formats[cls] = typed_tuple_format
+    return typed_tuple_format
+
+
+cdef str _encode_float(double value, object obj):
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == -float("inf"):
+        return "-Infinity"
+    return _float_repr(obj)
+
+
+cdef str _encode_key(object key):
+    if isinstance(key, str):
+        return encode_basestring(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return '"' + _int_repr(key) + '"'
+    if isinstance(key, float):
+        return '"' + _encode_float(key, key) + '"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+cdef bint _encode_scalar(list chunks, object obj) except -1:
+    if obj is None:
+        chunks.append("null")
+    elif obj is True:
+        chunks.append("true")
+    elif obj is False:
+        chunks.append("false")
+    elif isinstance(obj, str):
+        chunks.append(encode_basestring(obj))
+    elif isinstance(obj, int):
+        chunks.append(_int_repr(obj))
+    elif isinstance(obj, float):
+        chunks.append(_encode_float(obj, obj))
+    else:
+        return False
+    return True
+
+
+cdef int _encode_dict(list chunks, dict obj, bint typed) except -1:
+    cdef bint first = True
+    chunks.append("{")
+    for key, value in obj.items():
+        if first:
+            first = False
+        else:
+            chunks.append(",")
+        chunks.append(_encode_key(key))
+        chunks.append(":")
+        _encode_value(chunks, value, typed)
+    chunks.append("}")
+    return 0
+
+
+cdef int _encode_sequence(list chunks, object obj, bint typed) except -1:
+    cdef bint first = True
+    chunks.append("[")
+    for value in obj:
+        if first:
+            first = False
+        else:
+            chunks.append(",")
+        _encode_value(chunks, value, typed)
+    chunks.append("]")
+    return 0
+
+
+cdef int _encode_value(list chunks, object obj, bint typed) except -1:
+    # typed: NamedTuples are encoded as dicts with their class and sets as lists, otherwise like json does
+    cdef tuple typed_tuple_format
+    cdef tuple prefixes
+    cdef Py_ssize_t i
+    if _encode_scalar(chunks, obj):
+        return 0
+    if isinstance(obj, dict):
+        return _encode_dict(chunks, obj, typed)
+    if isinstance(obj, tuple) and typed:
+        typed_tuple_format = _typed_tuple_formats.get(type(obj), None)
+        if typed_tuple_format is None and hasattr(obj, "_fields"):
+            typed_tuple_format = _get_typed_tuple_format(type(obj))
+        if typed_tuple_format is not None:
+            # fields are not converted, the same as NetUtils._scan_for_TypedTuples
+            prefixes = typed_tuple_format[0]
+            for i in range(len(prefixes)):
+                chunks.append(prefixes[i])
+                _encode_value(chunks, (<tuple>obj)[i], False)
+            chunks.append(typed_tuple_format[1])
+            return 0
+    if isinstance(obj, (list, tuple)) or (typed and isinstance(obj, (set, frozenset))):
+        return _encode_sequence(chunks, obj, typed)
+    chunks.append(_encode_json(obj))  # raises the same TypeError as json for unsupported types
+    return 0
+
+
+def encode(obj: Any) -> str:
+    cdef list chunks = []
+    _encode_value(chunks, obj, True)
+    return "".join(chunks)
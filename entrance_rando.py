@@ -233,6 +233,7 @@ class ERPlacementState:
         copied_state = self.collection_state.copy()
         # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
         # propagate back to the real multiworld.
+        copied_state.detach_player(self.world.player)
         copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
         copied_state.blocked_connections[self.world.player].remove(source_exit)
         copied_state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
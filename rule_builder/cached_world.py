@@ -6,7 +6,14 @@ from typing_extensions import override
 from BaseClasses import CollectionState, Item, MultiWorld, Region
 from worlds.AutoWorld import LogicMixin, World
 
-from .rules import Rule
+from .rules import CustomRuleRegister, Rule
+
+_RULE_DEPENDENCY_ATTRIBUTES = (
+    "rule_item_dependencies",
+    "rule_region_dependencies",
+    "rule_location_dependencies",
+    "rule_entrance_dependencies",
+)
 
 
 class CachedRuleBuilderWorld(World):
@@ -32,15 +39,70 @@ class CachedRuleBuilderWorld(World):
     rule_caching_enabled: ClassVar[bool] = True
     """Flag to inform rules that the caching system for this world is enabled. It should not be overridden."""
 
+    _rule_sweep_dependencies: dict[int, tuple[frozenset[str], bool]] | None
+    """Cache of get_rule_sweep_dependencies, reset whenever a dependency is registered"""
+
     def __init__(self, multiworld: MultiWorld, player: int) -> None:
         super().__init__(multiworld, player)
         self.rule_item_dependencies = defaultdict(set)
         self.rule_region_dependencies = defaultdict(set)
         self.rule_location_dependencies = defaultdict(set)
         self.rule_entrance_dependencies = defaultdict(set)
+        self._rule_sweep_dependencies = None
+
+    def __getstate__(self) -> dict[str, object]:
+        # rules are identified by their object ids, which change when pickled, so the rules themselves are pickled
+        rules = {id(rule): rule for rule in CustomRuleRegister.resolved_rules.values()}
+        state = self.__dict__.copy()
+        for attribute in _RULE_DEPENDENCY_ATTRIBUTES:
+            state[attribute] = {
+                name: [rules[rule_id] for rule_id in rule_ids if rule_id in rules]
+                for name, rule_ids in getattr(self, attribute).items()
+            }
+        state["_rule_sweep_dependencies"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        self.__dict__.update(state)
+        for attribute in _RULE_DEPENDENCY_ATTRIBUTES:
+            rules = cast(dict[str, list[Rule.Resolved]], state[attribute])
+            dependencies: dict[str, set[int]] = defaultdict(set)
+            for name, rule_list in rules.items():
+                dependencies[name] = {id(rule) for rule in rule_list}
+            setattr(self, attribute, dependencies)
+
+    def get_rule_sweep_dependencies(self) -> dict[int, tuple[frozenset[str], bool]]:
+        """Returns a mapping of rule id to the names of collected items that can change the rule's result, and whether
+        the rule depends on any region, location or entrance. Used by sweeps to only re-check rules that can change"""
+        if self._rule_sweep_dependencies is None:
+            mapped_names: dict[str, set[str]] = defaultdict(set)
+            for item_name, mapped_name in self.item_mapping.items():
+                mapped_names[mapped_name].add(item_name)
+
+            item_names: dict[int, set[str]] = defaultdict(set)
+            for item_name, rule_ids in self.rule_item_dependencies.items():
+                for rule_id in rule_ids:
+                    item_names[rule_id].add(item_name)
+                    item_names[rule_id] |= mapped_names.get(item_name, set())
+
+            spot_dependent: set[int] = set()
+            for dependencies in (
+                self.rule_region_dependencies,
+                self.rule_location_dependencies,
+                self.rule_entrance_dependencies,
+            ):
+                for rule_ids in dependencies.values():
+                    spot_dependent |= rule_ids
+
+            self._rule_sweep_dependencies = {
+                rule_id: (frozenset(item_names.get(rule_id, ())), rule_id in spot_dependent)
+                for rule_id in item_names.keys() | spot_dependent
+            }
+        return self._rule_sweep_dependencies
 
     @override
     def register_rule_dependencies(self, resolved_rule: Rule.Resolved) -> None:
+        self._rule_sweep_dependencies = None
         for item_name, rule_ids in resolved_rule.item_dependencies().items():
             self.rule_item_dependencies[item_name] |= rule_ids
         for region_name, rule_ids in resolved_rule.region_dependencies().items():
@@ -52,6 +114,7 @@ class CachedRuleBuilderWorld(World):
 
     def register_rule_builder_dependencies(self) -> None:
         """Register all rules that depend on locations or entrances with their dependencies"""
+        self._rule_sweep_dependencies = None
         for location_name, rule_ids in self.rule_location_dependencies.items():
             try:
                 location = self.get_location(location_name)
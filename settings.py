@@ -593,6 +593,15 @@ class ServerOptions(Group):
     class AutoShutdown(int):
         """Automatically shut down the server after this many seconds without new location checks, 0 to keep running"""
 
+    class CoalesceSetReplies(Bool):
+        """
+        Send clients watching a data storage key one SetReply per key and server tick, instead of one for every Set.
+        Reduces traffic for keys that are updated very often, but watchers only see the latest value of a tick.
+        """
+
+    class StoredDataSizeLimit(int):
+        """Maximum size of a single data storage value in bytes, Sets exceeding it are rejected. 0 for no limit."""
+
     class Compatibility(IntEnum):
         """
         Compatibility handling
@@ -615,6 +624,7 @@ class ServerOptions(Group):
     multidata: str | None = None
     savefile: str | None = None
     disable_save: bool = False
+    save_journal: bool = False
     loglevel: str = "info"
     logtime: bool = False
     server_password: ServerPassword | None = None
@@ -626,6 +636,8 @@ class ServerOptions(Group):
     remaining_mode: RemainingMode = RemainingMode("goal")
     countdown_mode: CountdownMode = CountdownMode("auto")
     auto_shutdown: AutoShutdown = AutoShutdown(0)
+    coalesce_set_replies: CoalesceSetReplies | bool = False
+    stored_data_size_limit: StoredDataSizeLimit = StoredDataSizeLimit(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
 
@@ -679,6 +691,37 @@ class GeneratorOptions(Group):
         OFF = 0
         ON = 1
 
+    class CompactState(IntEnum):
+        """
+        Store the item counts of collection states in compact per-player arrays during generation.
+        Makes state copies cheaper at a small cost per item lookup, results are identical either way.
+        """
+        OFF = 0
+        ON = 1
+
+    class CopyOnWriteState(IntEnum):
+        """
+        Share the per-player data of copied collection states during generation until a player's data changes.
+        Speeds up state copies in fill for multiworlds with many players.
+        """
+        OFF = 0
+        ON = 1
+
+    class OptionsCache(IntEnum):
+        """
+        Cache parsed player files and the verified options created from their chosen values in the user's cache
+        directory, keyed by file content and world versions. Random choices are still drawn for every seed.
+        Speeds up generating from the same player files repeatedly, results are identical either way.
+        """
+        OFF = 0
+        ON = 1
+
+    class GenWorkers(int):
+        """
+        Number of worker processes to create the regions, items and rules of worlds in. Only used for worlds that
+        declare isolated_generation and only on systems supporting fork. 1 generates everything in the main process.
+        """
+
     class PanicMethod(str):
         """
         What to do if the current item placements appear unsolvable.
@@ -694,6 +737,10 @@ class GeneratorOptions(Group):
     meta_file_path: MetaFilePath = MetaFilePath("meta.yaml")
     spoiler: Spoiler = Spoiler(3)
     race: Race = Race(0)
+    compact_state: CompactState = CompactState(0)
+    copy_on_write_state: CopyOnWriteState = CopyOnWriteState(0)
+    gen_workers: GenWorkers = GenWorkers(1)
+    options_cache: OptionsCache = OptionsCache(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
     loglevel: str = "info"
@@ -0,0 +1,85 @@
+def run_encode_benchmark(repetitions: int = 200) -> None:
+    """
+    Run a micro benchmark of NetUtils.encode over typical server messages, comparing converting NamedTuples before
+    encoding, as encode did before, against the pure python and the _speedups implementation.
+
+    :param repetitions: Number of times each message is encoded per implementation.
+    """
+    import logging
+    from json import JSONEncoder
+    from typing import Any, Callable
+
+    from time_it import TimeIt
+
+    import NetUtils
+    from NetUtils import Hint, JSONTypes, NetworkItem, NetworkPlayer, NetworkSlot, SlotType
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    json_encode = JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':')).encode
+
+    def scan(obj: Any) -> Any:
+        if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+            data = obj._asdict()
+            data["class"] = obj.__class__.__name__
+            return data
+        if isinstance(obj, (tuple, list, set, frozenset)):
+            return tuple(scan(o) for o in obj)
+        if isinstance(obj, dict):
+            return {key: scan(value) for key, value in obj.items()}
+        return obj
+
+    def converting_encode(obj: Any) -> str:
+        return json_encode(scan(obj))
+
+    def item_send(item: NetworkItem) -> dict:
+        return {"cmd": "PrintJSON", "type": "ItemSend", "receiving": 2, "item": item, "data": [
+            {"type": JSONTypes.player_id, "text": str(item.player)}, {"text": " sent "},
+            {"type": JSONTypes.item_id, "text": str(item.item), "player": 2, "flags": item.flags}, {"text": " to "},
+            {"type": JSONTypes.player_id, "text": "2"}, {"text": " ("},
+            {"type": JSONTypes.location_id, "text": str(item.location), "player": item.player}, {"text": ")"}]}
+
+    items = [NetworkItem(i, 1000 + i, i % 50 + 1, i % 4) for i in range(1000)]
+    messages: dict[str, list[dict]] = {
+        "ReceivedItems of 1000 items": [{"cmd": "ReceivedItems", "index": 0, "items": items}],
+        "100 PrintJSON ItemSend": [item_send(item) for item in items[:100]],
+        "Connected of 500 slots": [{
+            "cmd": "Connected", "team": 0, "slot": 1, "hint_points": 10,
+            "players": [NetworkPlayer(0, slot, f"Player{slot}", f"Player{slot}") for slot in range(1, 501)],
+            "missing_locations": list(range(500)), "checked_locations": list(range(500, 800)),
+            "slot_info": {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in range(1, 501)}}],
+        "200 hints": [{"cmd": "SetReply", "key": "_read_hints_0_1", "slot": 1, "original_value": [],
+                       "value": [Hint(1, i % 50 + 1, i, i, False) for i in range(200)]}],
+        "LocationInfo of 100 locations": [{"cmd": "LocationInfo", "locations": items[:100]}],
+        "Bounced DeathLink": [{"cmd": "Bounced", "tags": ["DeathLink"],
+                               "data": {"time": 1700000000.5, "source": "Player1", "cause": "Fell"}}],
+    }
+    encoders: dict[str, Callable[[Any], str]] = {
+        "converting first": converting_encode,
+        "pure python": NetUtils._python_encode,
+    }
+    if NetUtils.encode is not NetUtils._python_encode:
+        encoders["_speedups"] = NetUtils.encode
+    else:
+        logger.warning("_speedups not available, only benchmarking the pure python implementation.")
+
+    for name, message in messages.items():
+        expected = converting_encode(message)
+        times: dict[str, float] = {}
+        for encoder_name, encoder in encoders.items():
+            if encoder(message) != expected:
+                logger.error(f"{encoder_name} encodes {name} differently.")
+            with TimeIt(f"{repetitions} encodes of {name}, {encoder_name}", logger) as timer:
+                for _ in range(repetitions):
+                    encoder(message)
+            times[encoder_name] = timer.dif
+        logger.info(f"{name}: " + ", ".join(f"{encoder_name} {times['converting first'] / dif:.2f}x"
+                                            for encoder_name, dif in times.items()))
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_encode_benchmark()
@@ -0,0 +1,87 @@
+def run_fill_benchmark(players: int = 300, games: tuple[str, ...] = ("ChecksFinder", "A Short Hike", "Hylics 2"),
+                       seed: int = 0) -> None:
+    """
+    Run a benchmark of filling a large multiworld once for each CollectionState mode.
+
+    :param players: Number of slots in the generated multiworld. The games are assigned round-robin.
+    :param games: Games to build the multiworld from. Fast-generating games keep the focus on the fill itself.
+    :param seed: Seed used for every run. The placements of all runs are compared to be identical.
+    """
+    import argparse
+    import gc
+    import logging
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import MultiWorld, CollectionState
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+    from Fill import distribute_items_restrictive
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    gen_steps = (
+        "generate_early",
+        "create_regions",
+        "create_items",
+        "set_rules",
+        "connect_entrances",
+        "generate_basic",
+        "pre_fill",
+    )
+
+    # MultiWorld attributes to set for each mode
+    modes: dict[str, dict[str, bool]] = {
+        "regular": {},
+        "compact": {"compact_state": True},
+        "copy-on-write": {"copy_on_write_state": True},
+    }
+
+    def setup(mode: dict[str, bool]) -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: games[(player - 1) % len(games)] for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(seed)
+        args = argparse.Namespace()
+        for player in multiworld.player_ids:
+            world_type = AutoWorld.AutoWorldRegister.world_types[multiworld.game[player]]
+            for name, option in world_type.options_dataclass.type_hints.items():
+                player_options = getattr(args, name, {})
+                player_options[player] = option.from_any(option.default)
+                setattr(args, name, player_options)
+        multiworld.set_options(args)
+        for attribute, value in mode.items():
+            setattr(multiworld, attribute, value)
+        multiworld.state = CollectionState(multiworld)
+        for step in gen_steps:
+            call_all(multiworld, step)
+        return multiworld
+
+    placements: dict[str, list[tuple[str, int, str, int]]] = {}
+    for mode_name, mode in modes.items():
+        with TimeIt(f"{players} player setup with {mode_name} state", logger):
+            multiworld = setup(mode)
+        gc.collect()
+        gc.freeze()
+        with TimeIt(f"{players} player fill with {mode_name} state", logger):
+            distribute_items_restrictive(multiworld)
+        with TimeIt(f"{players} player accessibility check with {mode_name} state", logger):
+            multiworld.fulfills_accessibility()
+        gc.unfreeze()
+        placements[mode_name] = sorted(
+            (location.name, location.player, location.item.name, location.item.player)
+            for location in multiworld.get_filled_locations()
+        )
+
+    for mode_name, mode_placements in placements.items():
+        if mode_placements != placements["regular"]:
+            logger.error(f"Placements differ between regular and {mode_name} state.")
+    logger.info(f"Compared placements of {len(placements['regular'])} locations.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_fill_benchmark()
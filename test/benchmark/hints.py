@@ -0,0 +1,90 @@
+def run_hints_benchmark(players: int = 200, locations_per_player: int = 200, hints_per_player: int = 100,
+                        checks: int = 2000) -> None:
+    """
+    Run a benchmark of MultiServer location checks in a room with many hints, comparing refreshing the hints of only the
+    checked locations against rescanning all hints of the finding slot and its receivers after every check.
+
+    :param players: Number of slots.
+    :param locations_per_player: Number of locations per slot, sending items to random slots.
+    :param hints_per_player: Number of hinted locations per slot.
+    :param checks: Number of single location checks to register, in random order.
+    """
+    import asyncio
+    import logging
+    import random
+    import typing
+
+    from time_it import TimeIt
+
+    from MultiServer import Context, register_location_checks, team_slot
+    from NetUtils import Hint, LocationStore, NetworkSlot, SlotType
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.WARNING)
+
+    def scan_recheck_location_hints(ctx: Context, team: int, finding_player: int, locations: typing.Iterable[int],
+                                    changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        # register_location_checks before hints were indexed, refreshing every hint of the finding slot
+        new_hints: typing.Set[Hint] = set()
+        for hint in ctx.hints[team, finding_player]:
+            new_hint = hint.re_check(ctx, team)
+            new_hints.add(new_hint)
+            if hint == new_hint:
+                continue
+            for player in ctx.slot_set(hint.receiving_player) | {hint.finding_player}:
+                if changed is not None:
+                    changed.add((team, player))
+                if finding_player != player:
+                    ctx.replace_hint(team, player, hint, new_hint)
+        ctx.hints[team, finding_player] = new_hints
+
+    rng = random.Random(0)
+    locations = {player: {location: (location, rng.randint(1, players), 0) for location in range(locations_per_player)}
+                 for player in range(1, players + 1)}
+    all_checks = [(player, location) for player in locations for location in locations[player]]
+    planned_checks = rng.sample(all_checks, min(checks, len(all_checks)))
+
+    async def setup() -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.locations = LocationStore(locations)
+        ctx.clients[0] = {}
+        for slot in locations:
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Benchmark Game", SlotType.player)
+            ctx.clients[0][slot] = []
+        ctx.notify_hints(0, [Hint(locations[slot][location][1], slot, location, location, False)
+                             for slot in locations for location in range(hints_per_player)])
+        return ctx
+
+    async def check_all(ctx: Context) -> None:
+        for slot, location in planned_checks:
+            register_location_checks(ctx, 0, slot, [location])
+        await asyncio.sleep(0)
+
+    original_recheck_location_hints = Context.recheck_location_hints
+    hints: typing.Dict[str, typing.Dict[team_slot, typing.Set[Hint]]] = {}
+    try:
+        for mode, recheck_location_hints in (("rescanning hints", scan_recheck_location_hints),
+                                             ("indexed hints", original_recheck_location_hints)):
+            Context.recheck_location_hints = recheck_location_hints  # type: ignore[method-assign]
+            ctx = asyncio.run(setup())
+            with TimeIt(f"{len(planned_checks)} checks with {players * hints_per_player} hints, {mode}",
+                        logger) as timer:
+                asyncio.run(check_all(ctx))
+            hints[mode] = dict(ctx.hints)
+            logger.info(f"{len(planned_checks) / timer.dif * 60:.0f} checks per minute, {mode}.")
+    finally:
+        Context.recheck_location_hints = original_recheck_location_hints  # type: ignore[method-assign]
+
+    first, second = hints.values()
+    if first != second:
+        logger.error("Modes resulted in different hints.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_hints_benchmark()
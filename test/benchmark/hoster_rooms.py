@@ -0,0 +1,90 @@
+import typing
+
+
+def _host_rooms(rooms: int, custom_games: int, custom_games_per_room: int, shared: bool) -> typing.Tuple[int, int]:
+    """Loads the game data of rooms like a WebHost hoster process does, returning the max RSS in KiB before and after."""
+    import pickle
+    import resource
+
+    import MultiServer
+    from MultiServer import Context
+    from Utils import restricted_loads
+
+    class NoSharing(dict):
+        def __setitem__(self, key, value) -> None:
+            pass
+
+    if not shared:
+        MultiServer.shared_game_data = NoSharing()  # type: ignore[assignment]
+
+    contexts = [Context("", 0, "", "", 0, 0, False)]  # loads the static data packages shared by all rooms
+    static_gamespackage = contexts[0].gamespackage
+    static_item_name_groups = contexts[0].item_name_groups
+    custom_packages = {
+        f"Custom Game {game}": pickle.dumps({
+            "item_name_groups": {"Group": [f"Item {i}" for i in range(10)]},
+            "item_name_to_id": {f"Item {i}": i for i in range(2000)},
+            "location_name_groups": {},
+            "location_name_to_id": {f"Location {i}": i for i in range(5000)},
+            "checksum": f"custom{game}",
+        }) for game in range(custom_games)
+    }
+    loaded_packages: typing.Dict[str, dict] = {}
+
+    def get_game_data_package(game: str) -> dict:
+        if not shared:
+            return restricted_loads(custom_packages[game])
+        if game not in loaded_packages:
+            loaded_packages[game] = restricted_loads(custom_packages[game])
+        return loaded_packages[game]
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for room in range(rooms):
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = dict(static_gamespackage)
+        ctx.item_name_groups = dict(static_item_name_groups)
+        for i in range(custom_games_per_room):
+            game = f"Custom Game {(room + i) % custom_games}"
+            data = get_game_data_package(game)
+            ctx.item_name_groups[game] = data["item_name_groups"]
+            ctx.gamespackage[game] = {key: value for key, value in data.items()
+                                      if key not in ("item_name_groups", "location_name_groups")}
+        ctx._init_game_data()
+        contexts.append(ctx)
+    return before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_hoster_rooms_benchmark(rooms: int = 200, custom_games: int = 10, custom_games_per_room: int = 3) -> None:
+    """
+    Run a benchmark of the memory of a WebHost hoster process running many rooms, comparing the game data lookups and
+    custom data packages being shared by all rooms of the process against every room loading its own.
+    Each mode runs in a fresh process, as memory is not returned to the system reliably.
+
+    :param rooms: Number of rooms hosted by the process.
+    :param custom_games: Number of distinct custom data packages, loaded from the database in WebHost.
+    :param custom_games_per_room: Number of custom data packages used by each room.
+    """
+    import concurrent.futures
+    import logging
+    import multiprocessing
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    for mode, shared in (("lookups per room", False), ("shared lookups", True)):
+        with concurrent.futures.ProcessPoolExecutor(1, multiprocessing.get_context("spawn")) as executor:
+            with TimeIt(f"hosting {rooms} rooms, {mode}", logger):
+                before, after = executor.submit(_host_rooms, rooms, custom_games, custom_games_per_room,
+                                                shared).result()
+        logger.info(f"{mode}: {before / 1024:.0f} MiB with the static game data, {after / 1024:.0f} MiB with "
+                    f"{rooms} rooms, {(after - before) / rooms:.0f} KiB per room.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_hoster_rooms_benchmark()
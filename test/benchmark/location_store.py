@@ -0,0 +1,74 @@
+def run_location_store_benchmark(players: int = 1000, locations_per_player: int = 200, items_per_game: int = 100,
+                                 lookups: int = 1000) -> None:
+    """
+    Run a benchmark of the receiver lookups of LocationStore, which are used for collects and hints, against a scan of
+    all locations, for both the pure python and the _speedups implementation.
+
+    :param players: Number of slots in the store.
+    :param locations_per_player: Number of locations per slot, sending items to random slots.
+    :param items_per_game: Number of distinct item ids.
+    :param lookups: Number of collects and hints per implementation.
+    """
+    import logging
+    import random
+    import typing
+
+    from time_it import TimeIt
+
+    from NetUtils import LocationStore, _LocationStore
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    rng = random.Random(0)
+    data = {
+        player: {location: (rng.randrange(items_per_game), rng.randint(1, players), 0)
+                 for location in range(locations_per_player)}
+        for player in range(1, players + 1)
+    }
+    receivers = [rng.randint(1, players) for _ in range(lookups)]
+    items = [rng.randrange(items_per_game) for _ in range(lookups)]
+
+    def scan_for_player(store: typing.Any, slot: int) -> typing.Dict[int, typing.Set[int]]:
+        all_locations: typing.Dict[int, typing.Set[int]] = {}
+        for source_slot, location_data in store.items():
+            for location_id, values in location_data.items():
+                if values[1] == slot:
+                    all_locations.setdefault(source_slot, set()).add(location_id)
+        return all_locations
+
+    stores = {"pure python": _LocationStore(data)}
+    if LocationStore is not _LocationStore:
+        stores["_speedups"] = LocationStore(data)
+    else:
+        logger.warning("_speedups not available, only benchmarking the pure python implementation.")
+
+    for name, store in stores.items():
+        scan_lookups = max(1, lookups // 100)
+        with TimeIt(f"{scan_lookups} collects scanning all locations of {name}", logger) as scan_timer:
+            for receiver in receivers[:scan_lookups]:
+                scan_for_player(store, receiver)
+        with TimeIt(f"first collect of {name}, building the index", logger):
+            store.get_for_player(receivers[0])
+        with TimeIt(f"{lookups} collects of {name}", logger) as timer:
+            for receiver in receivers:
+                store.get_for_player(receiver)
+        logger.info(f"Collects of {name} are {scan_timer.dif / scan_lookups / (timer.dif / lookups):.0f}x faster "
+                    f"than scanning.")
+        with TimeIt(f"{lookups} single slot hints of {name}", logger):
+            for receiver, item in zip(receivers, items):
+                list(store.find_item({receiver}, item))
+        with TimeIt(f"{lookups} hints for 10 slots of {name}", logger):
+            for i, item in enumerate(items):
+                list(store.find_item(set(receivers[i:i + 10]), item))
+
+        for receiver in receivers[:10]:
+            if store.get_for_player(receiver) != scan_for_player(store, receiver):
+                logger.error(f"Collect of {name} differs from scanning all locations.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
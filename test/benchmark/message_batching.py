@@ -0,0 +1,96 @@
+def run_message_batching_benchmark(players: int = 200, locations_per_player: int = 100, checks_per_tick: int = 10,
+                                   ticks: int = 500) -> None:
+    """
+    Run a load test of MultiServer location checks with a connected client per slot, comparing sending every message
+    on its own against batching them into one frame per client and event loop tick.
+
+    :param players: Number of slots, each with a connected client.
+    :param locations_per_player: Number of locations per slot, sending items to random slots.
+    :param checks_per_tick: Number of single location checks handled in each event loop tick.
+    :param ticks: Number of event loop ticks.
+    """
+    import asyncio
+    import logging
+    import random
+    import time
+
+    from websockets.protocol import State
+
+    from time_it import TimeIt
+
+    from MultiServer import Client, Context, register_location_checks
+    from NetUtils import LocationStore, NetworkSlot, SlotType
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.WARNING)
+
+    class CountingSocket:
+        open = True
+        state = State.OPEN
+        extensions = ()
+        _fragmented_message_waiter = None
+        frames = 0
+        sent = 0
+
+        async def send(self, msg: str) -> None:
+            CountingSocket.frames += 1
+            CountingSocket.sent += len(msg)
+
+        def write_frame_sync(self, fin: bool, opcode: int, data: bytes) -> None:
+            CountingSocket.frames += 1
+            CountingSocket.sent += len(data)
+
+    rng = random.Random(0)
+    locations = {player: {location: (location, rng.randint(1, players), 0) for location in range(locations_per_player)}
+                 for player in range(1, players + 1)}
+    all_checks = [(player, location) for player in locations for location in locations[player]]
+    planned_checks = rng.sample(all_checks, min(checks_per_tick * ticks, len(all_checks)))
+
+    def setup(batch_messages: bool) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.batch_messages = batch_messages
+        ctx.locations = LocationStore(locations)
+        ctx.clients[0] = {}
+        for slot in locations:
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Benchmark Game", SlotType.player)
+            client = Client(CountingSocket(), ctx)  # type: ignore[arg-type]
+            client.auth, client.team, client.slot = True, 0, slot
+            client.items_handling = 0b111
+            ctx.clients[0][slot] = [client]
+            ctx.endpoints.append(client)
+        return ctx
+
+    async def check_all(ctx: Context) -> None:
+        for i, (slot, location) in enumerate(planned_checks, 1):
+            register_location_checks(ctx, 0, slot, [location])
+            if i % checks_per_tick == 0:
+                await asyncio.sleep(0)
+        for _ in range(2):  # send the last batch
+            await asyncio.sleep(0)
+
+    sent: dict[str, int] = {}
+    for mode, batch_messages in (("a frame per message", False), ("batched frames", True)):
+        ctx = setup(batch_messages)
+        CountingSocket.frames = CountingSocket.sent = 0
+        cpu_start = time.process_time()
+        with TimeIt(f"{len(planned_checks)} checks with {players} clients, {mode}", logger) as timer:
+            asyncio.run(check_all(ctx))
+        cpu = time.process_time() - cpu_start
+        sent[mode] = CountingSocket.sent
+        logger.info(f"{mode}: {CountingSocket.frames} frames, {CountingSocket.frames / timer.dif:.0f} frames/s, "
+                    f"{CountingSocket.frames / len(planned_checks):.1f} frames per check, {cpu:.2f}s CPU, "
+                    f"{CountingSocket.sent / 1024 / 1024:.1f} MiB.")
+
+    first, second = sent.values()
+    if abs(first - second) > first // 10:  # batched frames only save the separators of the outer lists
+        logger.error(f"Modes sent different amounts of data: {sent}")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_message_batching_benchmark()
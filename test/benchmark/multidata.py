@@ -0,0 +1,85 @@
+def run_multidata_benchmark(slots: int = 1000, locations_per_slot: int = 500, iterations: int = 5) -> None:
+    """
+    Run a benchmark of loading multidata in the unsectioned format 3 and the sectioned format, both fully and by
+    reading a single slot, like the WebHost tracker does. Peak memory is measured in a forked process per load.
+
+    :param slots: Number of slots of the synthetic multidata.
+    :param locations_per_slot: Number of locations, slot data entries and hints per slot.
+    :param iterations: Number of loads per mode to average the time over.
+    """
+    import logging
+    import multiprocessing
+    import resource
+    import zlib
+    from typing import Any, Callable
+
+    from time_it import TimeIt
+
+    from NetUtils import Hint, MultiData, NetworkSlot, SlotType, decode_multidata, encode_multidata
+    from Utils import init_logging, restricted_dumps
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    players = range(1, slots + 1)
+    games = [f"Game {i}" for i in range(20)]
+    multidata: MultiData = {
+        "slot_data": {slot: {f"option_{i}": i for i in range(locations_per_slot)} for slot in players},
+        "slot_info": {slot: NetworkSlot(f"Player{slot}", games[slot % len(games)], SlotType.player)
+                      for slot in players},
+        "connect_names": {f"Player{slot}": (0, slot) for slot in players},
+        "locations": {slot: {location: (location, (slot + location) % slots + 1, 0)
+                             for location in range(locations_per_slot)} for slot in players},
+        "checks_in_area": {slot: {"Total": locations_per_slot} for slot in players},
+        "server_options": {},
+        "er_hint_data": {slot: {} for slot in players},
+        "precollected_items": {slot: [1, 2, 3] for slot in players},
+        "precollected_hints": {slot: {Hint(slot, slot, location, location, False)
+                                      for location in range(0, locations_per_slot, 10)} for slot in players},
+        "version": (0, 6, 0),
+        "tags": ["AP"],
+        "minimum_versions": {"server": (0, 5, 0), "clients": {}},
+        "seed_name": "12345",
+        "spheres": [{slot: {sphere} for slot in players} for sphere in range(50)],
+        "datapackage": {game: {"item_name_to_id": {f"{game} Item {i}": i for i in range(1000)},
+                               "location_name_to_id": {f"{game} Location {i}": i for i in range(1000)},
+                               "checksum": game} for game in games},
+        "race_mode": 0,
+    }
+    formats: dict[str, bytes] = {
+        "format 3": bytes([3]) + zlib.compress(restricted_dumps(multidata), 9),
+        "sectioned format": encode_multidata(multidata),
+    }
+    del multidata
+
+    def load_all(data: bytes) -> Any:
+        return decode_multidata(data)
+
+    def load_slot(data: bytes) -> Any:
+        loaded = decode_multidata(data, lazy=True)
+        return loaded["slot_data"][slots // 2], loaded["locations"][slots // 2], loaded["slot_info"]
+
+    def measure_peak(load: Callable[[bytes], Any], data: bytes, queue: "multiprocessing.Queue[int]") -> None:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        load(data)
+        queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+
+    context = multiprocessing.get_context("fork")
+    for name, data in formats.items():
+        logger.info(f"{name}: {len(data) / 1024 / 1024:.2f} MiB for {slots} slots.")
+        for mode, load in (("full load", load_all), ("single slot load", load_slot)):
+            with TimeIt(f"{iterations} {mode}s of {name}", logger):
+                for _ in range(iterations):
+                    load(data)
+            queue: "multiprocessing.Queue[int]" = context.Queue()
+            process = context.Process(target=measure_peak, args=(load, data, queue))
+            process.start()
+            peak = queue.get()
+            process.join()
+            logger.info(f"{mode} of {name} increased peak RSS by {peak / 1024:.1f} MiB.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_multidata_benchmark()
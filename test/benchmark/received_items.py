@@ -0,0 +1,99 @@
+def run_received_items_benchmark(players: int = 500, locations_per_player: int = 100, checks: int = 5000) -> None:
+    """
+    Run a benchmark of MultiServer sending ReceivedItems after location checks, with a connected client per slot,
+    comparing the targeted delivery of send_new_items against scanning all clients after every check.
+
+    :param players: Number of slots, each with a connected client.
+    :param locations_per_player: Number of locations per slot, sending items to random slots.
+    :param checks: Number of single location checks to register, in random order.
+    """
+    import asyncio
+    import logging
+    import random
+
+    from time_it import TimeIt
+
+    import MultiServer
+    from MultiServer import Client, Context, get_received_items, get_start_inventory, register_location_checks
+    from NetUtils import LocationStore, NetworkSlot, SlotType
+    from Utils import async_start, init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.WARNING)
+
+    class NullSocket:
+        open = True
+        state = None  # skipped by websockets.broadcast, only direct sends like ReceivedItems are counted
+        sent = 0
+
+        async def send(self, msg: str) -> None:
+            NullSocket.sent += 1
+
+    def scan_send_new_items(ctx: Context) -> None:
+        # send_new_items before it tracked receivers
+        for team, clients in ctx.clients.items():
+            for slot, clients in clients.items():
+                for client in clients:
+                    if client.no_items:
+                        continue
+                    start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+                    items = get_received_items(ctx, team, slot, client.remote_items)
+                    if len(start_inventory) + len(items) > client.send_index:
+                        first_new_item = max(0, client.send_index - len(start_inventory))
+                        async_start(ctx.send_msgs(client, [{
+                            "cmd": "ReceivedItems",
+                            "index": client.send_index,
+                            "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                        client.send_index = len(start_inventory) + len(items)
+
+    rng = random.Random(0)
+    locations = {player: {location: (location, rng.randint(1, players), 0) for location in range(locations_per_player)}
+                 for player in range(1, players + 1)}
+    all_checks = [(player, location) for player in locations for location in locations[player]]
+    planned_checks = rng.sample(all_checks, min(checks, len(all_checks)))
+
+    def setup() -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.locations = LocationStore(locations)
+        ctx.clients[0] = {}
+        for slot in locations:
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Benchmark Game", SlotType.player)
+            client = Client(NullSocket(), ctx)  # type: ignore[arg-type]
+            client.auth, client.team, client.slot = True, 0, slot
+            client.items_handling = 0b111
+            ctx.clients[0][slot] = [client]
+        return ctx
+
+    async def check_all(ctx: Context) -> None:
+        for i, (slot, location) in enumerate(planned_checks):
+            register_location_checks(ctx, 0, slot, [location])
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    original_send_new_items = MultiServer.send_new_items
+    sent: dict[str, int] = {}
+    try:
+        for mode, send_new_items in (("scanning all clients", scan_send_new_items),
+                                     ("targeted delivery", original_send_new_items)):
+            MultiServer.send_new_items = send_new_items
+            ctx = setup()
+            NullSocket.sent = 0
+            with TimeIt(f"{len(planned_checks)} checks with {players} clients, {mode}", logger) as timer:
+                asyncio.run(check_all(ctx))
+            sent[mode] = NullSocket.sent
+            logger.info(f"{len(planned_checks) / timer.dif * 60:.0f} checks per minute, {mode}.")
+    finally:
+        MultiServer.send_new_items = original_send_new_items
+
+    if len(set(sent.values())) != 1:
+        logger.error(f"Modes sent different amounts of messages: {sent}")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_received_items_benchmark()
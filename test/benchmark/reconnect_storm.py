@@ -0,0 +1,82 @@
+def run_reconnect_storm_benchmark(players: int = 500, games: int = 30, names_per_game: int = 2000) -> None:
+    """
+    Run a benchmark of a room restart, where every slot reconnects and requests the data package of all games of the
+    room at once, comparing the cached encoded payloads against encoding them for every client.
+
+    :param players: Number of slots, each reconnecting with one client.
+    :param games: Number of games in the room, each with its own data package.
+    :param names_per_game: Number of item and location names per data package.
+    """
+    import asyncio
+    import logging
+
+    from time_it import TimeIt
+
+    from MultiServer import Client, Context, process_client_cmd
+    from NetUtils import LocationStore, NetworkItem, NetworkSlot, SlotType
+    from Utils import init_logging, version_tuple
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.WARNING)
+
+    class NullSocket:
+        open = True
+        state = None  # skipped by websockets.broadcast, only direct sends are counted
+        extensions = ()
+        sent = 0
+
+        async def send(self, msg: str) -> None:
+            NullSocket.sent += len(msg)
+
+    game_names = [f"Game {game}" for game in range(games)]
+
+    def setup() -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.gamespackage = {game: {"item_name_to_id": {f"{game} Item {i}": i for i in range(names_per_game)},
+                                   "location_name_to_id": {f"{game} Location {i}": i for i in range(names_per_game)},
+                                   "checksum": game} for game in game_names}
+        ctx.locations = LocationStore({slot: {location: (location, slot % players + 1, 0) for location in range(100)}
+                                       for slot in range(1, players + 1)})
+        ctx.slot_data = {}
+        ctx.clients[0] = {}
+        for slot in range(1, players + 1):
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.connect_names[f"Player{slot}"] = (0, slot)
+            ctx.games[slot] = game_names[slot % games]
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", ctx.games[slot], SlotType.player)
+            ctx.minimum_client_versions[slot] = version_tuple
+            ctx.slot_data[slot] = {f"option_{i}": i for i in range(200)}
+            ctx.received_items[0, slot, True] = [NetworkItem(i, i, slot % players + 1, 0) for i in range(50)]
+            ctx.clients[0][slot] = []
+        return ctx
+
+    async def storm(ctx: Context, cached: bool) -> None:
+        for slot in range(1, players + 1):
+            client = Client(NullSocket(), ctx)  # type: ignore[arg-type]
+            for args in ({"cmd": "GetDataPackage", "games": game_names},
+                         {"cmd": "Connect", "name": f"Player{slot}", "password": None, "game": ctx.games[slot],
+                          "version": version_tuple, "items_handling": 0b111, "tags": [], "uuid": slot}):
+                if not cached:
+                    ctx.encoded_cache.clear()
+                await process_client_cmd(ctx, client, args)
+            await asyncio.sleep(0)
+
+    sent: dict[str, int] = {}
+    for mode, cached in (("encoding every payload", False), ("cached payloads", True)):
+        ctx = setup()
+        NullSocket.sent = 0
+        with TimeIt(f"{players} reconnects with {games} games, {mode}", logger):
+            asyncio.run(storm(ctx, cached))
+        sent[mode] = NullSocket.sent
+    logger.info(f"Sent {NullSocket.sent / 1024 / 1024:.0f} MiB per storm.")
+
+    if len(set(sent.values())) != 1:
+        logger.error(f"Modes sent different amounts of data: {sent}")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_reconnect_storm_benchmark()
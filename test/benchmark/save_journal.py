@@ -0,0 +1,82 @@
+def run_save_journal_benchmark(players: int = 1000, locations_per_player: int = 300, checks_per_save: int = 20,
+                               saves: int = 50) -> None:
+    """
+    Run a benchmark of MultiServer saves late into a large game, comparing writing a full snapshot on every save against
+    appending the changes to the save journal.
+
+    :param players: Number of slots.
+    :param locations_per_player: Number of locations per slot, of which most are already checked.
+    :param checks_per_save: Number of location checks between two saves.
+    :param saves: Number of saves per mode.
+    """
+    import logging
+    import os
+    import random
+    import tempfile
+
+    from time_it import TimeIt
+
+    from MultiServer import Context, send_items_to
+    from NetUtils import Hint, NetworkItem
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.CRITICAL)  # no save file exists yet
+
+    rng = random.Random(0)
+    slots = range(1, players + 1)
+    unchecked = [(slot, location) for slot in slots for location in range(locations_per_player)]
+    rng.shuffle(unchecked)
+
+    def load(directory: str, journal: bool) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.connect_names = {f"Player{slot}": (0, slot) for slot in slots}
+        ctx.save_filename = os.path.join(directory, f"{'journal' if journal else 'snapshot'}.apsave")
+        ctx.auto_saver_thread = True  # type: ignore[assignment]  # saves are triggered by the benchmark
+        ctx.init_save(journal=journal)
+        return ctx
+
+    def setup(directory: str, journal: bool) -> Context:
+        ctx = load(directory, journal)
+        for slot, location in unchecked[:len(unchecked) * 3 // 4]:
+            check(ctx, slot, location)
+        for slot in slots:
+            ctx.hints[0, slot] = {Hint(slot, slot % players + 1, location, location, False) for location in range(20)}
+            ctx.stored_data[f"tracker_{slot}"] = {"map": list(range(100))}
+        ctx._save()
+        return ctx
+
+    def check(ctx: Context, slot: int, location: int) -> None:
+        ctx.location_checks[0, slot].add(location)
+        send_items_to(ctx, 0, location % players + 1, NetworkItem(location, location, slot, 0))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, journal in (("full snapshots", False), ("journal", True)):
+            ctx = setup(directory, journal)
+            if ctx.save_journal:
+                ctx.save_journal.compact_records = saves + 1
+            remaining = iter(unchecked[len(unchecked) * 3 // 4:])
+            with TimeIt(f"{saves} saves of {players} slots with {mode}", logger):
+                for _ in range(saves):
+                    for _ in range(checks_per_save):
+                        check(ctx, *next(remaining))
+                    ctx._save()
+            written = os.path.getsize(ctx.save_filename)
+            if ctx.journal_filename and os.path.exists(ctx.journal_filename):
+                written = os.path.getsize(ctx.journal_filename)
+            else:
+                written *= saves
+            logger.info(f"{mode} wrote {written / 1024 / 1024:.2f} MiB in {saves} saves.")
+            if ctx.save_journal:
+                with TimeIt(f"loading the snapshot and replaying {saves} records", logger):
+                    loaded = load(directory, True)
+                if loaded.location_checks != ctx.location_checks:
+                    logger.error("Replayed journal differs from the saved state.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_save_journal_benchmark()
@@ -0,0 +1,63 @@
+def run_set_reply_benchmark(watchers: int = 500, setters: int = 50, sets_per_tick: int = 20, ticks: int = 200) -> None:
+    """
+    Run a benchmark of MultiServer data storage Sets on a shared key watched by many clients, such as a deathlink
+    counter, comparing a SetReply broadcast for every Set against coalescing them per event loop tick.
+
+    :param watchers: Number of clients watching the key with SetNotify.
+    :param setters: Number of clients updating the key.
+    :param sets_per_tick: Number of Sets handled in each event loop tick.
+    :param ticks: Number of event loop ticks.
+    """
+    import asyncio
+    import logging
+
+    from time_it import TimeIt
+
+    from MultiServer import Client, Context, process_client_cmd
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+    server_logger = logging.getLogger("Benchmark Server")
+    server_logger.setLevel(logging.WARNING)
+
+    class NullSocket:
+        open = True
+        state = None  # skipped by websockets.broadcast, SetReply messages are counted by the server metrics
+        extensions = ()
+
+        async def send(self, msg: str) -> None:
+            pass
+
+    async def storm(ctx: Context) -> None:
+        clients = []
+        for slot in range(1, watchers + 1):
+            client = Client(NullSocket(), ctx)  # type: ignore[arg-type]
+            client.auth, client.team, client.slot = True, 0, slot
+            clients.append(client)
+            await process_client_cmd(ctx, client, {"cmd": "SetNotify", "keys": ["deaths"]})
+        for tick in range(ticks):
+            for i in range(sets_per_tick):
+                client = clients[(tick * sets_per_tick + i) % setters]
+                await process_client_cmd(ctx, client, {"cmd": "Set", "key": "deaths", "default": 0,
+                                                       "operations": [{"operation": "add", "value": 1}]})
+            await asyncio.sleep(0)
+
+    values = set()
+    for mode, coalesce in (("a SetReply per Set", False), ("coalesced SetReplies", True)):
+        ctx = Context("", 0, "", "", 0, 0, False, logger=server_logger)
+        ctx.coalesce_set_replies = coalesce
+        with TimeIt(f"{ticks * sets_per_tick} Sets watched by {watchers} clients, {mode}", logger):
+            asyncio.run(storm(ctx))
+        values.add(ctx.stored_data["deaths"])
+        logger.info(f"{mode}: {ctx.stored_data_set_replies['deaths']} broadcasts, "
+                    f"{ctx.stored_data_notifications['deaths']} SetReply messages.")
+
+    if len(values) != 1:
+        logger.error(f"Modes resulted in different values: {values}")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_set_reply_benchmark()
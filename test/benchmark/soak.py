@@ -0,0 +1,298 @@
+import typing
+
+if typing.TYPE_CHECKING:
+    from multiprocessing.queues import Queue
+    from multiprocessing.synchronize import Event
+
+lag_interval = 0.05
+"""Seconds between the event loop lag measurements of the server and the client processes."""
+shared_key = "soak_counter"
+"""Data storage key updated and watched by all synthetic clients."""
+
+
+async def _measure_lag(samples: typing.List[float]) -> None:
+    """Appends how late the event loop resumes a sleeping task to samples, until cancelled."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(lag_interval)
+        samples.append(loop.time() - start - lag_interval)
+
+
+def _serve(multidata: str, port: int, ready: "Event", stop: "Event", results: "Queue") -> None:
+    """Runs MultiServer like test.hosting does, reporting its event loop lag, CPU time and max RSS in KiB to results."""
+    import asyncio
+    import os
+    import resource
+    import sys
+    import warnings
+
+    warnings.simplefilter("ignore")
+    from MultiServer import main, parse_args
+
+    sys.argv = [sys.argv[0], multidata, "--host", "127.0.0.1", "--port", str(port), "--disable_save",
+                "--loglevel", "warning"]
+    r, w = os.pipe()
+    sys.stdin = os.fdopen(r, "r")
+    lag: typing.List[float] = []
+    start: typing.List[resource.struct_rusage] = []
+
+    async def set_ready() -> None:
+        await asyncio.sleep(.01)  # main() loaded the multidata before its first await
+        start.append(resource.getrusage(resource.RUSAGE_SELF))
+        ready.set()
+        await _measure_lag(lag)
+
+    async def wait_stop() -> None:
+        await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+        with os.fdopen(w, "w") as console:
+            console.write("/exit\n")
+
+    async def run() -> None:
+        lag_task = asyncio.create_task(set_ready())
+        await asyncio.gather(main(parse_args()), wait_stop())
+        lag_task.cancel()
+
+    asyncio.run(run())
+    end = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        "cpu": end.ru_utime + end.ru_stime - start[0].ru_utime - start[0].ru_stime,
+        "start_rss": start[0].ru_maxrss,
+        "end_rss": end.ru_maxrss,
+        "lag": lag,
+    })
+
+
+async def _synthetic_client(address: str, slot: int, seed: int, rates: typing.Dict[str, float], deadline: float,
+                            stats: typing.Dict[str, typing.Any]) -> None:
+    """
+    Plays a slot until deadline, reconnecting at random. Latencies are measured from sending a command to its reply:
+    Connected for Connect, RoomUpdate for LocationChecks, LocationInfo for LocationScouts and SetReply for Set.
+    """
+    import asyncio
+    import collections
+    import json
+    import random
+    import time
+
+    import websockets
+
+    from NetUtils import NetworkItem, received_items_hash
+    from Utils import version_tuple
+
+    rng = random.Random(seed)
+    latencies: typing.Dict[str, typing.List[float]] = stats["latencies"]
+    items: typing.List[NetworkItem] = []
+    locations: typing.List[int] = []
+    missing: typing.List[int] = []
+    set_id = 0
+
+    await asyncio.sleep(rng.uniform(0, 1))  # spread the initial connects
+    while time.perf_counter() < deadline:
+        pending_checks: typing.Dict[int, float] = {}
+        pending_scouts: typing.Deque[float] = collections.deque()
+        pending_sets: typing.Dict[int, float] = {}
+        connected = asyncio.Event()
+        connect_sent = 0.
+
+        try:
+            socket = await websockets.connect(f"ws://{address}", ping_timeout=None, ping_interval=None, max_size=None)
+        except OSError:  # server not listening yet
+            await asyncio.sleep(0.1)
+            continue
+
+        async def receive() -> None:
+            async for frame in socket:
+                now = time.perf_counter()
+                for msg in json.loads(frame):
+                    cmd = msg["cmd"]
+                    if cmd == "RoomInfo":
+                        continue
+                    elif cmd == "Connected":
+                        latencies["Connect"].append(now - connect_sent)
+                        missing[:] = msg["missing_locations"]
+                        if not locations:
+                            locations.extend(msg["missing_locations"] + msg["checked_locations"])
+                        connected.set()
+                    elif cmd == "ConnectionRefused":
+                        stats["errors"].append(f"Player{slot}: {msg.get('errors')}")
+                        return
+                    elif cmd == "ReceivedItems":
+                        new_items = [NetworkItem(item["item"], item["location"], item["player"], item["flags"])
+                                     for item in msg["items"]]
+                        if msg["index"] == 0:
+                            items[:] = new_items
+                        elif msg["index"] == len(items):
+                            items.extend(new_items)
+                    elif cmd == "RoomUpdate":
+                        for location in msg.get("checked_locations", ()):
+                            sent = pending_checks.pop(location, None)
+                            if sent is not None:
+                                latencies["LocationChecks"].append(now - sent)
+                    elif cmd == "LocationInfo" and pending_scouts:
+                        latencies["LocationScouts"].append(now - pending_scouts.popleft())
+                    elif cmd == "SetReply":
+                        sent = pending_sets.pop(msg.get("soak_id", None), None)
+                        if sent is not None:
+                            latencies["Set"].append(now - sent)
+                    elif cmd == "InvalidPacket":
+                        stats["errors"].append(f"Player{slot}: {msg.get('text')}")
+
+        receiver = asyncio.create_task(receive())
+        try:
+            connect: typing.Dict[str, typing.Any] = {
+                "cmd": "Connect", "name": f"Player{slot}", "password": None, "game": "APQuest", "uuid": slot,
+                "version": {"major": version_tuple.major, "minor": version_tuple.minor, "build": version_tuple.build,
+                            "class": "Version"},
+                "items_handling": 0b111, "tags": [], "slot_data": False,
+            }
+            if items:
+                connect["received_items"] = {"index": len(items), "hash": received_items_hash(items)}
+            connect_sent = time.perf_counter()
+            await socket.send(json.dumps([connect, {"cmd": "SetNotify", "keys": [shared_key]}]))
+            await asyncio.wait_for(connected.wait(), 30)
+
+            reconnect_at = time.perf_counter() + rng.expovariate(rates["reconnect"]) if rates["reconnect"] else deadline
+            while True:
+                actions = {"check": rates["check"] if missing else 0, "hint": rates["hint"], "set": rates["set"]}
+                total = sum(actions.values())
+                now = time.perf_counter()
+                at = min(now + rng.expovariate(total) if total else deadline, reconnect_at, deadline)
+                await asyncio.sleep(at - now)
+                if at >= reconnect_at or at >= deadline or receiver.done():
+                    break
+                action = rng.choices(list(actions), list(actions.values()))[0]
+                if action == "check":
+                    location = missing.pop(rng.randrange(len(missing)))
+                    pending_checks[location] = time.perf_counter()
+                    await socket.send(json.dumps([{"cmd": "LocationChecks", "locations": [location]}]))
+                elif action == "hint":
+                    pending_scouts.append(time.perf_counter())
+                    await socket.send(json.dumps([{"cmd": "LocationScouts", "locations": [rng.choice(locations)],
+                                                   "create_as_hint": 2}]))
+                else:
+                    set_id += 1
+                    pending_sets[set_id] = time.perf_counter()
+                    await socket.send(json.dumps([{"cmd": "Set", "key": shared_key, "default": 0, "want_reply": True,
+                                                   "operations": [{"operation": "add", "value": 1}],
+                                                   "soak_id": set_id}]))
+            stats["reconnects"] += at < deadline
+        except (asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+            stats["errors"].append(f"Player{slot}: {e!r}")
+        finally:
+            stats["unanswered"] += len(pending_checks) + len(pending_scouts) + len(pending_sets)
+            await socket.close()
+            receiver.cancel()
+
+
+def _run_clients(address: str, slots: typing.Sequence[int], rates: typing.Dict[str, float],
+                 duration: float) -> typing.Dict[str, typing.Any]:
+    """Runs the synthetic clients of slots in this process, returning their stats."""
+    import asyncio
+    import collections
+    import time
+
+    import websockets  # noqa: F401, imported before measuring the event loop lag
+    import NetUtils  # noqa: F401
+
+    stats: typing.Dict[str, typing.Any] = {"latencies": collections.defaultdict(list), "lag": [], "reconnects": 0,
+                                           "unanswered": 0, "errors": []}
+
+    async def run() -> None:
+        lag_task = asyncio.create_task(_measure_lag(stats["lag"]))
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_synthetic_client(address, slot, slot, rates, deadline, stats) for slot in slots))
+        lag_task.cancel()
+
+    asyncio.run(run())
+    stats["latencies"] = dict(stats["latencies"])
+    return stats
+
+
+def _percentiles(samples: typing.List[float]) -> str:
+    import statistics
+
+    if len(samples) < 2:
+        return "not enough samples"
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return (f"p50 {quantiles[49] * 1000:.1f} ms, p90 {quantiles[89] * 1000:.1f} ms, "
+            f"p99 {quantiles[98] * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms")
+
+
+def run_soak_benchmark(players: int = 200, duration: float = 60, checks_per_minute: float = 6,
+                       hints_per_minute: float = 1, sets_per_minute: float = 6, reconnects_per_minute: float = 0.5,
+                       client_processes: int = 2, port: int = 38281) -> None:
+    """
+    Run a load and soak test of a local MultiServer hosting a multiworld generated from APQuest slots, with a synthetic
+    client per slot that connects, checks its locations, creates hints, updates and watches a data storage key and
+    reconnects at random intervals. Reports the latency of each command, the event loop lag, CPU time and max RSS of
+    the server process and the event loop lag of the client processes, which should stay low for the results to
+    reflect the server. Not run as part of unit testing, as it spawns processes and needs a free port.
+
+    :param players: Number of slots, each with a synthetic client.
+    :param duration: Seconds the synthetic clients run.
+    :param checks_per_minute: Average location checks per client while it has missing locations.
+    :param hints_per_minute: Average LocationScouts creating a hint per client.
+    :param sets_per_minute: Average Sets on the shared data storage key per client.
+    :param reconnects_per_minute: Average reconnects per client.
+    :param client_processes: Number of processes running the synthetic clients.
+    :param port: Port of the local server.
+    """
+    import concurrent.futures
+    import logging
+    import multiprocessing
+    import tempfile
+
+    from time_it import TimeIt
+
+    from test.hosting.generate import generate_local
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    rates = {"check": checks_per_minute / 60, "hint": hints_per_minute / 60, "set": sets_per_minute / 60,
+             "reconnect": reconnects_per_minute / 60}
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tempdir:
+        with TimeIt(f"generating {players} APQuest slots", logger):
+            multidata = generate_local(["APQuest"] * players, tempdir)
+
+        ready, stop, results = spawn.Event(), spawn.Event(), spawn.Queue()
+        server = spawn.Process(target=_serve, args=(str(multidata), port, ready, stop, results))
+        server.start()
+        try:
+            if not ready.wait(60):
+                raise TimeoutError("Server did not start")
+            slots = range(1, players + 1)
+            with concurrent.futures.ProcessPoolExecutor(client_processes, spawn) as executor:
+                with TimeIt(f"{players} synthetic clients", logger) as timer:
+                    futures = [executor.submit(_run_clients, f"127.0.0.1:{port}", slots[i::client_processes], rates,
+                                               duration) for i in range(client_processes)]
+                    client_stats = [future.result() for future in futures]
+        finally:
+            stop.set()
+        server_stats = results.get(timeout=60)
+        server.join(30)
+
+    for cmd in ("Connect", "LocationChecks", "LocationScouts", "Set"):
+        latencies = [latency for stats in client_stats for latency in stats["latencies"].get(cmd, ())]
+        logger.info(f"{cmd}: {len(latencies)} replies, {len(latencies) / timer.dif:.1f}/s, {_percentiles(latencies)}.")
+    logger.info(f"Server event loop lag: {_percentiles(server_stats['lag'])}.")
+    logger.info(f"Client event loop lag: {_percentiles([lag for stats in client_stats for lag in stats['lag']])}.")
+    logger.info(f"Server CPU: {server_stats['cpu']:.2f}s, {server_stats['cpu'] / timer.dif:.0%} of a core. "
+                f"Server max RSS: {server_stats['start_rss'] / 1024:.0f} MiB after loading, "
+                f"{server_stats['end_rss'] / 1024:.0f} MiB at the end.")
+    logger.info(f"{sum(stats['reconnects'] for stats in client_stats)} reconnects, "
+                f"{sum(stats['unanswered'] for stats in client_stats)} commands unanswered at disconnect.")
+    errors = [error for stats in client_stats for error in stats["errors"]]
+    if errors:
+        logger.error(f"{len(errors)} client errors, first: {errors[0]}")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_soak_benchmark()
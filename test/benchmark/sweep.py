@@ -0,0 +1,110 @@
+def run_sweep_benchmark(players: int = 20, regions: int = 100, locations_per_region: int = 20,
+                        iterations: int = 10) -> None:
+    """
+    Run a benchmark of sweeping rule builder worlds, with and without the rule dependencies being used by the sweep.
+
+    :param players: Number of slots of the generated rule builder world.
+    :param regions: Number of regions per slot. Each region is unlocked by an item found in the previous one.
+    :param locations_per_region: Number of locations per region, with rules depending on keys of earlier regions.
+    :param iterations: Number of sweeps from an empty state per mode.
+    """
+    import argparse
+    import logging
+    import gc
+    from typing import ClassVar
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+    from rule_builder.cached_world import CachedRuleBuilderWorld
+    from rule_builder.rules import Has, HasAll, True_
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    item_names = [f"Key {i}" for i in range(regions)] + ["Gem"]
+    location_names = [f"Region {region} Location {i}" for region in range(regions) for i in range(locations_per_region)]
+
+    class SweepBenchmarkItem(Item):
+        game = "Sweep Benchmark Game"
+
+    class SweepBenchmarkLocation(Location):
+        game = "Sweep Benchmark Game"
+
+    class SweepBenchmarkWorld(CachedRuleBuilderWorld):
+        game = "Sweep Benchmark Game"
+        item_name_to_id: ClassVar = {name: i for i, name in enumerate(item_names, 1)}
+        location_name_to_id: ClassVar = {name: i for i, name in enumerate(location_names, 1)}
+        hidden = True
+        origin_region_name = "Region 0"
+        use_rule_dependencies: ClassVar[bool] = True
+
+        def get_rule_sweep_dependencies(self) -> dict[int, tuple[frozenset[str], bool]]:
+            return super().get_rule_sweep_dependencies() if self.use_rule_dependencies else {}
+
+        def create_item(self, name: str) -> SweepBenchmarkItem:
+            return SweepBenchmarkItem(name, ItemClassification.progression, self.item_name_to_id[name], self.player)
+
+        def create_regions(self) -> None:
+            world_regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(regions)]
+            self.multiworld.regions += world_regions
+            for i, region in enumerate(world_regions):
+                if i:
+                    self.create_entrance(world_regions[i - 1], region, Has(f"Key {i}"))
+                for j in range(locations_per_region):
+                    location = SweepBenchmarkLocation(self.player, f"Region {i} Location {j}",
+                                                      self.location_name_to_id[f"Region {i} Location {j}"], region)
+                    region.locations.append(location)
+                    if j == 0:
+                        self.set_rule(location, True_())
+                        if i + 1 < regions:
+                            location.place_locked_item(self.create_item(f"Key {i + 1}"))
+                            continue
+                    else:
+                        keys = {f"Key {self.random.randint(0, regions - 1)}" for _ in range(2)}
+                        self.set_rule(location, HasAll(*keys))
+                    location.place_locked_item(self.create_item("Gem"))
+
+    def setup() -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: SweepBenchmarkWorld.game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in SweepBenchmarkWorld.options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        for step in ("generate_early", "create_regions", "create_items", "set_rules"):
+            call_all(multiworld, step)
+        return multiworld
+
+    old_world_types = AutoWorld.AutoWorldRegister.world_types.copy()
+    results: dict[str, set[str]] = {}
+    try:
+        for mode, use_rule_dependencies in (("without", False), ("with", True)):
+            SweepBenchmarkWorld.use_rule_dependencies = use_rule_dependencies
+            multiworld = setup()
+            gc.collect()
+            gc.freeze()
+            with TimeIt(f"{iterations} sweeps of {players} players {mode} rule dependencies", logger):
+                for _ in range(iterations):
+                    state = CollectionState(multiworld)
+                    state.sweep_for_advancements()
+            gc.unfreeze()
+            results[mode] = {f"{location.player} {location.name}" for location in state.advancements}
+    finally:
+        AutoWorld.AutoWorldRegister.world_types = old_world_types
+
+    if results["with"] != results["without"]:
+        logger.error("Sweeps with and without rule dependencies collected different locations.")
+    logger.info(f"Both sweeps collected {len(results['with'])} locations.")
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_sweep_benchmark()
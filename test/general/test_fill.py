@@ -463,6 +463,24 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_fill_order_with_unreachable_locations(self):
+        """Test that items are placed in the first fillable location, skipping unreachable and excluded locations"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 2, 1, 1)
+        locked_region = player1.generate_region(player1.menu, 2, lambda state: False)
+        excluded, reachable = player1.locations[:2]
+        unreachable, always_allowed = locked_region.locations
+        excluded.progress_type = LocationProgressType.EXCLUDED
+        always_allowed.always_allow = lambda state, item: True
+        locations = [unreachable, excluded, always_allowed, reachable]
+
+        fill_restrictive(multiworld, multiworld.state, locations, player1.prog_items.copy())
+        self.assertEqual(always_allowed.item, player1.prog_items[0])
+
+        fill_restrictive(multiworld, multiworld.state, locations, player1.basic_items.copy())
+        self.assertEqual(excluded.item, player1.basic_items[0])
+        self.assertEqual([unreachable, reachable], locations)
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
@@ -880,3 +898,13 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+    def test_reports_balancing_stats(self) -> None:
+        """Test that progression balancing logs how many items it tested and swapped"""
+        self.multiworld.worlds[self.player1.id].options.progression_balancing.value = 50
+        self.multiworld.worlds[self.player2.id].options.progression_balancing.value = 50
+
+        with self.assertLogs(level="INFO") as logs:
+            balance_multiworld_progression(self.multiworld)
+
+        self.assertIn("Tested 1 items, tried 1 swaps and kept 1.", logs.output[-1])
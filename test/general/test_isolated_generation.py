@@ -0,0 +1,143 @@
+import unittest
+from typing import Any, ClassVar
+from unittest import mock
+
+from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+from rule_builder.cached_world import CachedRuleBuilderWorld
+from rule_builder.rules import CanReachRegion, Has, HasAny
+from test.general import setup_multiworld
+from worlds import AutoWorld
+from worlds.AutoWorld import AutoWorldRegister, World, call_all, call_all_isolated
+
+GAME_NAME = "Isolated Generation Test Game"
+REGION_COUNT = 10
+steps = ("create_regions", "create_items", "set_rules")
+
+
+class IsolatedItem(Item):
+    game = GAME_NAME
+
+
+class IsolatedLocation(Location):
+    game = GAME_NAME
+
+
+class TestIsolatedGeneration(unittest.TestCase):
+    old_world_types: dict[str, type[CachedRuleBuilderWorld]]
+    world_cls: type[CachedRuleBuilderWorld]
+
+    def setUp(self) -> None:
+        self.old_world_types = AutoWorldRegister.world_types.copy()
+
+        class IsolatedWorld(CachedRuleBuilderWorld):
+            game = GAME_NAME
+            item_name_to_id: ClassVar = {f"Key {i}": i for i in range(1, REGION_COUNT + 1)}
+            location_name_to_id: ClassVar = {f"Location {i}": i for i in range(1, REGION_COUNT + 1)}
+            hidden = True
+            isolated_generation = True
+            origin_region_name = "Region 1"
+            use_lambda_rules: ClassVar[bool] = False
+
+            def create_item(self, name: str) -> IsolatedItem:
+                return IsolatedItem(name, ItemClassification.progression, self.item_name_to_id[name], self.player)
+
+            def create_regions(self) -> None:
+                regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, REGION_COUNT + 1)]
+                self.multiworld.regions += regions
+                for i, region in enumerate(regions, 1):
+                    region.add_locations({f"Location {i}": i}, IsolatedLocation)
+                    if i > 1:
+                        self.create_entrance(regions[i - 2], region, Has(f"Key {self.random.randint(1, i - 1)}"))
+
+            def create_items(self) -> None:
+                keys = [self.create_item(f"Key {i}") for i in range(1, REGION_COUNT + 1)]
+                self.random.shuffle(keys)
+                self.multiworld.push_precollected(keys.pop())
+                self.multiworld.itempool += keys
+                self.multiworld.early_items[self.player][keys[0].name] = 1
+
+            def set_rules(self) -> None:
+                for i in range(2, REGION_COUNT + 1):
+                    location = self.get_location(f"Location {i}")
+                    if self.use_lambda_rules:
+                        location.access_rule = lambda state, p=self.player: state.has("Key 1", p)
+                    else:
+                        self.set_rule(location, CanReachRegion("Region 1") & HasAny("Key 1", f"Key {i}"))
+                self.set_completion_rule(Has(f"Key {REGION_COUNT}"))
+
+        self.world_cls = IsolatedWorld
+
+    def tearDown(self) -> None:
+        AutoWorldRegister.world_types = self.old_world_types
+
+    def _generate(self, workers: int, world_cls: type[World] | None = None) -> MultiWorld:
+        multiworld = setup_multiworld([world_cls or self.world_cls] * 4, ("generate_early",), seed=0)
+        if workers:
+            call_all_isolated(multiworld, steps, workers)
+        else:
+            for step in steps:
+                call_all(multiworld, step)
+        return multiworld
+
+    @staticmethod
+    def _summary(multiworld: MultiWorld) -> tuple[Any, ...]:
+        state = CollectionState(multiworld)
+        state.sweep_for_advancements(multiworld.get_locations())
+        return (
+            [(region.name, region.player, sorted(entrance.name for entrance in region.exits))
+             for region in multiworld.get_regions()],
+            [(location.name, location.player, location.parent_region.name) for location in multiworld.get_locations()],
+            [(item.name, item.player) for item in multiworld.itempool],
+            {player: [item.name for item in items] for player, items in multiworld.precollected_items.items()},
+            multiworld.early_items,
+            sorted((region.name, region.player) for region in multiworld.indirect_connections),
+            sorted((location.name, location.player) for location in state.locations_checked),
+            [multiworld.completion_condition[player](state) for player in multiworld.player_ids],
+            [multiworld.worlds[player].random.random() for player in multiworld.player_ids],
+        )
+
+    def test_identical_to_serial(self) -> None:
+        """Ensure generating isolated worlds in workers results in the same MultiWorld as serial generation."""
+        serial = self._generate(0)
+        isolated = self._generate(2)
+        self.assertEqual(self._summary(isolated), self._summary(serial))
+        for region in isolated.get_regions():
+            self.assertIs(region.multiworld, isolated)
+        for location in isolated.get_locations():
+            self.assertIs(location.parent_region, isolated.get_region(location.parent_region.name, location.player))
+
+    def test_rule_dependencies(self) -> None:
+        """Ensure the rule dependencies of isolated worlds refer to the merged rules."""
+        serial = self._generate(0)
+        isolated = self._generate(2)
+        for multiworld in (serial, isolated):
+            world = multiworld.worlds[1]
+            assert isinstance(world, CachedRuleBuilderWorld)
+            dependencies = world.get_rule_sweep_dependencies()
+            location = multiworld.get_location(f"Location {REGION_COUNT}", 1)
+            self.assertEqual(dependencies[id(location.access_rule)], ({"Key 1", f"Key {REGION_COUNT}"}, True))
+
+    def test_unpicklable_world(self) -> None:
+        """Ensure worlds that can't be pickled are generated in the main process instead."""
+        self.world_cls.use_lambda_rules = True
+        serial = self._generate(0)
+        isolated = self._generate(2)
+        self.assertEqual(self._summary(isolated), self._summary(serial))
+
+    def test_checksfinder(self) -> None:
+        """Ensure a world of the tree that declares isolated generation is generated in workers like in serial."""
+        world_cls = AutoWorldRegister.world_types["ChecksFinder"]
+        self.assertTrue(world_cls.isolated_generation)
+        with mock.patch.object(AutoWorld, "isolated_multiworld", setup_multiworld([world_cls], ("generate_early",))):
+            self.assertIsNotNone(AutoWorld._call_isolated(1, steps), "ChecksFinder can't be pickled")
+        serial = self._generate(0, world_cls)
+        isolated = self._generate(2, world_cls)
+        self.assertEqual(self._summary(isolated), self._summary(serial))
+        reachable = []
+        for multiworld in (serial, isolated):
+            state = CollectionState(multiworld)
+            for item in multiworld.itempool[::2]:
+                state.collect(item, True)
+            reachable.append([location.name for location in multiworld.get_locations() if location.can_reach(state)])
+        self.assertEqual(reachable[1], reachable[0])
+        self.assertNotEqual(reachable[1], [])
@@ -492,6 +492,65 @@ class TestCaching(CachedRuleBuilderTestCase):
         self.assertTrue(entrance.can_reach(self.state))
 
 
+class TestDependencySweep(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: CachedRuleBuilderWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = cast(CachedRuleBuilderWorld, self.multiworld.worlds[1])
+        self.world = world
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        region3 = Region("Region 3", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2, region3])
+
+        region1.add_locations({"Location 1": 1, "Location 2": 2, "Location 6": 6, "Location 7": 7}, RuleBuilderLocation)
+        region2.add_locations({"Location 3": 3, "Location 4": 4}, RuleBuilderLocation)
+        region3.add_locations({"Location 5": 5}, RuleBuilderLocation)
+
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, HasAny("Item 3", "Item 4"))
+        world.set_rule(world.get_location("Location 2"), CanReachRegion("Region 2") & Has("Item 2"))
+        world.set_rule(world.get_location("Location 4"), HasAll("Item 2", "Item 3"))
+        world.set_rule(world.get_location("Location 5"), CanReachLocation("Location 4"))
+        world.set_rule(world.get_location("Location 6"), CanReachEntrance("Region 1 -> Region 2") & Has("Item 2"))
+        world.set_rule(world.get_location("Location 7"), Has("Item 20"))
+        world.register_rule_builder_dependencies()
+
+        placements = {1: 1, 3: 2, 2: 3, 4: 4, 5: 6, 6: 7, 7: 8}
+        for location_number, item_number in placements.items():
+            location = world.get_location(f"Location {location_number}")
+            location.place_locked_item(world.create_item(f"Item {item_number}"))
+
+    def _sweep(self) -> set[str]:
+        state = CollectionState(self.multiworld)
+        state.sweep_for_advancements()
+        return {location.name for location in state.advancements}
+
+    def test_dependencies(self) -> None:
+        dependencies = self.world.get_rule_sweep_dependencies()
+        location4 = self.world.get_location("Location 4")
+        location2 = self.world.get_location("Location 2")
+        self.assertEqual(dependencies[id(location4.access_rule)], ({"Item 2", "Item 3"}, False))
+        self.assertEqual(dependencies[id(location2.access_rule)], ({"Item 2"}, True))
+
+    def test_sweep(self) -> None:
+        expected = {f"Location {i}" for i in range(1, 7)}
+        self.assertEqual(self._sweep(), expected)
+        self.world._rule_sweep_dependencies = {}  # pyright: ignore[reportPrivateUsage]
+        self.assertEqual(self._sweep(), expected)
+
+    def test_sweep_auto_indirect_conditions(self) -> None:
+        self.world.explicit_indirect_conditions = False
+        self.assertEqual(self._sweep(), {f"Location {i}" for i in range(1, 7)})
+
+
 class TestCacheDisabled(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
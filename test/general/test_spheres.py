@@ -0,0 +1,145 @@
+import unittest
+from collections import Counter
+from typing import List, Set
+from unittest import mock
+
+from BaseClasses import CollectionState, Location, MultiWorld
+from rule_builder.rules import Has
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+def get_cached_spheres(multiworld: MultiWorld) -> List[Set[Location]]:
+    """Returns the spheres shared by the accessibility check and the spoiler, in the format of `get_spheres`."""
+    multiworld.cache_spheres = True
+    cache = multiworld._get_spheres_cached()
+    return cache.spheres + ([set(), cache.unreachable] if cache.unreachable else [])
+
+
+def get_full_scan_spheres(multiworld: MultiWorld) -> List[Set[Location]]:
+    """Computes the spheres by checking every remaining location in every sphere, in the format of `get_spheres`."""
+    state = CollectionState(multiworld)
+    locations = set(multiworld.get_filled_locations())
+    spheres: List[Set[Location]] = []
+    while locations:
+        sphere = {location for location in locations if location.can_reach(state)}
+        spheres.append(sphere)
+        if not sphere:
+            spheres.append(locations)
+            break
+        for location in sphere:
+            state.collect(location.item, True, location)
+        locations -= sphere
+    return spheres
+
+
+class TestSpheres(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        self.items = {player: generate_items(4, player, True) for player in self.multiworld.player_ids}
+        self.locations = {}
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            self.locations[player] = generate_locations(4, player, menu)
+            # each location requires the item of the previous location
+            for location, item in zip(self.locations[player], self.items[player]):
+                location.place_locked_item(item)
+            for location, item in zip(self.locations[player][1:], self.items[player]):
+                location.access_rule = lambda state, item_name=item.name, p=player: state.has(item_name, p)
+
+    def assert_spheres(self) -> List[Set[Location]]:
+        """Ensure every way of getting the spheres matches checking every location in every sphere."""
+        spheres = get_full_scan_spheres(self.multiworld)
+        self.assertEqual(list(self.multiworld.get_spheres()), spheres)
+        self.assertEqual(get_cached_spheres(self.multiworld), spheres)
+        return spheres
+
+    def test_chain(self):
+        """Ensure the spheres follow the chain of each player."""
+        spheres = self.assert_spheres()
+        self.assertEqual(spheres, [{self.locations[1][i], self.locations[2][i]} for i in range(4)])
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+        self.multiworld.cache_spheres = False
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+    def test_cross_player_logic(self):
+        """Ensure locations depending on another player's items are found in the correct sphere."""
+        # player 1's chain continues only once player 2 found its last item
+        self.locations[1][1].access_rule = lambda state: state.has(self.items[2][3].name, 2)
+        spheres = self.assert_spheres()
+        self.assertEqual(spheres[4:], [{self.locations[1][1]}, {self.locations[1][2]}, {self.locations[1][3]}])
+
+    def test_cross_player_item_in_first_sphere(self):
+        """Ensure a location is not delayed by a sphere that did not collect any items of its own player."""
+        # the first sphere only finds items of player 2, one of which unlocks player 1's second location
+        first, last = self.locations[1][0], self.locations[2][3]
+        first.item, last.item = last.item, first.item
+        first.item.location, last.item.location = first, last
+        self.locations[1][1].access_rule = lambda state: state.has(self.items[2][0].name, 2)
+        spheres = self.assert_spheres()
+        self.assertEqual(spheres[:2], [{self.locations[1][0], self.locations[2][0]},
+                                       {self.locations[1][1], self.locations[2][1]}])
+
+    def test_unreachable(self):
+        """Ensure unreachable locations are reported after an empty sphere."""
+        self.locations[1][3].access_rule = lambda state: False
+        spheres = self.assert_spheres()
+        self.assertEqual(spheres[-2:], [set(), {self.locations[1][3]}])
+
+    def test_rule_changes(self):
+        """Ensure get_spheres and the accessibility check follow rule changes unless the spheres are cached."""
+        self.assertEqual(len(list(self.multiworld.get_spheres())), 4)
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+        self.locations[1][3].access_rule = lambda state: False
+        self.assertEqual(list(self.multiworld.get_spheres())[-2:], [set(), {self.locations[1][3]}])
+        with self.assertRaises(Exception):  # FillError in debug mode
+            self.multiworld.fulfills_accessibility()
+
+    def test_cache_follows_placements(self):
+        """Ensure the cached spheres are recomputed after placements change."""
+        self.assertEqual(len(get_cached_spheres(self.multiworld)), 4)
+        first, last = self.locations[1][0], self.locations[1][3]
+        first.item, last.item = last.item, first.item
+        first.item.location, last.item.location = first, last
+        self.assertEqual(get_cached_spheres(self.multiworld), get_full_scan_spheres(self.multiworld))
+
+    def test_rule_dependencies(self):
+        """Ensure access rules of known dependencies are only checked again once an item they depend on is collected,
+        while other rules are still checked after any player's state changed."""
+        dependencies = {}
+        for player in self.multiworld.player_ids:
+            world = self.multiworld.worlds[player]
+            for location, item in zip(self.locations[player][1:], self.items[player]):
+                location.access_rule = Has(item.name).resolve(world)
+                dependencies[id(location.access_rule)] = (frozenset((item.name,)), False)
+            world.get_rule_sweep_dependencies = lambda: dependencies
+        # a location of player 1 waits for player 2's last item without knowing it
+        self.locations[1][1].access_rule = lambda state: state.has(self.items[2][3].name, 2)
+
+        evaluations: Counter[int] = Counter()
+        evaluate = Has.Resolved._evaluate
+
+        def count_evaluations(rule: Has.Resolved, state: CollectionState) -> bool:
+            evaluations[id(rule)] += 1
+            return evaluate(rule, state)
+
+        with mock.patch.object(Has.Resolved, "_evaluate", count_evaluations):
+            spheres = get_cached_spheres(self.multiworld)
+        self.assertEqual(spheres, get_full_scan_spheres(self.multiworld))
+        self.assertEqual(spheres[4:], [{self.locations[1][1]}, {self.locations[1][2]}, {self.locations[1][3]}])
+        # each rule is checked once before and once after its item was collected
+        self.assertEqual(set(evaluations.values()), {2})
+
+    def test_sendable_spheres(self):
+        """Ensure events are left out of the logical spheres."""
+        for location in self.locations[1][:2]:
+            location.item.code = None
+        for location in self.locations[1][2:] + self.locations[2]:
+            location.address = location.item.code = 0
+        spheres = list(self.multiworld.get_sendable_spheres())
+        self.assertEqual(spheres, [{self.locations[1][i], self.locations[2][i]} - set(self.locations[1][:2])
+                                   for i in range(4)])
+
+        self.locations[1][3].access_rule = lambda state: False
+        self.locations[1][0].access_rule = lambda state: False
+        spheres = list(self.multiworld.get_sendable_spheres())
+        self.assertEqual(spheres, [{location} for location in self.locations[2]] + [set(), set(self.locations[1][2:])])
@@ -1,7 +1,9 @@
 import unittest
+from collections import Counter
 
+from BaseClasses import CollectionState, ItemCounter, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_items, generate_locations, generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +29,160 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+    def test_compact_all_state_matches(self):
+        """Ensure a compact state collects the same items as a regular state."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                regular_state = multiworld.get_all_state(False)
+                multiworld.compact_state = True
+                compact_state = multiworld.get_all_state(False)
+                for player, counter in regular_state.prog_items.items():
+                    self.assertIsInstance(compact_state.prog_items[player], ItemCounter)
+                    self.assertEqual(dict(counter), dict(compact_state.prog_items[player]))
+                self.assertEqual(regular_state.reachable_regions, compact_state.reachable_regions)
+
+
+class TestItemCounter(unittest.TestCase):
+    def test_counter_semantics(self):
+        """Ensure ItemCounter behaves like the Counter it replaces."""
+        counter = ItemCounter({})
+        self.assertEqual(counter["Missing"], 0)
+        self.assertNotIn("Missing", counter)
+        counter["Sword"] += 2
+        counter.update(["Bow", "Bow"])
+        counter.update({"Arrow": 10})
+        self.assertEqual(counter["Sword"], 2)
+        self.assertEqual(counter.total(), 14)
+        self.assertEqual(dict(counter), {"Sword": 2, "Bow": 2, "Arrow": 10})
+        self.assertEqual(counter.get("Missing", 5), 5)
+        del counter["Arrow"]
+        del counter["Missing"]
+        self.assertNotIn("Arrow", counter)
+        self.assertEqual(len(counter), 2)
+        self.assertEqual(counter, Counter({"Sword": 2, "Bow": 2}))
+
+    def test_copy_is_independent(self):
+        """Ensure copies share the name index but not the counts."""
+        index: dict[str, int] = {}
+        counter = ItemCounter(index)
+        counter["Sword"] = 1
+        copied = counter.copy()
+        copied["Sword"] += 1
+        copied["Shield"] = 1
+        self.assertEqual(counter["Sword"], 1)
+        self.assertEqual(counter["Shield"], 0)
+        self.assertEqual(copied["Sword"], 2)
+        self.assertIs(copied._index, index)
+        # interned by the copy, so the original has to grow on write
+        counter["Shield"] = 3
+        self.assertEqual(counter["Shield"], 3)
+        self.assertNotEqual(counter, copied)
+        copied["Sword"] = 1
+        copied["Shield"] = 3
+        self.assertEqual(counter, copied)
+
+    def test_non_int_counts(self):
+        """Ensure counts that don't fit the array, like fractions, are kept."""
+        counter = ItemCounter({})
+        counter["Charms"] += 0.5
+        counter["Charms"] += 1
+        counter["Sword"] = 1
+        copied = counter.copy()
+        copied["Charms"] = 2
+        self.assertEqual(counter["Charms"], 1.5)
+        self.assertEqual(counter.total(), 2.5)
+        self.assertEqual(copied["Charms"], 2)
+        self.assertFalse(copied._extra)
+        counter["Charms"] -= 1.5
+        self.assertIn("Charms", counter)
+        del counter["Charms"]
+        self.assertNotIn("Charms", counter)
+
+    def test_zero_counts(self):
+        """Ensure items set to 0 are kept until deleted, like in a Counter."""
+        for counter in (ItemCounter({}), Counter()):
+            with self.subTest(counter=type(counter).__name__):
+                counter["Sword"] = 1
+                counter["Sword"] -= 1
+                counter["Bow"] = 0
+                counter.subtract(["Arrow"])
+                self.assertIn("Sword", counter)
+                self.assertEqual(counter.get("Bow", 5), 0)
+                self.assertEqual(dict(counter), {"Sword": 0, "Bow": 0, "Arrow": -1})
+                self.assertEqual(len(counter), 3)
+                self.assertEqual(counter.total(), -1)
+                self.assertEqual(counter, Counter({"Arrow": -1}))
+                self.assertNotEqual(counter, Counter())
+                counter["Arrow"] += 1
+                self.assertEqual(counter, Counter())
+                for item in ("Sword", "Bow", "Arrow"):
+                    del counter[item]
+                self.assertEqual(len(counter), 0)
+                self.assertNotIn("Sword", counter)
+
+
+class TestCopyOnWriteState(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        self.multiworld.copy_on_write_state = True
+        self.keys = {}
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            locked = Region("Locked", player, self.multiworld)
+            self.multiworld.regions.append(locked)
+            key, reward = generate_items(2, player, True)
+            self.keys[player] = key
+            menu.connect(locked, rule=lambda state, key_name=key.name, p=player: state.has(key_name, p))
+            location = generate_locations(1, player, locked)[0]
+            location.place_locked_item(reward)
+        self.state = CollectionState(self.multiworld)
+
+    def test_copies_are_independent(self):
+        """Ensure mutating a copy-on-write copy does not change the original and vice versa."""
+        self.assertFalse(self.state.can_reach_region("Locked", 1))
+        self.assertFalse(self.state.can_reach_region("Locked", 2))
+        copied = self.state.copy()
+        self.assertIs(copied.prog_items[2], self.state.prog_items[2])
+
+        copied.collect(self.keys[1])
+        self.assertTrue(copied.can_reach_region("Locked", 1))
+        self.assertFalse(self.state.can_reach_region("Locked", 1))
+        self.assertEqual(self.state.count(self.keys[1].name, 1), 0)
+        self.assertEqual(copied.count("player1_progitem1", 1), 1)
+        self.assertEqual(len(copied.advancements), 1)
+        self.assertFalse(self.state.advancements)
+        # player 2 was never touched, so it is still shared
+        self.assertIs(copied.prog_items[2], self.state.prog_items[2])
+
+        self.state.add_item(self.keys[2].name, 2)
+        self.assertEqual(copied.count(self.keys[2].name, 2), 0)
+        self.assertIsNot(copied.prog_items[2], self.state.prog_items[2])
+
+    def test_copy_while_updating(self):
+        """Ensure copies made by rules while reachability is updated don't consider it up to date."""
+        copies = []
+        entrance = self.multiworld.get_entrance("Menu -> Locked", 1)
+        key_name = self.keys[1].name
+        entrance.access_rule = lambda state: copies.append(state.copy()) or state.has(key_name, 1)
+        self.assertFalse(self.state.can_reach_region("Locked", 1))
+        self.assertFalse(self.state.stale[1])
+        self.assertTrue(copies[0].stale[1])
+        copies[0].add_item(key_name, 1)
+        self.assertTrue(copies[0].can_reach_region("Locked", 1))
+        self.assertFalse(self.state.can_reach_region("Locked", 1))
+
+    def test_mixin_attributes(self):
+        """Ensure opted-in mixin attributes are copied per player on mutation."""
+        CollectionState.additional_copy_on_write_attributes.append("test_counters")
+        try:
+            self.state.test_counters = {player: set() for player in self.multiworld.player_ids}
+            copied = self.state.copy()
+            self.assertIs(copied.test_counters[1], self.state.test_counters[1])
+            copied.collect(self.keys[1], True)
+            copied.test_counters[1].add("collected")
+            self.assertFalse(self.state.test_counters[1])
+            self.assertIs(copied.test_counters[2], self.state.test_counters[2])
+        finally:
+            CollectionState.additional_copy_on_write_attributes.remove("test_counters")
@@ -0,0 +1,98 @@
+# Tests for NetUtils.encode and its _speedups implementation
+import enum
+import os
+import typing
+import unittest
+from json import JSONEncoder
+
+from NetUtils import ClientStatus, Hint, HintStatus, JSONTypes, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, \
+    _python_encode, decode, encode
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+_reference_encode = JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':')).encode
+
+
+def reference_encode(obj: typing.Any) -> str:
+    """encode before it was optimized, converting the message before encoding it"""
+    def scan(obj: typing.Any) -> typing.Any:
+        if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+            data = obj._asdict()
+            data["class"] = obj.__class__.__name__
+            return data
+        if isinstance(obj, (tuple, list, set, frozenset)):
+            return tuple(scan(o) for o in obj)
+        if isinstance(obj, dict):
+            return {key: scan(value) for key, value in obj.items()}
+        return obj
+    return _reference_encode(scan(obj))
+
+
+class Color(str, enum.Enum):
+    red = "red"
+
+
+class Empty(typing.NamedTuple):
+    pass
+
+
+class Nested(typing.NamedTuple):
+    item: NetworkItem
+    values: typing.List[typing.Any]
+
+
+sample_messages: typing.List[typing.Any] = [
+    [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(i, -i, i % 3, i % 4) for i in range(20)]}],
+    [{"cmd": "PrintJSON", "type": "ItemSend", "receiving": 2, "item": NetworkItem(1, 2, 3, 1),
+      "data": [{"type": JSONTypes.player_id, "text": "1"}, {"text": " sent \"Ünïcode\" ✓\n"},
+               {"type": JSONTypes.item_id, "text": "1", "player": 2, "flags": 1}]}],
+    [{"cmd": "Connected", "players": [NetworkPlayer(0, 1, "Alias", "Name")],
+      "slot_info": {1: NetworkSlot("Name", "Game", SlotType.group, [2, 3])},
+      "checked_locations": {1, 2, 3}, "missing_locations": frozenset(), "hint_points": 0}],
+    [{"cmd": "SetReply", "key": "hints", "value": [Hint(1, 2, 3, 4, False, status=HintStatus.HINT_PRIORITY)],
+      "original_value": (), "status": ClientStatus.CLIENT_GOAL}],
+    {"floats": [0.1, 1e100, -0.0, float("nan"), float("inf"), float("-inf")], "bools": [True, False, None]},
+    {1: "int key", 2.5: "float key", False: "bool key", None: "none key", Color.red: Color.red},
+    {"nested": Nested(NetworkItem(1, 2, 3), [NetworkItem(4, 5, 6), (7, 8)]), "empty": Empty(), "dicts": {"a": {}}},
+    "top level string",
+    12,
+    [],
+    {},
+]
+
+
+class Base:
+    class TestEncode(unittest.TestCase):
+        encode: typing.Callable[[typing.Any], str]
+
+        def test_same_output(self) -> None:
+            """Ensure the output is the same as converting the message before encoding it."""
+            for message in sample_messages:
+                with self.subTest(message=message):
+                    self.assertEqual(self.encode(message), reference_encode(message))
+
+        def test_decode(self) -> None:
+            """Ensure NamedTuples are restored when decoding."""
+            message = [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4)]}]
+            self.assertEqual(decode(self.encode(message)), message)
+
+        def test_unsupported(self) -> None:
+            """Ensure unsupported values and keys raise TypeError, including sets in a NamedTuple."""
+            for message in ({"key": object()}, {(1, 2): "tuple key"}, [Nested(NetworkItem(1, 2, 3), {1})]):
+                with self.subTest(message=message):
+                    with self.assertRaises(TypeError):
+                        self.encode(message)
+
+
+class TestPurePythonEncode(Base.TestEncode):
+    """Run base tests for the pure python implementation."""
+    encode = staticmethod(_python_encode)
+
+
+@unittest.skipIf(encode is _python_encode and not ci, "_speedups not available")
+class TestSpeedupsEncode(Base.TestEncode):
+    """Run base tests for the cython implementation."""
+    encode = staticmethod(encode)
+
+    def setUp(self) -> None:
+        self.assertFalse(encode is _python_encode, "Failed to load _speedups")
@@ -1,5 +1,6 @@
 # Tests for _speedups.LocationStore and NetUtils._LocationStore
 import os
+import random
 import typing
 import unittest
 import warnings
@@ -112,10 +113,44 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_order(self) -> None:
+            # results are in the order of the store, no matter the order of the receivers
+            self.assertEqual(list(self.store.find_item({5, 3, 4}, 99)),
+                             [(sender, location, *data) for sender, locations in self.store.items()
+                              for location, data in locations.items() if data[0] == 99])
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
+            self.assertEqual(list(self.store.get_for_player(1)), [1, 2])
             self.assertEqual(self.store.get_for_player(9999), {})
+            self.assertEqual(self.store.get_for_player(0), {})
+
+        def test_get_for_player_copy(self) -> None:
+            self.store.get_for_player(2)[1].clear()
+            self.assertEqual(self.store.get_for_player(2), {1: {11, 12}, 2: {21}})
+
+        def test_indexes_match_scan(self) -> None:
+            rng = random.Random(0)
+            data: RawLocations = {
+                sender: {location: (rng.randint(1, 20), rng.randint(1, 30), 0)
+                         for location in rng.sample(range(1000), 200)}
+                for sender in range(1, 31)
+            }
+            store = type(self.store)(data)
+            scan = [(sender, location, item, receiver, flags)
+                    for sender, locations in sorted(data.items())
+                    for location, (item, receiver, flags) in sorted(locations.items())]
+            for receiver in range(32):
+                expected: typing.Dict[int, typing.Set[int]] = {}
+                for sender, location, _, entry_receiver, _ in scan:
+                    if entry_receiver == receiver:
+                        expected.setdefault(sender, set()).add(location)
+                self.assertEqual(store.get_for_player(receiver), expected)
+            for item in range(22):
+                for slots in ({1}, {5, 17, 2}, set(range(40))):
+                    self.assertEqual(sorted(store.find_item(slots, item)),
+                                     [entry for entry in scan if entry[2] == item and entry[3] in slots])
 
         def test_get_checked(self) -> None:
             self.assertEqual(self.store.get_checked(full_state, 0, 1), [11, 12, 13])
@@ -0,0 +1,95 @@
+# Tests for the multidata container format
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from NetUtils import Hint, HintStatus, LazyMultiData, MultiData, NetworkSlot, SlotType, decode_multidata, \
+    encode_multidata, multidata_format_version
+from Utils import VersionException, restricted_dumps
+
+
+def make_multidata(players: int = 3) -> MultiData:
+    slots = range(1, players + 1)
+    return {
+        "slot_data": {slot: {"option": slot} for slot in slots},
+        "slot_info": {slot: NetworkSlot(f"Player{slot}", "Test Game", SlotType.player) for slot in slots},
+        "connect_names": {f"Player{slot}": (0, slot) for slot in slots},
+        "locations": {slot: {slot * 100 + i: (i, slot, 0) for i in range(10)} for slot in slots},
+        "checks_in_area": {slot: {"Total": 10} for slot in slots},
+        "server_options": {"hint_cost": 10},
+        "er_hint_data": {slot: {} for slot in slots},
+        "precollected_items": {slot: [1, 2] for slot in slots},
+        "precollected_hints": {slot: {Hint(slot, slot, 100, 1, False, status=HintStatus.HINT_PRIORITY)}
+                               for slot in slots},
+        "version": (0, 6, 0),
+        "tags": ["AP"],
+        "minimum_versions": {"server": (0, 5, 0), "clients": {}},
+        "seed_name": "12345",
+        "spheres": [{slot: {slot * 100} for slot in slots}],
+        "datapackage": {"Test Game": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 100},
+                                      "checksum": "abc"}},
+        "race_mode": 0,
+    }
+
+
+class TestMultidata(unittest.TestCase):
+    def test_roundtrip(self) -> None:
+        """Ensure encoded multidata decodes to the same dict."""
+        multidata = make_multidata()
+        data = encode_multidata(multidata)
+        self.assertEqual(data[0], multidata_format_version)
+        decoded = decode_multidata(data)
+        self.assertIsInstance(decoded, dict)
+        self.assertEqual(decoded, multidata)
+        self.assertEqual(list(decoded), list(multidata))
+
+    def test_lazy(self) -> None:
+        """Ensure lazy multidata only decodes the sections that are accessed."""
+        multidata = make_multidata()
+        lazy = decode_multidata(memoryview(encode_multidata(multidata)), lazy=True)
+        assert isinstance(lazy, LazyMultiData)
+        self.assertEqual(lazy.datapackage_checksums, {"Test Game": "abc"})
+        self.assertEqual(lazy["locations"][2], multidata["locations"][2])
+        self.assertEqual(lazy["slot_data"][3], {"option": 3})
+        self.assertEqual(set(lazy["locations"]), {1, 2, 3})
+        self.assertNotIn(4, lazy["locations"])
+        decoded = lazy["locations"]._decoded  # type: ignore[attr-defined]
+        self.assertEqual(set(decoded), {2})
+        self.assertEqual(lazy["seed_name"], "12345")
+        self.assertEqual(lazy.get("spheres"), multidata["spheres"])
+        self.assertIsNone(lazy.get("missing"))
+        self.assertEqual(lazy.to_dict(), multidata)
+
+    def test_section_size(self) -> None:
+        """Ensure values of split keys share sections up to the section size, but never with other keys."""
+        multidata = make_multidata(10)
+        lazy = decode_multidata(encode_multidata(multidata), lazy=True)
+        assert isinstance(lazy, LazyMultiData)
+        self.assertEqual({lazy.index["locations", slot][0] for slot in range(1, 11)}, {lazy.index["locations", 1][0]})
+        self.assertEqual(len({lazy.index[name][0] for name in (("base", None), ("locations", 1), ("slot_data", 1))}), 3)
+
+        with mock.patch("NetUtils.multidata_section_size", 1):
+            lazy = decode_multidata(encode_multidata(multidata), lazy=True)
+        assert isinstance(lazy, LazyMultiData)
+        self.assertEqual(len({lazy.index["locations", slot][0] for slot in range(1, 11)}), 10)
+        self.assertEqual(lazy["locations"][5], multidata["locations"][5])
+        self.assertEqual(lazy.to_dict(), multidata)
+
+    def test_legacy_format(self) -> None:
+        """Ensure multidata in the unsectioned format is still loaded, also when requested lazily."""
+        multidata = make_multidata()
+        data = bytes([3]) + zlib.compress(restricted_dumps(multidata), 9)
+        self.assertEqual(decode_multidata(data), multidata)
+        self.assertEqual(decode_multidata(data, lazy=True), multidata)
+
+        with (Path(__file__).parent.parent / "webhost" / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            legacy = decode_multidata(f.read())
+        self.assertEqual(decode_multidata(encode_multidata(legacy)), legacy)
+
+    def test_newer_format(self) -> None:
+        """Ensure multidata of an unknown format is rejected."""
+        data = bytearray(encode_multidata(make_multidata()))
+        data[0] = multidata_format_version + 1
+        with self.assertRaises(VersionException):
+            decode_multidata(bytes(data))
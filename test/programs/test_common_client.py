@@ -93,3 +93,30 @@ class TestCommonContext(unittest.IsolatedAsyncioTestCase):
         assert self.ctx.item_names.lookup_in_slot(-1, 3) == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame1") == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame2") == "Nothing"
+
+    async def test_resume_received_items(self):
+        sent = []
+
+        async def send_msgs(msgs):
+            sent.extend(msgs)
+
+        self.ctx.send_msgs = send_msgs
+        self.ctx.seed_name = "seed"
+        self.ctx.auth = "Player 1"
+        self.ctx.items_handling = 0b111
+        items = [NetUtils.NetworkItem(2 ** 54 + 1, 2 ** 54 + 1, 2, 0), NetUtils.NetworkItem(-1, -2, 0, 0)]
+        self.ctx.items_received = list(items)
+        self.ctx.reset_server_state()
+        assert self.ctx.items_received == []
+
+        self.ctx.auth = "Player 1"
+        await self.ctx.send_connect()
+        assert sent[0]["received_items"] == {"index": 2, "hash": NetUtils.received_items_hash(items)}
+        assert self.ctx.items_received == items, "items should be kept while resuming"
+
+        # a different slot does not resume
+        self.ctx.reset_server_state()
+        self.ctx.auth = "Player 2"
+        await self.ctx.send_connect()
+        assert "received_items" not in sent[2]
+        assert self.ctx.items_received == []
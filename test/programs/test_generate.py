@@ -1,5 +1,6 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import logging
 import unittest
 import os
 import os.path
@@ -72,6 +73,109 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_options_cache(self):
+        cache_dir = TemporaryDirectory(prefix='AP_cache_')
+        weighted_dir = TemporaryDirectory(prefix='AP_weighted_')
+        with open(os.path.join(weighted_dir.name, 'weighted.yaml'), 'w') as f:
+            f.write("name: Weighted\n"
+                    "game: APQuest\n"
+                    "APQuest:\n"
+                    "  hard_mode: {'true': 1, 'false': 1}\n"
+                    "  trap_chance: {random: 1, 10: 1, 20: 1}\n"
+                    "  confetti_explosiveness: random-range-2-8\n"
+                    "  player_sprite: [duck, kitty, horse]\n")
+        original_cache_path = getattr(Generate.Utils.cache_path, "cached_path", None)
+        Generate.Utils.cache_path.cached_path = cache_dir.name
+        try:
+            for input_dir in (str(self.abs_input_dir), weighted_dir.name):
+                for seed in ('0', '1', '2'):
+                    with self.subTest(input_dir=input_dir, seed=seed):
+                        results = []
+                        for extra_args in ([], ['--options_cache'], ['--options_cache']):
+                            sys.argv = [sys.argv[0], '--seed', seed,
+                                        '--player_files_path', input_dir,
+                                        '--outputpath', self.output_tempdir.name, *extra_args]
+                            namespace, _ = Generate.main()
+                            del namespace.options_cache
+                            results.append({key: repr(value) for key, value in vars(namespace).items()})
+                            results[-1]["next random"] = repr(Generate.random.random())  # the same numbers were drawn
+                        self.assertEqual(results[0], results[1])
+                        self.assertEqual(results[0], results[2])
+            for category in ("yaml", "options"):
+                self.assertEqual(len(os.listdir(os.path.join(cache_dir.name, "generate", category))), 2)
+        finally:
+            if original_cache_path is None:
+                del Generate.Utils.cache_path.cached_path
+            else:
+                Generate.Utils.cache_path.cached_path = original_cache_path
+            weighted_dir.cleanup()
+            cache_dir.cleanup()
+
+    def test_generate_progress(self):
+        from Utils import GenerationCancelled, set_generation_progress_callback
+        stages = []
+
+        def report(stage, progress):
+            stages.append(stage)
+            if stage == "fill" and cancel:
+                raise GenerationCancelled()
+
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        set_generation_progress_callback(report)
+        try:
+            cancel = False
+            Main.main(*Generate.main())
+            self.assertOutput(self.output_tempdir.name)
+            for stage in ("generate_early", "create_regions", "fill", "archive"):
+                self.assertIn(stage, stages)
+
+            cancel = True
+            stages.clear()
+            with self.assertRaises(GenerationCancelled):
+                Main.main(*Generate.main())
+            self.assertEqual(stages[-1], "fill")
+        finally:
+            set_generation_progress_callback(None)
+
+    def test_generate_batch(self):
+        sys.argv = [sys.argv[0], '--seed_list', '1,2',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        results = Generate.run_batch(Generate.mystery_argparse())
+        self.assertEqual([result.seed for result in results], [1, 2])
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertIn("fill", result.stage_times)
+        self.assertEqual(len(list(Path(self.output_tempdir.name).glob('*.zip'))), 2)
+        # the summary is logged into the timestamped batch log, not a new file
+        log_files = [os.path.basename(handler.baseFilename) for handler in logging.getLogger().handlers
+                     if isinstance(handler, logging.FileHandler)]
+        self.assertEqual(len(log_files), 1)
+        self.assertRegex(log_files[0], r"^Generate_Batch_1_\d{4}_")
+
+    def test_output_archive(self):
+        import zipfile
+        input_dir = Path(self.output_tempdir.name) / "input"
+        input_dir.mkdir()
+        (input_dir / "text.txt").write_text("compressible " * 1000)
+        (input_dir / "random.bin").write_bytes(os.urandom(10000))
+        zip_path = os.path.join(self.output_tempdir.name, "output.zip")
+
+        with self.assertRaises(ValueError), Main.OutputArchive(zip_path) as archive:
+            archive.add_directory_contents(str(input_dir))
+            raise ValueError()
+        self.assertEqual(os.listdir(self.output_tempdir.name), ["input"])
+
+        with Main.OutputArchive(zip_path) as archive:
+            archive.add_directory_contents(str(input_dir))
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertEqual(zf.getinfo("text.txt").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.getinfo("random.bin").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.read("random.bin"), (input_dir / "random.bin").read_bytes())
+        self.assertEqual(sorted(os.listdir(self.output_tempdir.name)), ["input", "output.zip"])
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +212,10 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_progress = None
+    test_generate_options_cache = None
+    test_generate_batch = None
+    test_output_archive = None
 
     def test_generate_yaml(self):
         from settings import get_settings
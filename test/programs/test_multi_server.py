@@ -1,5 +1,14 @@
+import asyncio
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+
+from MultiServer import Client, Context, LatencyHistogram, SaveJournal, ServerCommandProcessor, process_client_cmd, \
+    register_location_checks, send_items_to, send_new_items, update_aliases
+from NetUtils import Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType, decode, encode, \
+    received_items_hash
+from Utils import version_tuple
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +47,484 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class RecordingSocket:
+    open = True
+    state = None  # skipped by websockets.broadcast, only direct sends are recorded
+    extensions = ()
+
+    def __init__(self) -> None:
+        self.messages: list[dict] = []
+        self.sent: list[str] = []
+
+    async def send(self, msg: str) -> None:
+        self.sent.append(msg)
+        self.messages += decode(msg)
+
+    def received_items(self) -> list[tuple[int, list[int]]]:
+        return [(msg["index"], [item.item for item in msg["items"]])
+                for msg in self.messages if msg["cmd"] == "ReceivedItems"]
+
+
+async def sent(ctx: Context) -> None:
+    """Sends the messages queued by ctx and lets the sending tasks run."""
+    ctx.flush_outboxes()
+    await asyncio.sleep(0)
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.locations = LocationStore({
+            1: {101: (11, 2, 0), 102: (12, 3, 0)},
+            2: {201: (21, 1, 0)},
+            3: {301: (31, 3, 0)},
+        })
+        self.ctx.clients[0] = {}
+        self.sockets: dict[int, RecordingSocket] = {}
+        for slot in (1, 2, 3):
+            self.ctx.player_names[0, slot] = f"Player{slot}"
+            self.ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Test Game", SlotType.player)
+            socket = self.sockets[slot] = RecordingSocket()
+            client = Client(socket, self.ctx)  # type: ignore[arg-type]
+            client.auth, client.team, client.slot = True, 0, slot
+            client.items_handling = 0b111
+            self.ctx.clients[0][slot] = [client]
+            self.ctx.endpoints.append(client)
+
+    async def test_only_receivers(self) -> None:
+        """Ensure checks send ReceivedItems to the receivers of the checked items only."""
+        register_location_checks(self.ctx, 0, 1, [101])
+        await sent(self.ctx)
+        self.assertEqual(self.sockets[2].received_items(), [(0, [11])])
+        self.assertEqual(self.sockets[1].received_items(), [])
+        self.assertEqual(self.sockets[3].received_items(), [])
+        self.assertFalse(self.ctx.new_item_receivers)
+
+        register_location_checks(self.ctx, 0, 1, [102])
+        register_location_checks(self.ctx, 0, 3, [301])
+        await sent(self.ctx)
+        self.assertEqual(self.sockets[3].received_items(), [(0, [12]), (1, [31])])
+        self.assertEqual(self.sockets[2].received_items(), [(0, [11])])
+
+    async def test_late_client(self) -> None:
+        """Ensure a client that connected after items were sent to its slot still gets only new items."""
+        register_location_checks(self.ctx, 0, 2, [201])
+        await sent(self.ctx)
+        late_socket = RecordingSocket()
+        late_client = Client(late_socket, self.ctx)  # type: ignore[arg-type]
+        late_client.auth, late_client.team, late_client.slot = True, 0, 1
+        late_client.send_index = 1
+        self.ctx.clients[0][1].append(late_client)
+        send_items_to(self.ctx, 0, 1, NetworkItem(99, -1, 0))
+        send_new_items(self.ctx)
+        await sent(self.ctx)
+        self.assertEqual(self.sockets[1].received_items(), [(0, [21]), (1, [99])])
+        self.assertEqual(late_socket.received_items(), [(1, [99])])
+
+
+class TestHintIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.locations = LocationStore({
+            1: {101: (11, 2, 0), 102: (12, 2, 0)},
+            2: {201: (21, 1, 0)},
+        })
+        for slot in (1, 2):
+            self.ctx.player_names[0, slot] = f"Player{slot}"
+            self.ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Test Game", SlotType.player)
+        self.ctx.clients[0] = {1: [], 2: []}
+        self.hints = [Hint(2, 1, 101, 11, False), Hint(2, 1, 102, 12, False), Hint(1, 2, 201, 21, False)]
+        self.ctx.notify_hints(0, self.hints)
+
+    async def test_check(self) -> None:
+        """Ensure a check updates the hint for its location in the hints of the finder and the receiver only."""
+        register_location_checks(self.ctx, 0, 1, [101])
+        found = self.hints[0]._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(self.ctx.hints[0, 1], {found, self.hints[1], self.hints[2]})
+        self.assertEqual(self.ctx.hints[0, 2], {found, self.hints[1], self.hints[2]})
+        self.assertEqual(self.ctx.get_hint(0, 1, 101), found)
+        self.assertEqual(self.ctx.get_hint(0, 1, 102), self.hints[1])
+        self.assertIsNone(self.ctx.get_hint(0, 2, 101))
+
+    async def test_replace(self) -> None:
+        """Ensure hint status updates are visible through get_hint and survive a later check."""
+        priority = self.hints[1].re_prioritize(self.ctx, HintStatus.HINT_PRIORITY)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, self.hints[1], priority)
+        self.assertEqual(self.ctx.get_hint(0, 1, 102), priority)
+        register_location_checks(self.ctx, 0, 1, [102])
+        found = priority._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(self.ctx.get_hint(0, 1, 102), found)
+        self.assertIn(found, self.ctx.hints[0, 2])
+        self.assertNotIn(priority, self.ctx.hints[0, 2])
+
+    async def test_load(self) -> None:
+        """Ensure hints of a loaded save are indexed and refreshed against its location checks."""
+        self.ctx.location_checks[0, 2].add(201)
+        save = self.ctx.get_save()
+        self.assertEqual(save["hints"][0, 1], set(self.hints))
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.set_save(save)
+        found = self.hints[2]._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(ctx.get_hint(0, 2, 201), found)
+        self.assertEqual(ctx.hints[0, 1], {self.hints[0], self.hints[1], found})
+
+
+class TestSetReplies(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.clients: list[Client] = []
+        for slot in (1, 2, 3):
+            client = Client(RecordingSocket(), self.ctx)  # type: ignore[arg-type]
+            client.auth, client.team, client.slot = True, 0, slot
+            self.clients.append(client)
+        self.replies: list[tuple[set[int], dict]] = []
+        self.ctx.broadcast = lambda endpoints, msgs: self.replies.append(  # type: ignore[method-assign]
+            ({client.slot for client in endpoints}, *decode(encode(msgs))))
+
+    async def set(self, client: Client, operations: list[dict], **args: typing.Any) -> None:
+        await process_client_cmd(self.ctx, client, {"cmd": "Set", "key": "counter", "default": 0,
+                                                    "operations": operations, **args})
+
+    async def test_immediate(self) -> None:
+        """Ensure every Set notifies the watching clients and the setter if it wants a reply."""
+        await process_client_cmd(self.ctx, self.clients[0], {"cmd": "SetNotify", "keys": ["counter"]})
+        await self.set(self.clients[1], [{"operation": "add", "value": 1}])
+        await self.set(self.clients[2], [{"operation": "add", "value": 2}], want_reply=True)
+        self.assertEqual([(slots, reply["original_value"], reply["value"]) for slots, reply in self.replies],
+                         [({1}, 0, 1), ({1, 3}, 1, 3)])
+        self.assertEqual(self.ctx.stored_data_sets["counter"], 2)
+        self.assertEqual(self.ctx.stored_data_notifications["counter"], 3)
+
+    async def test_coalesced(self) -> None:
+        """Ensure coalesced Sets notify watching clients once per tick and still reply to the setter directly."""
+        self.ctx.coalesce_set_replies = True
+        await process_client_cmd(self.ctx, self.clients[0], {"cmd": "SetNotify", "keys": ["counter"]})
+        await self.set(self.clients[1], [{"operation": "add", "value": 1}])
+        await self.set(self.clients[2], [{"operation": "add", "value": 2}], want_reply=True, tag="last")
+        await self.set(self.clients[1], [{"operation": "mul", "value": 10}])
+        self.assertEqual([(slots, reply["original_value"], reply["value"]) for slots, reply in self.replies],
+                         [({3}, 1, 3)])
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.replies), 2)
+        slots, reply = self.replies[1]
+        self.assertEqual(slots, {1})
+        self.assertEqual((reply["original_value"], reply["value"], reply["slot"]), (0, 30, 2))
+        self.assertNotIn("tag", reply)
+        self.assertEqual(self.ctx.stored_data_sets["counter"], 3)
+        self.assertEqual(self.ctx.stored_data_set_replies["counter"], 2)
+
+    async def test_size_limit(self) -> None:
+        """Ensure Sets that exceed the size limit are rejected without changing the stored value."""
+        self.ctx.stored_data_size_limit = 20
+        await self.set(self.clients[0], [{"operation": "replace", "value": [1, 2, 3]}])
+        await self.set(self.clients[0], [{"operation": "add", "value": list(range(10))}])
+        self.assertEqual(self.ctx.stored_data["counter"], [1, 2, 3])
+        self.assertEqual(self.ctx.stored_data_sizes["counter"], len(encode([1, 2, 3])))
+        await self.set(self.clients[0], [{"operation": "update", "value": list(range(20))}])
+        self.assertEqual(self.ctx.stored_data["counter"], [1, 2, 3])
+        await sent(self.ctx)
+        messages = self.clients[0].socket.messages  # type: ignore[attr-defined]
+        self.assertEqual([message["cmd"] for message in messages], ["InvalidPacket", "InvalidPacket"])
+
+    async def test_sizes(self) -> None:
+        """Ensure value sizes are tracked without a limit, loaded with a save and shown by /datastore."""
+        await self.set(self.clients[0], [{"operation": "replace", "value": [1, 2, 3]}])
+        await process_client_cmd(self.ctx, self.clients[0], {"cmd": "Set", "key": "name", "default": "",
+                                                             "operations": [{"operation": "add", "value": "abc"}]})
+        await self.set(self.clients[0], [{"operation": "add", "value": [4]}])
+        sizes = {"counter": len(encode([1, 2, 3, 4])), "name": len(encode("abc"))}
+        self.assertEqual(self.ctx.stored_data_sizes, sizes)
+        self.assertEqual(self.ctx.metrics.stored_data_bytes, sum(sizes.values()))
+
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.set_save(self.ctx.get_save())
+        self.assertEqual(ctx.stored_data_sizes, sizes)
+        self.assertEqual(ctx.metrics.as_dict()["stored_data_bytes"], sum(sizes.values()))
+        self.assertIn(f"archipelago_stored_data_bytes {sum(sizes.values())}", ctx.metrics.as_text())
+
+        output: list[str] = []
+        processor = ServerCommandProcessor(ctx)
+        processor.output = output.append  # type: ignore[method-assign]
+        processor("/datastore")
+        self.assertIn(f"Key: counter | Size: {sizes['counter']}B", output[0])
+        self.assertTrue(output[0].startswith(f"Found 2 keys, totaling {sum(sizes.values())}.00 B"), output[0])
+
+
+class TestSharedGameData(unittest.TestCase):
+    def make_context(self, game_package: dict) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {"Archipelago": ctx.gamespackage["Archipelago"], "Test Game": game_package}
+        ctx.item_name_groups = {"Archipelago": {}, "Test Game": {"Group": {"Item"}}}
+        ctx._init_game_data()
+        return ctx
+
+    def test_shared(self) -> None:
+        """Ensure Contexts with the same data packages share their lookups."""
+        package = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}, "checksum": "test"}
+        first, second = self.make_context(package), self.make_context(dict(package))
+        self.assertIs(first.item_names["Test Game"], second.item_names["Test Game"])
+        self.assertIs(first.location_names["Test Game"], second.location_names["Test Game"])
+        self.assertIs(first.all_item_and_group_names["Test Game"], second.all_item_and_group_names["Test Game"])
+        self.assertEqual(first.item_names["Test Game"][1], "Item")
+        self.assertEqual(first.item_names["Test Game"][-1], "Nothing")  # Archipelago items are included
+        self.assertEqual(first.item_names["Test Game"][3], "Unknown item (ID:3)")
+        self.assertEqual(first.location_names["Test Game"][2], "Location")
+        self.assertEqual(first.all_item_and_group_names["Test Game"], {"Item", "Group"})
+
+        changed = self.make_context({**package, "item_name_to_id": {"Other Item": 1}, "checksum": "other"})
+        self.assertEqual(changed.item_names["Test Game"][1], "Other Item")
+        self.assertEqual(first.item_names["Test Game"][1], "Item")
+
+    def test_without_checksum(self) -> None:
+        """Ensure data packages without checksum get lookups of their own."""
+        package = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}}
+        first, second = self.make_context(package), self.make_context(package)
+        self.assertIsNot(first.item_names["Test Game"], second.item_names["Test Game"])
+        self.assertEqual(second.item_names["Test Game"][1], "Item")
+
+
+class TestEncodedPayloads(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.gamespackage = {
+            "Archipelago": {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {}, "checksum": "a"},
+            "Test Game": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 1}, "checksum": "b"},
+        }
+        self.ctx.locations = LocationStore({1: {1: (1, 2, 0)}, 2: {1: (1, 1, 0)}})
+        self.ctx.slot_data = {1: {"option": 1}, 2: {"option": ["two"]}}
+        self.ctx.clients[0] = {}
+        for slot in (1, 2):
+            self.ctx.player_names[0, slot] = f"Player{slot}"
+            self.ctx.connect_names[f"Player{slot}"] = (0, slot)
+            self.ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Test Game", SlotType.player)
+            self.ctx.games[slot] = "Test Game"
+            self.ctx.minimum_client_versions[slot] = version_tuple
+            self.ctx.clients[0][slot] = []
+        self.ctx.start_inventory[1] = [NetworkItem(1, -2, 0)]
+
+    async def connect(self, name: str, **args: typing.Any) -> list[dict]:
+        socket = RecordingSocket()
+        client = Client(socket, self.ctx)  # type: ignore[arg-type]
+        await process_client_cmd(self.ctx, client, {
+            "cmd": "Connect", "name": name, "password": None, "game": "Test Game", "version": version_tuple,
+            "items_handling": 0b111, "tags": [], "uuid": name, **args})
+        await sent(self.ctx)
+        return socket.messages
+
+    async def test_connected(self) -> None:
+        """Ensure Connected contains the same data as without cached parts, also after the cached data changed."""
+        for _ in range(2):
+            connected, received_items = (await self.connect("Player1"))[:2]
+            self.assertEqual(connected["cmd"], "Connected")
+            self.assertEqual(connected["slot_info"], decode(encode(self.ctx.slot_info)))
+            self.assertEqual(connected["players"], decode(encode(self.ctx.get_players_package())))
+            self.assertEqual(connected["slot_data"], {"option": 1})
+            self.assertEqual(connected["missing_locations"], [1])
+            self.assertEqual(received_items, {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, -2, 0)]})
+        connected = (await self.connect("Player2", slot_data=False))[0]
+        self.assertNotIn("slot_data", connected)
+        self.assertEqual(connected["slot"], 2)
+        self.assertEqual((await self.connect("Player2"))[0]["slot_data"], {"option": ["two"]})
+
+        self.ctx.name_aliases[0, 2] = "Alias"
+        update_aliases(self.ctx, 0)
+        connected = (await self.connect("Player1"))[0]
+        self.assertEqual(connected["players"][1].alias, "Alias (Player2)")
+
+    async def test_resume_received_items(self) -> None:
+        """Ensure a reconnecting client with matching received_items only gets the items after them."""
+        items = [NetworkItem(1, -2, 0)] + [NetworkItem(i, 1, 2, 0) for i in range(10, 15)]
+        self.ctx.received_items[0, 1, True] = items[1:]
+
+        def received(messages: list[dict]) -> list[tuple[int, list[int]]]:
+            return [(msg["index"], [item.item for item in msg["items"]])
+                    for msg in messages if msg["cmd"] == "ReceivedItems"]
+
+        resume = {"index": 3, "hash": received_items_hash(items[:3])}
+        self.assertEqual(received(await self.connect("Player1", received_items=resume)), [(3, [12, 13, 14])])
+        resume = {"index": 6, "hash": received_items_hash(items)}
+        self.assertEqual(received(await self.connect("Player1", received_items=resume)), [])
+        for resume in ({"index": 3, "hash": received_items_hash(items[1:4])}, {"index": 7, "hash": ""},
+                       {"index": "3", "hash": received_items_hash(items[:3])}, None):
+            with self.subTest(resume=resume):
+                self.assertEqual(received(await self.connect("Player1", received_items=resume)),
+                                 [(0, [1, 10, 11, 12, 13, 14])])
+
+    async def test_data_package(self) -> None:
+        """Ensure DataPackage is encoded the same as without cached parts."""
+        for args, games in (({}, ["Archipelago", "Test Game"]), ({"games": ["Test Game"]}, ["Test Game"]),
+                            ({"exclusions": ["Test Game"]}, ["Archipelago"])):
+            socket = RecordingSocket()
+            await process_client_cmd(self.ctx, Client(socket, self.ctx),  # type: ignore[arg-type]
+                                     {"cmd": "GetDataPackage", **args})
+            await sent(self.ctx)
+            expected = {game: self.ctx.gamespackage[game] for game in games}
+            self.assertEqual(socket.sent, [encode([{"cmd": "DataPackage", "data": {"games": expected}}])])
+
+
+class TestServerMetrics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.gamespackage = {"Test Game": {"item_name_to_id": {}, "location_name_to_id": {}, "checksum": "a"}}
+
+    async def test_commands(self) -> None:
+        """Ensure commands and the messages sent for them are counted, with unknown names counted as other."""
+        clients = [Client(RecordingSocket(), self.ctx) for _ in range(2)]  # type: ignore[arg-type]
+        for args in ({"cmd": "GetDataPackage"}, {"cmd": "GetDataPackage"}, {"cmd": "Unknown"}, {"cmd": ["Unknown"]}):
+            await process_client_cmd(self.ctx, clients[0], args)
+        self.ctx.broadcast(clients, [{"cmd": "PrintJSON", "data": [{"text": "Hello"}]}])
+        await sent(self.ctx)
+
+        metrics = self.ctx.metrics
+        self.assertEqual({cmd: histogram.count for cmd, histogram in metrics.command_latency.items()},
+                         {"GetDataPackage": 2, "other": 2})
+        self.assertEqual(metrics.sent_msgs, {"DataPackage": 2, "InvalidPacket": 1, "PrintJSON": 2})
+        data_package = encode([{"cmd": "DataPackage", "data": {"games": self.ctx.gamespackage}}])
+        self.assertEqual(metrics.sent_bytes["DataPackage"], 2 * len(data_package))
+        self.assertEqual(metrics.sent_frames, 2)
+        self.assertEqual(metrics.max_outbox_msgs, 4)
+        self.assertEqual(metrics.as_dict()["commands"]["GetDataPackage"]["count"], 2)
+        text = metrics.as_text('room="1"')
+        self.assertIn('archipelago_command_seconds_count{room="1",cmd="GetDataPackage"} 2', text)
+        self.assertIn('archipelago_command_seconds_bucket{room="1",cmd="other",le="+Inf"} 2', text)
+        self.assertIn('archipelago_sent_messages_total{room="1",cmd="PrintJSON"} 2', text)
+
+    def test_histogram(self) -> None:
+        """Ensure quantiles are the upper bound of their bucket, or the maximum if that is lower or unbounded."""
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.quantile(0.99), 0)
+        for seconds in (0.0002, 0.003, 0.004, 0.02, 30.):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.quantile(0.2), 0.0005)
+        self.assertEqual(histogram.quantile(0.5), 0.005)
+        self.assertEqual(histogram.quantile(0.99), 30.)
+        self.assertEqual((histogram.count, histogram.max), (5, 30.))
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.ctx = self.make_context()
+
+    def make_context(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.locations = LocationStore({
+            1: {101: (11, 2, 0), 102: (12, 1, 0)},
+            2: {201: (21, 1, 0), 202: (22, 2, 0)},
+        })
+        for slot in (1, 2):
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.connect_names[f"Player{slot}"] = (0, slot)
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Test Game", SlotType.player)
+        ctx.save_filename = os.path.join(self.directory.name, "test.apsave")
+        ctx.auto_saver_thread = True  # type: ignore[assignment]  # saves are triggered by the test
+        ctx.init_save(journal=True)
+        return ctx
+
+    def change_state(self, step: int) -> None:
+        ctx = self.ctx
+        ctx.location_checks[0, 1 + step % 2].add(101 + step % 2 * 100 + step // 2 % 2)
+        send_items_to(ctx, 0, 2 - step % 2, NetworkItem(step, 101, 1, 0))
+        ctx.hints[0, 1].add(Hint(1, 2, 203, 23, False))  # never checked, so loading does not refresh it
+        ctx.hints_used[0, 1] += 1
+        ctx.stored_data[f"key{step % 3}"] = step
+        ctx.save_journal.changed_stored_data.add(f"key{step % 3}")
+        if step % 2:
+            ctx.name_aliases[0, 1] = f"Alias{step}"
+        else:
+            ctx.name_aliases.pop((0, 1), None)
+        ctx.client_game_state[0, 2] = step
+
+    def test_replay(self) -> None:
+        """Ensure loading the snapshot and its journal results in the same state as the last save."""
+        self.assertTrue(self.ctx._save())
+        self.assertFalse(os.path.exists(self.ctx.journal_filename))
+        for step in range(4):
+            self.change_state(step)
+            self.assertTrue(self.ctx._save())
+        self.assertFalse(self.ctx.save_journal.needs_snapshot)
+        self.assertEqual(self.ctx.save_journal.records, 4)
+        self.assertTrue(os.path.exists(self.ctx.journal_filename))
+        expected = self.ctx.get_save()
+
+        loaded = self.make_context()
+        save = loaded.get_save()
+        for key in ("received_items", "hints", "hints_used", "location_checks", "name_aliases", "stored_data",
+                    "client_game_state", "client_activity_timers", "random_state"):
+            self.assertEqual(save[key], expected[key], key)
+        self.assertTrue(loaded.save_journal.needs_snapshot)
+        self.assertEqual(loaded.save_journal.generation, self.ctx.save_journal.generation)
+
+    def test_unchanged(self) -> None:
+        """Ensure saving without changes does not write a record."""
+        self.ctx._save()
+        self.assertIsNone(self.ctx.save_journal.record(self.ctx.get_save()))
+        self.ctx._save()
+        self.assertFalse(os.path.exists(self.ctx.journal_filename))
+
+    def test_compaction(self) -> None:
+        """Ensure a full snapshot is written regularly and replaces the journal."""
+        self.ctx.save_journal.compact_records = 2
+        self.ctx._save()
+        for step in range(2):
+            self.change_state(step)
+            self.ctx._save()
+        self.assertTrue(self.ctx.save_journal.needs_snapshot)
+        generation = self.ctx.save_journal.generation
+        self.change_state(2)
+        self.ctx._save()
+        self.assertEqual(self.ctx.save_journal.generation, generation + 1)
+        self.assertFalse(os.path.exists(self.ctx.journal_filename))
+        self.assertEqual(self.make_context().get_save()["location_checks"], self.ctx.get_save()["location_checks"])
+
+    def test_stale_and_partial_records(self) -> None:
+        """Ensure records of an older snapshot and a cut off last record are ignored."""
+        self.ctx._save()
+        self.change_state(0)
+        self.ctx._save()
+        with open(self.ctx.journal_filename, "rb") as f:
+            old_record = f.read()
+        self.ctx._save(True)
+        self.change_state(1)
+        self.ctx._save()
+        expected = self.ctx.get_save()
+        with open(self.ctx.journal_filename, "rb") as f:
+            journal = f.read()
+        with open(self.ctx.journal_filename, "wb") as f:
+            f.write(old_record + journal + journal[:-3])
+        self.assertEqual(self.make_context().get_save()["location_checks"], expected["location_checks"])
+
+    def test_replay_operations(self) -> None:
+        """Ensure every kind of change is replayed and replaying a record twice does not change the result."""
+        journal = SaveJournal()
+        base = {
+            "received_items": {(0, 1, True): [NetworkItem(1, 1, 1, 0)]},
+            "location_checks": {(0, 1): {1, 2}},
+            "name_aliases": {(0, 1): "Alias"},
+            "client_activity_timers": (((0, 1), 1.0),),
+            "stored_data": {"a": [1]},
+            "game_options": {"hint_cost": 10},
+        }
+        journal.start_snapshot(base)
+        journal.snapshot_written(1000)
+        changed = {
+            "received_items": {(0, 1, True): [NetworkItem(1, 1, 1, 0), NetworkItem(2, 1, 1, 0)],
+                               (0, 2, True): [NetworkItem(3, 1, 2, 0)]},
+            "location_checks": {(0, 1): {1, 2, 3}, (0, 2): {4}},
+            "name_aliases": {},
+            "client_activity_timers": (((0, 1), 2.0), ((0, 2), 3.0)),
+            "stored_data": {"a": [1, 2]},
+            "game_options": {"hint_cost": 5},
+        }
+        journal.changed_stored_data.add("a")
+        record = journal.record(changed)
+        assert record is not None
+        replayed = SaveJournal.replay(dict(base), [record, record])
+        self.assertEqual(replayed.pop("journal_generation"), journal.generation)
+        self.assertEqual(dict(replayed["client_activity_timers"]), dict(changed.pop("client_activity_timers")))
+        del replayed["client_activity_timers"]
+        self.assertEqual(replayed, changed)
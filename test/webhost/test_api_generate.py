@@ -43,3 +43,55 @@ class TestAPIGenerate(TestBase):
         json_data = response.get_json()
         self.assertTrue(json_data["text"].startswith("Generation of seed "))
         self.assertTrue(json_data["text"].endswith(" started successfully."))
+
+    def test_generation_timeout(self) -> None:
+        """Verify that a generation exceeding its allowed time gets marked as failed."""
+        from uuid import UUID
+        from pony.orm import db_session
+        from Utils import restricted_loads
+        from WebHostLib.generate import gen_game
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_STARTED
+
+        options = {"Tester1": {"game": "Archipelago", "name": "Tester", "Archipelago": {}}}
+        response = self.client.post("/api/generate", data=json.dumps({"weights": options}),
+                                    content_type="application/json")
+        sid = UUID(response.get_json()["detail"])
+        with db_session:
+            generation = Generation.get(id=sid)
+            generation.state = STATE_STARTED
+            gen_options, meta, owner = restricted_loads(generation.options), json.loads(generation.meta), \
+                generation.owner
+
+        self.assertIsNone(gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=0))
+        with db_session:
+            generation = Generation.get(id=sid)
+            self.assertEqual(generation.state, STATE_ERROR)
+            self.assertIn("Allowed time for Generation exceeded", json.loads(generation.meta)["error"])
+        response = self.client.get(f"/api/status/{response.get_json()['encoded']}")
+        self.assertEqual(response.status_code, 500)
+
+    def test_generation_progress_db_error(self) -> None:
+        """Verify that failing to store the progress of a generation doesn't fail the generation."""
+        import sqlite3
+        from unittest import mock
+        from uuid import UUID, uuid4
+        from pony.orm import db_session
+        from Utils import restricted_loads
+        from WebHostLib import generate
+
+        options = {"Tester1": {"game": "Archipelago", "name": "Tester", "Archipelago": {}}}
+        response = self.client.post("/api/generate", data=json.dumps({"weights": options}),
+                                    content_type="application/json")
+        sid = UUID(response.get_json()["detail"])
+        with db_session:
+            generation = generate.Generation.get(id=sid)
+            gen_options, meta, owner = restricted_loads(generation.options), json.loads(generation.meta), \
+                generation.owner
+
+        seed_id = uuid4()
+        with mock.patch.object(generate.Generation, "get", side_effect=sqlite3.OperationalError("database is locked")), \
+                mock.patch.object(generate, "upload_to_db", return_value=seed_id) as upload_to_db, \
+                self.assertLogs(level="ERROR") as logs:
+            self.assertEqual(generate.gen_game(gen_options, meta=meta, owner=owner, sid=sid), seed_id)
+        upload_to_db.assert_called_once()
+        self.assertIn("Failed to store generation progress", logs.output[0])
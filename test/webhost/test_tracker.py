@@ -103,3 +103,39 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_tracker_model_refresh(self) -> None:
+        """Verify that trackers share the decoded room and apply new journal records to a copy of it."""
+        from pony.orm import commit, db_session, delete
+        from MultiServer import SaveJournal
+        from Utils import utcnow
+        from WebHostLib.models import Room, SaveRecord
+        from WebHostLib.tracker import TrackerData
+
+        journal = SaveJournal()
+        save = {"location_checks": {(0, 1): {1}}}
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            journal.start_snapshot(save)
+            room.multisave = pickle.dumps(save)
+            commit()
+            journal.snapshot_written(len(room.multisave))
+            first = TrackerData(room)
+            self.assertEqual(first.get_player_checked_locations(0, 1), {1})
+
+            save["location_checks"][0, 1] = {1, 2}
+            SaveRecord(room=room, generation=journal.generation, data=journal.record(save))
+            room.last_activity = utcnow()
+            commit()
+            second = TrackerData(room)
+            self.assertIs(second._multidata, first._multidata)
+            self.assertEqual(second.get_player_checked_locations(0, 1), {1, 2})
+            self.assertEqual(first.get_player_checked_locations(0, 1), {1})
+            self.assertIs(TrackerData(room)._multisave, second._multisave)
+
+            save["location_checks"][0, 1] = {1, 2, 3}
+            journal.start_snapshot(save)
+            room.multisave = pickle.dumps(save)
+            delete(record for record in SaveRecord if record.room == room)
+            commit()
+            self.assertEqual(TrackerData(room).get_player_checked_locations(0, 1), {1, 2, 3})
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+import concurrent.futures
 import hashlib
+import io
 import logging
+import multiprocessing
 import pathlib
+import pickle
 import sys
 import time
 from collections.abc import Callable, Iterable, Mapping
 from random import Random
-from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, TextIO, Tuple,
-                    TYPE_CHECKING, Type, Union)
+from typing import (Any, BinaryIO, ClassVar, Dict, FrozenSet, List, NamedTuple, Optional, Self, Set, TextIO,
+                    Tuple, TYPE_CHECKING, Type, Union)
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState, Entrance
 from rule_builder.rules import CustomRuleRegister, Rule
-from Utils import Version
+from Utils import Version, report_generation_progress
 
 if TYPE_CHECKING:
     from BaseClasses import CollectionRule, Item, Location, MultiWorld, Region, Tutorial
@@ -113,6 +117,8 @@ class AutoLogicRegister(type):
                 CollectionState.additional_copy_functions.append(function)
             elif item_name == "init_mixin":
                 CollectionState.additional_init_functions.append(function)
+            elif item_name == "copy_on_write_attributes":
+                CollectionState.additional_copy_on_write_attributes.extend(function)
             elif not item_name.startswith("__"):
                 if hasattr(CollectionState, item_name):
                     raise Exception(f"Name conflict on Logic Mixin {name} trying to overwrite {item_name}")
@@ -199,21 +205,25 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
-    for player in multiworld.player_ids:
+    for index, player in enumerate(multiworld.player_ids):
+        report_generation_progress(method_name, index / multiworld.players)
         prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _assert_unique_items(multiworld, player, multiworld.itempool[prev_item_count:])
 
     call_stage(multiworld, method_name, *args)
 
 
+def _assert_unique_items(multiworld: "MultiWorld", player: int, new_items: List["Item"]) -> None:
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types = {multiworld.worlds[player].__class__ for player in multiworld.player_ids}
     for world_type in sorted(world_types, key=lambda world: world.__name__):
@@ -222,6 +232,160 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
             _timed_call(stage_callable, multiworld, *args)
 
 
+isolated_multiworld: Optional["MultiWorld"] = None
+"""The MultiWorld that forked workers of call_all_isolated run the methods of isolated worlds on."""
+
+
+class IsolatedWorldResult(NamedTuple):
+    """Everything an isolated world added to the MultiWorld during call_all_isolated, pickled by the worker."""
+    world_state: Any
+    region_cache: Dict[str, "Region"]
+    entrance_cache: Dict[str, "Entrance"]
+    location_cache: Dict[str, "Location"]
+    items: List[List["Item"]]
+    """Items added to the itempool, per method."""
+    precollected_items: List[List["Item"]]
+    """Items pushed as precollected, per method."""
+    early_items: Dict[str, int]
+    local_early_items: Dict[str, int]
+    indirect_connections: Dict["Region", Set["Entrance"]]
+    completion_condition: "CollectionRule"
+
+
+class _IsolatedWorldPickler(pickle.Pickler):
+    """Pickles the result of an isolated world, referencing the objects shared with the main process instead."""
+
+    def __init__(self, file: BinaryIO, world: World) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = {id(world.multiworld): "multiworld", id(world.multiworld.regions): "regions",
+                           id(world): "world"}
+
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        return self.shared_ids.get(id(obj))
+
+
+class _IsolatedWorldUnpickler(pickle.Unpickler):
+    def __init__(self, file: BinaryIO, world: World) -> None:
+        super().__init__(file)
+        self.shared = {"multiworld": world.multiworld, "regions": world.multiworld.regions, "world": world}
+
+    def persistent_load(self, pid: str) -> Any:
+        return self.shared[pid]
+
+
+def _call_isolated(player: int, method_names: Tuple[str, ...]) -> Optional[bytes]:
+    """Runs the methods of an isolated world in a forked worker and returns the pickled IsolatedWorldResult,
+    or None if the world's data can't be pickled."""
+    multiworld = isolated_multiworld
+    assert multiworld, "Isolated world methods can only be called in workers forked by call_all_isolated."
+    world = multiworld.worlds[player]
+    items: List[List[Item]] = []
+    precollected_items: List[List[Item]] = []
+    for method_name in method_names:
+        prev_item_count = len(multiworld.itempool)
+        prev_precollected_count = len(multiworld.precollected_items[player])
+        call_single(multiworld, method_name, player)
+        items.append(multiworld.itempool[prev_item_count:])
+        precollected_items.append(multiworld.precollected_items[player][prev_precollected_count:])
+
+    result = IsolatedWorldResult(
+        world.__getstate__(),
+        multiworld.regions.region_cache[player],
+        multiworld.regions.entrance_cache[player],
+        multiworld.regions.location_cache[player],
+        items,
+        precollected_items,
+        multiworld.early_items[player],
+        multiworld.local_early_items[player],
+        {region: entrances for region, entrances in multiworld.indirect_connections.items()
+         if region.player == player},
+        multiworld.completion_condition[player],
+    )
+    file = io.BytesIO()
+    try:
+        _IsolatedWorldPickler(file, world).dump(result)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        logging.debug(f"Could not pickle {world.game} of player {player}, "
+                      f"generating it in the main process instead: {e}")
+        return None
+    return file.getvalue()
+
+
+def _merge_isolated(multiworld: "MultiWorld", player: int, data: bytes) -> IsolatedWorldResult:
+    """Replaces the data of an isolated world with the result of its worker."""
+    world = multiworld.worlds[player]
+    result: IsolatedWorldResult = _IsolatedWorldUnpickler(io.BytesIO(data), world).load()
+    set_state = getattr(world, "__setstate__", None)
+    if set_state:
+        set_state(result.world_state)
+    else:
+        world.__dict__.update(result.world_state)
+    multiworld.per_slot_randoms[player] = world.random
+    multiworld.regions.region_cache[player] = result.region_cache
+    multiworld.regions.entrance_cache[player] = result.entrance_cache
+    multiworld.regions.location_cache[player] = result.location_cache
+    multiworld.early_items[player] = result.early_items
+    multiworld.local_early_items[player] = result.local_early_items
+    for region in [region for region in multiworld.indirect_connections if region.player == player]:
+        del multiworld.indirect_connections[region]
+    multiworld.indirect_connections.update(result.indirect_connections)
+    multiworld.completion_condition[player] = result.completion_condition
+    return result
+
+
+def is_isolated(world_type: Type[World], method_names: Iterable[str]) -> bool:
+    """Whether the methods of this world type can be run in a worker process by call_all_isolated."""
+    return world_type.isolated_generation and not any(getattr(world_type, f"stage_{method_name}", None)
+                                                      for method_name in method_names)
+
+
+def call_all_isolated(multiworld: "MultiWorld", method_names: Tuple[str, ...], workers: int) -> None:
+    """
+    Same as calling call_all for each of the methods in order, but runs the methods of worlds declaring
+    isolated_generation in forked worker processes. The results of the workers are merged in player order, so the
+    MultiWorld ends up the same as in serial generation.
+
+    :param method_names: Consecutive generation steps, which may only be create_regions, create_items and set_rules.
+    :param workers: Maximum number of worker processes. Serial generation is used if below 2 or if fork is
+                    unavailable.
+    """
+    assert set(method_names) <= {"create_regions", "create_items", "set_rules"}, \
+        f"Only create_regions, create_items and set_rules can be called isolated, not {method_names}"
+    isolated = [player for player in multiworld.player_ids
+                if is_isolated(type(multiworld.worlds[player]), method_names)]
+    if workers < 2 or not isolated or "fork" not in multiprocessing.get_all_start_methods():
+        for method_name in method_names:
+            call_all(multiworld, method_name)
+        return
+
+    global isolated_multiworld
+    isolated_multiworld = multiworld
+    try:
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(isolated)),
+                                                    multiprocessing.get_context("fork")) as pool:
+            # all workers are forked on the first submit, before the main process changes the MultiWorld
+            futures = {player: pool.submit(_call_isolated, player, method_names) for player in isolated}
+            results: Dict[int, IsolatedWorldResult] = {}
+            for index, method_name in enumerate(method_names):
+                for player in multiworld.player_ids:
+                    prev_item_count = len(multiworld.itempool)
+                    if player in futures and index == 0:
+                        data = futures[player].result()
+                        if data is not None:
+                            results[player] = _merge_isolated(multiworld, player, data)
+                    if player in results:
+                        multiworld.itempool += results[player].items[index]
+                        for item in results[player].precollected_items[index]:
+                            multiworld.push_precollected(item)
+                    else:
+                        call_single(multiworld, method_name, player)
+                    if __debug__:
+                        _assert_unique_items(multiworld, player, multiworld.itempool[prev_item_count:])
+                call_stage(multiworld, method_name)
+    finally:
+        isolated_multiworld = None
+
+
 class WebWorld(metaclass=WebWorldRegister):
     """Webhost integration"""
 
@@ -313,6 +477,16 @@ class World(metaclass=AutoWorldRegister):
     hidden: ClassVar[bool] = False
     """Hide World Type from various views. Does not remove functionality."""
 
+    isolated_generation: ClassVar[bool] = False
+    """
+    Declare that create_regions, create_items and set_rules of this World don't access other worlds, which allows
+    running them in a worker process when generating with multiple generation workers.
+    In these steps the World may only change its own regions, entrances and locations, add to the itempool, push
+    precollected items, and set its own early items, indirect conditions and completion condition. Randomization has
+    to use self.random, and everything created, including rules, has to be picklable.
+    Worlds that can't be pickled are generated in the main process instead, so the result is identical either way.
+    """
+
     web: ClassVar[WebWorld] = WebWorld()
     """see WebWorld for options"""
 
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from BaseClasses import CollectionState, MultiWorld
+from test.general import gen_steps, setup_multiworld
+from worlds.AutoWorld import call_all
+from ... import ALTTPWorld
+from ...Options import EntranceShuffle, GlitchesRequired
+
+
+class TestCopyOnWriteGlitchedLogic(TestCase):
+    """Underworld glitch rules check entrances with a copy of the state that has a fake Moon Pearl."""
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        self.multiworld = setup_multiworld([ALTTPWorld], ())
+        options = self.multiworld.worlds[1].options
+        options.glitches_required = GlitchesRequired.from_any("hybrid_major_glitches")
+        # dungeon reentry with a fake pearl is only in logic if dungeon exits are fixed, but fake worlds aren't
+        options.entrance_shuffle = EntranceShuffle.from_any("dungeons_full")
+        for step in gen_steps:
+            call_all(self.multiworld, step)
+
+    def get_reachable_locations(self, copy_on_write: bool) -> set[str]:
+        self.multiworld.copy_on_write_state = copy_on_write
+        state = CollectionState(self.multiworld)
+        for item in self.multiworld.itempool:
+            if item.name != "Moon Pearl":
+                state.collect(item, True)
+        reachable = {location.name for location in self.multiworld.get_locations() if location.can_reach(state)}
+        self.assertFalse(state.has("Moon Pearl", 1))
+        return reachable
+
+    def test_fake_pearl_state(self) -> None:
+        """Ensure copy-on-write copies made while checking rules don't change the state they were copied from."""
+        reachable = self.get_reachable_locations(False)
+        self.assertEqual(self.get_reachable_locations(True), reachable)
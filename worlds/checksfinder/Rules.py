@@ -1,24 +1,28 @@
-from worlds.generic.Rules import set_rule
-from BaseClasses import MultiWorld
+from typing import TYPE_CHECKING
+
+from rule_builder.rules import HasAllCounts, HasFromList
+
+if TYPE_CHECKING:
+    from . import ChecksFinderWorld
 
 
 items = ["Map Width", "Map Height", "Map Bombs"]
 
 
 # Sets rules on entrances and advancements that are always applied
-def set_rules(multiworld: MultiWorld, player: int):
+def set_rules(world: "ChecksFinderWorld"):
     for i in range(20):
-        set_rule(multiworld.get_location(f"Tile {i+6}", player), lambda state, i=i: state.has_from_list(items, player, i+1))
+        world.set_rule(world.get_location(f"Tile {i+6}"), HasFromList(*items, count=i+1))
 
 
 # Sets rules on completion condition
-def set_completion_rules(multiworld: MultiWorld, player: int):
+def set_completion_rules(world: "ChecksFinderWorld"):
     width_req = 5  # 10 - 5
     height_req = 5  # 10 - 5
     bomb_req = 15  # 20 - 5
-    multiworld.completion_condition[player] = lambda state: state.has_all_counts(
+    world.set_completion_rule(HasAllCounts(
         {
             "Map Width": width_req,
             "Map Height": height_req,
             "Map Bombs": bomb_req,
-        }, player)
+        }))
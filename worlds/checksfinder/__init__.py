@@ -27,6 +27,7 @@ class ChecksFinderWorld(World):
     game = "ChecksFinder"
     options_dataclass = PerGameCommonOptions
     web = ChecksFinderWeb()
+    isolated_generation = True
 
     item_name_to_id = {name: data.code for name, data in item_table.items()}
     location_name_to_id = {name: data.id for name, data in advancement_table.items()}
@@ -56,8 +57,8 @@ class ChecksFinderWorld(World):
         self.multiworld.itempool += itempool
 
     def set_rules(self):
-        set_rules(self.multiworld, self.player)
-        set_completion_rules(self.multiworld, self.player)
+        set_rules(self)
+        set_completion_rules(self)
 
     def fill_slot_data(self):
         return {
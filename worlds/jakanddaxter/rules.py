@@ -33,6 +33,9 @@ def set_orb_trade_rule(world: "JakAndDaxterWorld"):
 
 def recalculate_reachable_orbs(state: CollectionState, player: int, world: "JakAndDaxterWorld") -> None:
 
+    # The counts are stored in prog_items outside of collect/remove, so stop sharing them with copy-on-write copies.
+    state.detach_player(player)
+
     # Recalculate every level, every time the cache is stale, because you don't know
     # when a specific bundle of orbs in one level may unlock access to another.
     accessible_total_orbs = 0
@@ -206,6 +206,7 @@ def dice_simulation_state_change(state, player, frags_per_dice, frags_per_roll,
     """
 
     if state.prog_items[player]["state_is_fresh"] == 0:
+        state.detach_player(player)  # the cache is stored outside of collect/remove, don't share it with copies
         state.prog_items[player]["state_is_fresh"] = 1
         categories, num_dice, num_rolls, fixed_mult, step_mult, expoints = extract_progression(
             state, player, frags_per_dice, frags_per_roll, allowed_categories